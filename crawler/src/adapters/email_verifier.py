@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import os
+from typing import Iterable, Protocol
+from urllib.parse import quote
+
+import httpx
+
+from src.result import Result
+
+EMAIL_HIPPO_ENDPOINT = "https://api.hippoapi.com/v3/more/json"
+
+
+class EmailVerifier(Protocol):
+    """
+    メールアドレス 1 件を検証し、EmailHippo と同じステータス文字列
+    （Ok / Bad / Unverifiable / RetryLater など）を返すプロトコル。
+    """
+
+    async def verify(self, email: str) -> Result[str, Exception]:
+        ...
+
+
+def _get_email_hippo_api_key() -> Result[str, Exception]:
+    """環境変数 EMAIL_HIPPO_API_KEY を取得する。未設定なら Err を返す。"""
+    api_key = os.environ.get("EMAIL_HIPPO_API_KEY")
+    if not api_key:
+        return Result.err(
+            RuntimeError(
+                "EMAIL_HIPPO_API_KEY is not set. Please set it in your environment "
+                "before running this application."
+            )
+        )
+    return Result.ok(api_key)
+
+
+class EmailHippoVerifier:
+    """EmailHippo MORE API（v3）で検証する。1 件ごとに検証クレジットを消費する。"""
+
+    def __init__(self, client: httpx.AsyncClient, api_key: str) -> None:
+        self.client = client
+        self.api_key = api_key
+
+    @classmethod
+    def from_env(cls, client: httpx.AsyncClient) -> Result["EmailHippoVerifier", Exception]:
+        return _get_email_hippo_api_key().map(lambda api_key: cls(client, api_key))
+
+    async def verify(self, email: str) -> Result[str, Exception]:
+        url = f"{EMAIL_HIPPO_ENDPOINT}/{self.api_key}/{quote(email, safe='@')}"
+        try:
+            response = await self.client.get(url)
+            response.raise_for_status()
+            payload = response.json()
+            status = payload["emailVerification"]["mailboxVerification"]["result"]
+            return Result.ok(str(status))
+        except Exception as exc:
+            return Result.err(exc)
+
+
+class StaticEmailVerifier:
+    """
+    API を呼ばない検証器（テストやドライラン用）。
+    accept_all_domains のアドレスと ok_emails は Ok、それ以外は Bad を返す。
+    verified に検証したアドレスを記録する。
+    """
+
+    def __init__(
+        self, ok_emails: Iterable[str] = (), accept_all_domains: Iterable[str] = ()
+    ) -> None:
+        self.ok_emails = frozenset(email.lower() for email in ok_emails)
+        self.accept_all_domains = frozenset(domain.lower() for domain in accept_all_domains)
+        self.verified: list[str] = []
+
+    async def verify(self, email: str) -> Result[str, Exception]:
+        self.verified.append(email)
+        normalized = email.lower()
+        domain = normalized.rsplit("@", 1)[-1]
+        if domain in self.accept_all_domains or normalized in self.ok_emails:
+            return Result.ok("Ok")
+        return Result.ok("Bad")
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Mapping, Optional, Protocol, Sequence
+
+import httpx
+
+from src.result import Result
+
+DEFAULT_DOH_ENDPOINT = "https://dns.google/resolve"
+# 応答に TTL が無い場合（MX なしで SOA も返らない等）に使う秒数
+DEFAULT_NEGATIVE_TTL = 3600
+_MX_TYPE = 15
+_SOA_TYPE = 6
+_NOERROR = 0
+_NXDOMAIN = 3
+
+
+@dataclass(frozen=True)
+class MxAnswer:
+    """MX の解決結果。hosts が空なら MX なし（NXDOMAIN・null MX を含む）。ttl は秒。"""
+
+    hosts: tuple[str, ...]
+    ttl: int
+
+    @property
+    def has_mx(self) -> bool:
+        return bool(self.hosts)
+
+
+class MxResolver(Protocol):
+    """ドメインの MX を引くプロトコル。一時的な失敗（SERVFAIL・タイムアウト）は Err。"""
+
+    async def resolve_mx(self, domain: str) -> Result[MxAnswer, Exception]:
+        ...
+
+
+def _parse_mx_data(data: str) -> Optional[str]:
+    """"10 mx.example.com." から host を取り出す。null MX（"0 ."）は None。"""
+    parts = data.split()
+    if len(parts) != 2:
+        return None
+    host = parts[1].rstrip(".").lower()
+    return host or None
+
+
+class DohMxResolver:
+    """DNS over HTTPS（JSON API）で MX を引く。追加の DNS ライブラリなしで非同期に動く。"""
+
+    def __init__(self, client: httpx.AsyncClient, endpoint: str = DEFAULT_DOH_ENDPOINT) -> None:
+        self.client = client
+        self.endpoint = endpoint
+
+    async def resolve_mx(self, domain: str) -> Result[MxAnswer, Exception]:
+        try:
+            response = await self.client.get(
+                self.endpoint,
+                params={"name": domain, "type": "MX"},
+                headers={"Accept": "application/dns-json"},
+            )
+            response.raise_for_status()
+            payload = response.json()
+        except Exception as exc:
+            return Result.err(exc)
+
+        status = payload.get("Status")
+        if status not in (_NOERROR, _NXDOMAIN):
+            return Result.err(RuntimeError(f"DNS status {status} for {domain}"))
+
+        answers = [item for item in payload.get("Answer") or [] if item.get("type") == _MX_TYPE]
+        hosts = tuple(
+            host for host in (_parse_mx_data(str(item.get("data", ""))) for item in answers) if host
+        )
+        if hosts:
+            return Result.ok(MxAnswer(hosts, min(int(item.get("TTL", 0)) for item in answers)))
+        # 否定応答は SOA の TTL（RFC 2308）で覚える
+        soa_ttls = [
+            int(item.get("TTL", 0))
+            for item in payload.get("Authority") or []
+            if item.get("type") == _SOA_TYPE
+        ]
+        return Result.ok(MxAnswer((), min(soa_ttls) if soa_ttls else DEFAULT_NEGATIVE_TTL))
+
+
+class StaticMxResolver:
+    """
+    DNS を引かない解決器（テスト用のスタブ）。records に無いドメインは MX なし。
+    failures のドメインは Err を返す。引いたドメインを queried に記録する。
+    """
+
+    def __init__(
+        self,
+        records: Mapping[str, Sequence[str]],
+        ttl: int = 3600,
+        failures: Sequence[str] = (),
+    ) -> None:
+        self.records = {domain.lower(): tuple(hosts) for domain, hosts in records.items()}
+        self.ttl = ttl
+        self.failures = frozenset(domain.lower() for domain in failures)
+        self.queried: list[str] = []
+
+    async def resolve_mx(self, domain: str) -> Result[MxAnswer, Exception]:
+        self.queried.append(domain)
+        normalized = domain.lower()
+        if normalized in self.failures:
+            return Result.err(RuntimeError(f"SERVFAIL for {domain}"))
+        return Result.ok(MxAnswer(self.records.get(normalized, ()), self.ttl))
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 import os
-from typing import Literal, Type, TypeVar
+import time
+from typing import Any, Callable, Literal, Type, TypeVar
 
 from openai import AsyncOpenAI
 from pydantic import BaseModel
@@ -30,14 +31,50 @@ class StructuredOutputOptions(BaseModel):
     reasoning_effort: Literal["minimal", "low", "medium", "high"] = "minimal"
 
 
+class LlmCallUsage(BaseModel):
+    """1 回の API 呼び出しのトークン使用量と所要時間。"""
+
+    model: str
+    input_tokens: int = 0
+    cached_tokens: int = 0
+    output_tokens: int = 0
+    reasoning_tokens: int = 0
+    web_search_calls: int = 0
+    latency_ms: int = 0
+    # ok / parse_error / error
+    outcome: str = "ok"
+    error: str | None = None
+
+
+def _extract_usage(resp: Any, model: str) -> LlmCallUsage:
+    """Responses API のレスポンスから usage と web_search 呼び出し回数を取り出す。"""
+    usage = getattr(resp, "usage", None)
+    input_details = getattr(usage, "input_tokens_details", None)
+    output_details = getattr(usage, "output_tokens_details", None)
+    web_search_calls = sum(
+        1 for item in (getattr(resp, "output", None) or []) if item.type == "web_search_call"
+    )
+    return LlmCallUsage(
+        model=getattr(resp, "model", None) or model,
+        input_tokens=getattr(usage, "input_tokens", 0) or 0,
+        cached_tokens=getattr(input_details, "cached_tokens", 0) or 0,
+        output_tokens=getattr(usage, "output_tokens", 0) or 0,
+        reasoning_tokens=getattr(output_details, "reasoning_tokens", 0) or 0,
+        web_search_calls=web_search_calls,
+    )
+
+
 async def create_structured_outputs(
     prompt: str,
     schema: Type[TModel],
     options: StructuredOutputOptions | None = None,
+    *,
+    on_complete: Callable[[LlmCallUsage], None] | None = None,
 ) -> Result[TModel, Exception]:
     """
     OpenAI Responses API で Structured Outputs を取得する。
     schema は pydantic BaseModel を渡す。
+    on_complete を渡すと、成否に関わらず API 呼び出し後に usage と所要時間を通知する。
     """
     opts = options or StructuredOutputOptions()
     api_key_result = _get_openai_api_key()
@@ -46,6 +83,8 @@ async def create_structured_outputs(
 
     client = AsyncOpenAI(api_key=api_key_result.unwrap())
 
+    usage = LlmCallUsage(model=opts.model)
+    started = time.perf_counter()
     try:
         resp = await client.responses.parse(
             model=opts.model,
@@ -54,8 +93,11 @@ async def create_structured_outputs(
             tools=[{"type": "web_search"}] if opts.use_web_search else [],
             reasoning={"effort": opts.reasoning_effort},
         )
+        usage = _extract_usage(resp, opts.model)
         parsed = resp.output_parsed
         if parsed is None:
+            usage.outcome = "parse_error"
+            usage.error = "Failed to parse the response."
             return Result.err(RuntimeError("Failed to parse the response."))
         if isinstance(parsed, schema):
             return Result.ok(parsed)
@@ -63,4 +105,10 @@ async def create_structured_outputs(
             return Result.ok(schema.model_validate(parsed))
         return Result.ok(schema.model_validate(parsed))  # type: ignore[arg-type]
     except Exception as exc:  # noqa: BLE001
+        usage.outcome = "error"
+        usage.error = str(exc)
         return Result.err(exc)
+    finally:
+        usage.latency_ms = int((time.perf_counter() - started) * 1000)
+        if on_complete is not None:
+            on_complete(usage)
@@ -0,0 +1 @@
+"""Micro benchmarks for crawler hot paths (run with `python -m src.benchmarks.<name>`)."""
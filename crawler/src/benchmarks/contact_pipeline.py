@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+from pydantic import BaseModel, TypeAdapter
+
+from src import enrich_contact
+from src.benchmarks.contact_rules import DEPARTMENT_VOCABULARY, POSITION_VOCABULARY
+from src.enrich_contact import (
+    DEFAULT_BATCH_SIZE,
+    ensure_category_version_column,
+    iter_contacts,
+    update_categories_batch,
+)
+from src.enrichers.contact import (
+    CLASSIFIER_VERSION,
+    _normalize,
+    classify_department_category,
+    classify_position_category,
+    classify_seniority,
+)
+from src.enrichers.contact.enricher import _match_cached, _normalize_cached
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+DEFAULT_SEED = 42
+
+# 実データに近づけるため、語彙に組織名の接頭辞や英語の肩書き修飾を付けて異なり値を増やす
+DEPARTMENT_PREFIXES = ["", "", "", "東日本", "西日本", "第二", "グローバル", "本社 ", "Global "]
+POSITION_DECORATIONS = ["{}", "{}", "{}", "{}（兼務）", "Sr. {}", "{} / 営業", "シニア{}"]
+EMPTY_RATE = 0.05
+
+
+class Args(BaseModel):
+    sizes: list[int] = DEFAULT_SIZES
+    seed: int = DEFAULT_SEED
+    memory: bool = True
+    baseline: Optional[Path] = None
+    save_baseline: Optional[Path] = None
+
+
+@dataclass(frozen=True)
+class BenchmarkResult:
+    case: str
+    rows: int
+    seconds: float
+    peak_bytes: int | None = None
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float("inf")
+
+    @property
+    def key(self) -> str:
+        return f"{self.case}@{self.rows}"
+
+
+def generate_contacts(rows: int, seed: int = DEFAULT_SEED) -> list[tuple[str, str, str]]:
+    """(id, department, position) の合成データを rows 件作る。同じ seed なら同じ並び。"""
+    rng = random.Random(seed)
+    contacts: list[tuple[str, str, str]] = []
+    for i in range(rows):
+        department = rng.choice(DEPARTMENT_PREFIXES) + rng.choice(DEPARTMENT_VOCABULARY)
+        position = rng.choice(POSITION_DECORATIONS).format(rng.choice(POSITION_VOCABULARY))
+        if rng.random() < EMPTY_RATE:
+            department = ""
+        if rng.random() < EMPTY_RATE:
+            position = ""
+        contacts.append((f"p{i:07d}", department, position))
+    return contacts
+
+
+def _build_db(db_path: Path, contacts: list[tuple[str, str, str]]) -> None:
+    """contacts だけを持つ SQLite ファイルを作り、合成データを入れる。"""
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(
+            """
+            CREATE TABLE contacts (
+              id TEXT PRIMARY KEY, company_id TEXT NOT NULL, full_name TEXT NOT NULL,
+              first_name TEXT, last_name TEXT, position TEXT, department TEXT,
+              department_category TEXT, position_category TEXT, seniority TEXT, city TEXT,
+              linkedin_url TEXT, twitter_url TEXT, phone_number TEXT, source_label TEXT,
+              source_url TEXT, first_seen_at INTEGER, last_seen_at INTEGER,
+              created_at INTEGER NOT NULL, updated_at INTEGER NOT NULL
+            )
+            """
+        )
+        now = int(time.time())
+        conn.executemany(
+            "INSERT INTO contacts (id, company_id, full_name, position, department, "
+            "source_label, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (contact_id, f"c{i // 10:07d}", "山田 太郎", position, department, "x", now, now)
+                for i, (contact_id, department, position) in enumerate(contacts)
+            ),
+        )
+        ensure_category_version_column(conn).unwrap()
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _clear_caches() -> None:
+    """classify_* のメモを空にし、各サイズを同じ条件（コールド）から測る。"""
+    _normalize_cached.cache_clear()
+    _match_cached.cache_clear()
+
+
+def _measure(
+    case: str, rows: int, fn: Callable[[], object], memory: bool
+) -> BenchmarkResult:
+    """
+    fn の所要時間を測る。memory=True なら tracemalloc を有効にしてもう 1 回実行し、
+    Python 側のピークメモリを記録する（トレース中は遅くなるので時間とは別に測る）。
+    SQLite 内部の確保はトレースに含まれない。
+    """
+    _clear_caches()
+    started = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - started
+    peak: int | None = None
+    if memory:
+        _clear_caches()
+        tracemalloc.start()
+        try:
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return BenchmarkResult(case=case, rows=rows, seconds=seconds, peak_bytes=peak)
+
+
+def _iter_all(db_path: Path) -> int:
+    conn = sqlite3.connect(db_path)
+    try:
+        return sum(1 for _ in iter_contacts(conn, only_missing=False))
+    finally:
+        conn.close()
+
+
+def _update_all(db_path: Path, batches: list[list[tuple[str, str, str | None, str]]]) -> None:
+    conn = sqlite3.connect(db_path)
+    try:
+        for batch in batches:
+            update_categories_batch(conn, batch, CLASSIFIER_VERSION).unwrap()
+    finally:
+        conn.close()
+
+
+def bench_size(rows: int, seed: int = DEFAULT_SEED, memory: bool = True) -> list[BenchmarkResult]:
+    """rows 件の合成データで、正規化・分類・読み込み・書き込み・run 全体を測る。"""
+    contacts = generate_contacts(rows, seed)
+    departments = [department for _, department, _ in contacts]
+    positions = [position for _, _, position in contacts]
+    # update_categories_batch には分類済みの値を渡し、書き込みだけを測る
+    updates = [
+        (
+            classify_department_category(department),
+            classify_position_category(position),
+            classify_seniority(position),
+            contact_id,
+        )
+        for contact_id, department, position in contacts
+    ]
+    batches = [
+        updates[i : i + DEFAULT_BATCH_SIZE] for i in range(0, len(updates), DEFAULT_BATCH_SIZE)
+    ]
+
+    results: list[BenchmarkResult] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "contacts.sqlite"
+        _build_db(db_path, contacts)
+        # normalize は 1 行につき部署と役職の 2 値を正規化する
+        cases: list[tuple[str, Callable[[], object]]] = [
+            ("normalize", lambda: [(_normalize(d), _normalize(p)) for _, d, p in contacts]),
+            ("classify_department", lambda: [classify_department_category(v) for v in departments]),
+            ("classify_position", lambda: [classify_position_category(v) for v in positions]),
+            ("iter_contacts", lambda: _iter_all(db_path)),
+            ("update_categories_batch", lambda: _update_all(db_path, batches)),
+            ("enrich_contact_run", lambda: enrich_contact.run(db_path, True).unwrap()),
+        ]
+        for case, fn in cases:
+            results.append(_measure(case, rows, fn, memory))
+    return results
+
+
+def load_baseline(path: Path) -> dict[str, float]:
+    """save_baseline で保存した {"case@rows": rows_per_sec} を読む。"""
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_baseline(path: Path, results: list[BenchmarkResult]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {result.key: round(result.rows_per_sec, 1) for result in results}
+    path.write_text(json.dumps(payload, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+
+def format_results(
+    results: list[BenchmarkResult], baseline: dict[str, float] | None = None
+) -> list[str]:
+    """結果を表形式の行にする。baseline があれば rows/s の比（>1 なら速くなった）も出す。"""
+    header = f"{'case':<24} {'rows':>9} {'rows/s':>14} {'peak MiB':>9}"
+    if baseline is not None:
+        header += f" {'vs base':>8}"
+    lines = [header]
+    for result in results:
+        peak = f"{result.peak_bytes / 2**20:.1f}" if result.peak_bytes is not None else "-"
+        line = f"{result.case:<24} {result.rows:>9} {result.rows_per_sec:>14,.0f} {peak:>9}"
+        if baseline is not None:
+            base = baseline.get(result.key)
+            line += f" {result.rows_per_sec / base:>7.2f}x" if base else f" {'-':>8}"
+        lines.append(line)
+    return lines
+
+
+def run(args: Args) -> list[str]:
+    results: list[BenchmarkResult] = []
+    for rows in args.sizes:
+        results.extend(bench_size(rows, args.seed, args.memory))
+    if args.save_baseline is not None:
+        save_baseline(args.save_baseline, results)
+    baseline = load_baseline(args.baseline) if args.baseline is not None else None
+    return format_results(results, baseline)
+
+
+def _parse_args() -> Args:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Benchmark contact normalization, classification, loading and batch updates "
+            "on synthetic data."
+        )
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument(
+        "--no-memory",
+        dest="memory",
+        action="store_false",
+        help="tracemalloc によるピークメモリ計測を省略します（各ケースを 1 回だけ実行）。",
+    )
+    parser.add_argument("--baseline", type=Path, help="比較する基準値の JSON")
+    parser.add_argument("--save-baseline", type=Path, help="今回の結果を基準値として保存する先")
+    return TypeAdapter(Args).validate_python(vars(parser.parse_args()))
+
+
+def main() -> None:
+    for line in run(_parse_args()):
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
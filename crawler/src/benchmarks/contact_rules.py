@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import time
+from typing import Callable
+
+from pydantic import BaseModel, TypeAdapter
+
+from src.enrichers.contact import (
+    DEPARTMENT_RULES,
+    POSITION_RULES,
+    RuleEngine,
+    _normalize,
+    classify_department_category,
+    classify_position_category,
+)
+
+DEFAULT_SAMPLES = 200_000
+DEFAULT_SEED = 42
+
+DEPARTMENT_VOCABULARY = [
+    "営業部", "第一営業部", "法人営業本部", "インサイドセールス", "Sales Division",
+    "マーケティング部", "広報室", "ブランド戦略室", "Marketing", "情報システム部", "情シス",
+    "DX推進室", "IT統括部", "システム開発部", "経営企画室", "社長室", "人事部", "採用グループ",
+    "経理部", "財務本部", "法務部", "コンプライアンス室", "購買部", "調達センター",
+    "カスタマーサクセス部", "研究開発本部", "製造部", "物流センター", "企画管理部 ITグループ",
+    "Corporate Strategy", "Human Resources", "Legal Division", "Finance", "Procurement",
+]
+POSITION_VOCABULARY = [
+    "代表取締役", "取締役", "執行役員", "CEO", "CTO", "部長", "本部長", "室長", "センター長",
+    "Director", "Head of Sales", "VP of Marketing", "課長", "次長", "マネージャー", "Manager",
+    "リーダー", "課長代理", "主任", "係長", "チーフ", "スタッフ", "担当", "メンバー",
+    "Associate", "エンジニア", "コンサルタント", "デザイナー", "Senior Engineer", "謎の肩書き",
+]
+
+
+class Args(BaseModel):
+    samples: int = DEFAULT_SAMPLES
+    seed: int = DEFAULT_SEED
+
+
+def _legacy_department(department: str) -> str:
+    """ルールエンジン導入前の if 連鎖（比較用にそのまま残している）。"""
+    normalized = _normalize(department or "")
+    if not normalized:
+        return "その他"
+    if re.search(
+        r"経営|経営企画|事業企画|企画室|社長|代表|取締役|president|ceo|coo|cxo", normalized
+    ):
+        return "経営"
+    if re.search(
+        r"人事|労務|hr|タレントマネジメント|組織開発|人材開発|採用|リクルート", normalized
+    ):
+        return "人事・労務"
+    if re.search(r"財務|経理|ファイナンス|finance|管理会計|経営管理|会計|経営企画財務", normalized):
+        return "経理・財務"
+    if re.search(r"法務|legal|リーガル|コンプライアンス|規制|契約", normalized):
+        return "法務"
+    if re.search(r"購買|調達|資材|仕入|バイヤ|procurement|purchase", normalized):
+        return "購買"
+    if re.search(
+        r"営業|営業本部|営業統括|営業管理|国内営業|海外営業|営業技術|セールス|sales|"
+        r"アカウントマネージャ|アカウントマネジャ|インサイドセールス|フィールドセールス|"
+        r"法人営業|ソリューション営業",
+        normalized,
+    ):
+        return "営業"
+    if re.search(
+        r"マーケティング|マーケ|marketing|プロモーション|宣伝|広報|ブランド|brand", normalized
+    ):
+        return "マーケティング"
+    if re.search(
+        r"情報システム|情シス|社内it|it基盤|インフラ|it企画|it推進|dx推進|デジタル推進|it戦略|"
+        r"デジタル戦略|テクノロジー本部|テクノロジー部|cio|cto|システム|it統括|itソリューション|"
+        r"情報管理|情報企画|情報統括|情報部|(?<![a-z])it(?![a-z])|ict",
+        normalized,
+    ):
+        return "情報システム"
+    return "その他"
+
+
+def _legacy_position(position: str) -> str:
+    """ルールエンジン導入前の if 連鎖（比較用にそのまま残している）。"""
+    normalized = _normalize(position or "")
+    if not normalized:
+        return "その他"
+    if re.search(
+        r"代表取締役|取締役|社長|会長|president|経営|executive|役員|顧問|相談役|監査役|専務|常務|"
+        r"(?<![a-z])c(?:eo|oo|fo|to|mo|xo)(?![a-z])",
+        normalized,
+    ):
+        return "経営"
+    if re.search(
+        r"部長|本部長|部門長|局長|室長|所長|センター長|支社長|支店長|工場長|ヘッド|head|"
+        r"gm|generalmanager|ディレクター|director|マネージングディレクター|md|"
+        r"vicepresident|vp|svp|evp",
+        normalized,
+    ):
+        return "部長"
+    if re.search(
+        r"次長|課長|マネージャ|mgr|manager|スーパーバイザ|supervisor|リーダー|lead|グループ長|チーム長|"
+        r"課長代理|assistantmanager|assoc(?:iate)?manager|リーダ|リーダー補佐|サブマネージャ|副長",
+        normalized,
+    ):
+        return "次長・課長"
+    if re.search(r"主任|係長|チーフ|chief|sublead|副主任|サブリーダ|submanager|副主幹", normalized):
+        return "主任"
+    if re.search(r"担当|メンバー|スタッフ|staff|アソシエイト|associate", normalized):
+        return "担当者"
+    return "その他"
+
+
+def _time(fn: Callable[[str], str], values: list[str]) -> float:
+    started = time.perf_counter()
+    for value in values:
+        fn(value)
+    return time.perf_counter() - started
+
+
+def run(args: Args) -> list[str]:
+    """
+    レガシーの if 連鎖とルールエンジンの結果一致を確認し、処理速度を比較する。
+    engine は毎回正規化して判定、engine+memo は classify_* の入力文字列ごとのメモ込み。
+    """
+    rng = random.Random(args.seed)
+    departments = [rng.choice(DEPARTMENT_VOCABULARY) for _ in range(args.samples)]
+    positions = [rng.choice(POSITION_VOCABULARY) for _ in range(args.samples)]
+
+    department_engine = RuleEngine(DEPARTMENT_RULES)
+    position_engine = RuleEngine(POSITION_RULES)
+
+    lines: list[str] = []
+    cases = [
+        (
+            "department",
+            departments,
+            _legacy_department,
+            lambda v: department_engine.match(_normalize(v)).category,
+            classify_department_category,
+        ),
+        (
+            "position",
+            positions,
+            _legacy_position,
+            lambda v: position_engine.match(_normalize(v)).category,
+            classify_position_category,
+        ),
+    ]
+    for name, values, legacy, uncached, cached in cases:
+        mismatches = [v for v in set(values) if not (legacy(v) == uncached(v) == cached(v))]
+        if mismatches:
+            raise AssertionError(f"{name}: engine differs from legacy chain for {mismatches}")
+        legacy_sec = _time(legacy, values)
+        uncached_sec = _time(uncached, values)
+        cached_sec = _time(cached, values)
+        lines.append(
+            f"{name:<10} n={len(values)} legacy={len(values) / legacy_sec:,.0f} rows/s "
+            f"engine={len(values) / uncached_sec:,.0f} rows/s "
+            f"engine+memo={len(values) / cached_sec:,.0f} rows/s "
+            f"speedup={legacy_sec / cached_sec:.1f}x"
+        )
+    return lines
+
+
+def _parse_args() -> Args:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the compiled contact rule engine against the legacy if-chain."
+    )
+    parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLES)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    return TypeAdapter(Args).validate_python(vars(parser.parse_args()))
+
+
+def main() -> None:
+    for line in run(_parse_args()):
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from typing import Callable, Optional
+
+from pydantic import BaseModel, TypeAdapter
+
+from src.enrichers.domain import (
+    PATTERN_BUILDERS,
+    LocalPartIndex,
+    _normalize_token,
+    infer_pattern,
+    pattern_index,
+)
+
+DEFAULT_EMAILS = 1_000_000
+DEFAULT_CONTACTS_PER_COMPANY = 50
+DEFAULT_SEED = 42
+
+FIRST_NAMES = [
+    "taro", "jiro", "hanako", "yuki", "kenji", "akiko", "satoshi", "naoko", "hiroshi", "mai",
+    "takuya", "emi", "daisuke", "yoko", "shota", "ayaka", "ryo", "kaori", "john", "emily",
+]
+LAST_NAMES = [
+    "yamada", "sato", "suzuki", "takahashi", "tanaka", "watanabe", "ito", "nakamura",
+    "kobayashi", "kato", "yoshida", "yamamoto", "sasaki", "matsumoto", "inoue", "kimura",
+    "smith", "brown",
+]
+
+Email = tuple[str, str, str]  # (local, first_name, last_name)
+
+
+class Args(BaseModel):
+    emails: int = DEFAULT_EMAILS
+    contacts_per_company: int = DEFAULT_CONTACTS_PER_COMPANY
+    seed: int = DEFAULT_SEED
+
+
+def _legacy_infer_pattern(
+    local: str, first_name: Optional[str], last_name: Optional[str]
+) -> Optional[str]:
+    """逆引き導入前の実装（13 パターンをすべて組み立てて比較する。比較用にそのまま残している）。"""
+    if not first_name or not last_name:
+        return None
+    first = _normalize_token(first_name)
+    last = _normalize_token(last_name)
+    if not first or not last:
+        return None
+    normalized_local = local.lower()
+    for pattern, builder in PATTERN_BUILDERS.items():
+        if builder(first, last) == normalized_local:
+            return pattern
+    return None
+
+
+def _legacy_guess(local: str, contacts: list[tuple[int, str, str]]) -> Optional[int]:
+    """逆引き導入前の _guess_contact_id（会社の担当者全員について 13 パターンを組み立てる）。"""
+    matches: list[int] = []
+    for contact_id, first_name, last_name in contacts:
+        if _legacy_infer_pattern(local, first_name, last_name) is not None:
+            matches.append(contact_id)
+    return matches[0] if len(matches) == 1 else None
+
+
+def generate_emails(count: int, seed: int = DEFAULT_SEED) -> list[Email]:
+    """氏名と、いずれかのパターン（2 割は一致しない local-part）で作ったメールを count 件作る。"""
+    rng = random.Random(seed)
+    patterns = list(PATTERN_BUILDERS.values())
+    emails: list[Email] = []
+    for i in range(count):
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        if rng.random() < 0.2:
+            local = f"info{i % 100}"
+        else:
+            local = rng.choice(patterns)(first, last)
+        emails.append((local, first.capitalize(), last.capitalize()))
+    return emails
+
+
+def _time(fn: Callable[[], list[object]]) -> tuple[float, list[object]]:
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def run(args: Args) -> list[str]:
+    """
+    infer_pattern と、会社内の担当者からの照合（_guess_contact_id 相当）を
+    従来の全パターン組み立てと逆引きで比較する。結果が一致しない場合は AssertionError。
+    """
+    emails = generate_emails(args.emails, args.seed)
+    rng = random.Random(args.seed)
+    contacts = [
+        (i, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES))
+        for i in range(args.contacts_per_company)
+    ]
+
+    lines: list[str] = []
+    legacy_sec, legacy = _time(lambda: [_legacy_infer_pattern(*email) for email in emails])
+    pattern_index.cache_clear()
+    indexed_sec, indexed = _time(lambda: [infer_pattern(*email) for email in emails])
+    if legacy != indexed:
+        raise AssertionError("infer_pattern: reverse index differs from legacy builders")
+    lines.append(
+        f"{'infer_pattern':<14} n={len(emails)} legacy={len(emails) / legacy_sec:,.0f} rows/s "
+        f"index={len(emails) / indexed_sec:,.0f} rows/s speedup={legacy_sec / indexed_sec:.1f}x"
+    )
+
+    # 照合は 1 社分の担当者に対して行う。legacy は担当者数に比例するので件数を絞る
+    locals_ = [local for local, _, _ in emails]
+    sample = locals_[: max(1, len(locals_) // 10)]
+    legacy_sec, legacy = _time(lambda: [_legacy_guess(local, contacts) for local in sample])
+
+    def _indexed_guess() -> list[object]:
+        index: LocalPartIndex[int] = LocalPartIndex()
+        for contact_id, first_name, last_name in contacts:
+            index.add(contact_id, first_name, last_name)
+        results: list[object] = []
+        for local in sample:
+            owners = index.lookup(local)
+            results.append(next(iter(owners)) if len(owners) == 1 else None)
+        return results
+
+    indexed_sec, indexed = _time(_indexed_guess)
+    if legacy != indexed:
+        raise AssertionError("guess_contact_id: reverse index differs from legacy builders")
+    lines.append(
+        f"{'guess_contact':<14} n={len(sample)} contacts={len(contacts)} "
+        f"legacy={len(sample) / legacy_sec:,.0f} rows/s "
+        f"index={len(sample) / indexed_sec:,.0f} rows/s speedup={legacy_sec / indexed_sec:.1f}x"
+    )
+    return lines
+
+
+def _parse_args() -> Args:
+    parser = argparse.ArgumentParser(
+        description="Benchmark reverse-lookup pattern inference against building every pattern."
+    )
+    parser.add_argument("--emails", type=int, default=DEFAULT_EMAILS)
+    parser.add_argument(
+        "--contacts-per-company", type=int, default=DEFAULT_CONTACTS_PER_COMPANY
+    )
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    return TypeAdapter(Args).validate_python(vars(parser.parse_args()))
+
+
+def main() -> None:
+    for line in run(_parse_args()):
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
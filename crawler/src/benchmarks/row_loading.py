@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import time
+from typing import Callable, Iterable
+
+from pydantic import BaseModel, TypeAdapter
+
+from src.enrich_company import iter_companies
+from src.enrich_contact import iter_contacts
+from src.enrich_domain import load_domains
+
+DEFAULT_ROWS = 1_000_000
+
+
+class Args(BaseModel):
+    rows: int = DEFAULT_ROWS
+
+
+def _build_db(rows: int) -> sqlite3.Connection:
+    """companies / domains / contacts に rows 件ずつ合成データを入れたメモリ DB を作る。"""
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.executescript(
+        """
+        CREATE TABLE companies (
+          id TEXT PRIMARY KEY, name TEXT NOT NULL, website_url TEXT, logo_url TEXT,
+          description TEXT, industry TEXT, city TEXT, employee_range TEXT,
+          primary_domain_id INTEGER, created_at INTEGER NOT NULL, updated_at INTEGER NOT NULL
+        );
+        CREATE TABLE domains (
+          id INTEGER PRIMARY KEY, company_id TEXT NOT NULL, domain TEXT NOT NULL,
+          disposable INTEGER NOT NULL DEFAULT 0, webmail INTEGER NOT NULL DEFAULT 0,
+          accept_all INTEGER NOT NULL DEFAULT 0, pattern TEXT, first_seen_at INTEGER,
+          last_seen_at INTEGER, created_at INTEGER NOT NULL, updated_at INTEGER NOT NULL
+        );
+        CREATE TABLE contacts (
+          id TEXT PRIMARY KEY, company_id TEXT NOT NULL, full_name TEXT NOT NULL,
+          first_name TEXT, last_name TEXT, position TEXT, department TEXT,
+          department_category TEXT, position_category TEXT, seniority TEXT, city TEXT,
+          linkedin_url TEXT, twitter_url TEXT, phone_number TEXT, source_label TEXT,
+          source_url TEXT, first_seen_at INTEGER, last_seen_at INTEGER,
+          created_at INTEGER NOT NULL, updated_at INTEGER NOT NULL
+        );
+        """
+    )
+    now = int(time.time())
+    conn.executemany(
+        "INSERT INTO companies (id, name, website_url, city, created_at, updated_at) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            (f"c{i:07d}", f"株式会社サンプル{i}", f"https://example{i}.co.jp", "東京都", now, now)
+            for i in range(rows)
+        ),
+    )
+    conn.executemany(
+        "INSERT INTO domains (company_id, domain, pattern, created_at, updated_at) "
+        "VALUES (?, ?, ?, ?, ?)",
+        ((f"c{i:07d}", f"example{i}.co.jp", "first.last", now, now) for i in range(rows)),
+    )
+    conn.executemany(
+        "INSERT INTO contacts (id, company_id, full_name, first_name, last_name, position, "
+        "department, source_label, first_seen_at, last_seen_at, created_at, updated_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            (
+                f"p{i:07d}",
+                f"c{i % max(1, rows // 10):07d}",
+                "山田 太郎",
+                "太郎",
+                "山田",
+                "部長",
+                "営業部",
+                "benchmark",
+                now,
+                now,
+                now,
+                now,
+            )
+            for i in range(rows)
+        ),
+    )
+    conn.commit()
+    return conn
+
+
+def _time(load: Callable[[], Iterable[object]]) -> tuple[float, int]:
+    started = time.perf_counter()
+    count = sum(1 for _ in load())
+    return time.perf_counter() - started, count
+
+
+def run(args: Args) -> list[str]:
+    """iter_contacts / iter_companies / load_domains の軽量な行と Pydantic 検証を比較する。"""
+    conn = _build_db(args.rows)
+    cases: list[tuple[str, Callable[[bool], Iterable[object]]]] = [
+        ("contacts", lambda strict: iter_contacts(conn, only_missing=False, strict=strict)),
+        ("companies", lambda strict: iter_companies(conn, only_missing=False, strict=strict)),
+        ("domains", lambda strict: load_domains(conn, strict=strict).unwrap()),
+    ]
+    lines: list[str] = []
+    try:
+        for name, load in cases:
+            strict_sec, count = _time(lambda: load(True))
+            fast_sec, _ = _time(lambda: load(False))
+            lines.append(
+                f"{name:<10} n={count} strict={count / strict_sec:,.0f} rows/s "
+                f"fast={count / fast_sec:,.0f} rows/s speedup={strict_sec / fast_sec:.1f}x"
+            )
+    finally:
+        conn.close()
+    return lines
+
+
+def _parse_args() -> Args:
+    parser = argparse.ArgumentParser(
+        description="Benchmark lightweight row loading against per-row Pydantic validation."
+    )
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS)
+    return TypeAdapter(Args).validate_python(vars(parser.parse_args()))
+
+
+def main() -> None:
+    for line in run(_parse_args()):
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import sqlite3
+
+from src.result import Result
+
+# (dimension, contacts のカラム)。集計する軸を増やすときはここに足し、トリガーを作り直す
+STAT_DIMENSIONS: tuple[tuple[str, str], ...] = (
+    ("department", "department_category"),
+    ("position", "position_category"),
+    ("seniority", "seniority"),
+)
+# カテゴリ未設定（NULL）の担当者はこの値で数える
+UNCATEGORIZED = ""
+
+
+def _increment_sql(row: str, dimension: str, column: str) -> str:
+    return f"""
+      INSERT INTO company_contact_stats (company_id, dimension, category, contact_count)
+      VALUES ({row}.company_id, '{dimension}', COALESCE({row}.{column}, '{UNCATEGORIZED}'), 1)
+      ON CONFLICT(company_id, dimension, category)
+        DO UPDATE SET contact_count = contact_count + 1;"""
+
+
+def _decrement_sql(row: str, dimension: str, column: str) -> str:
+    key = (
+        f"company_id = {row}.company_id AND dimension = '{dimension}' "
+        f"AND category = COALESCE({row}.{column}, '{UNCATEGORIZED}')"
+    )
+    return f"""
+      UPDATE company_contact_stats SET contact_count = contact_count - 1 WHERE {key};
+      DELETE FROM company_contact_stats WHERE {key} AND contact_count <= 0;"""
+
+
+def _trigger_statements() -> list[str]:
+    """contacts の INSERT / DELETE / UPDATE を company_contact_stats に反映するトリガー。"""
+    inserts = "".join(_increment_sql("NEW", dim, col) for dim, col in STAT_DIMENSIONS)
+    deletes = "".join(_decrement_sql("OLD", dim, col) for dim, col in STAT_DIMENSIONS)
+    statements = [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_contacts_stats_insert AFTER INSERT ON contacts
+        BEGIN{inserts}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_contacts_stats_delete AFTER DELETE ON contacts
+        BEGIN{deletes}
+        END
+        """,
+    ]
+    # 軸ごとに分け、その軸のカテゴリか company_id が変わった行でだけ発火させる
+    for dimension, column in STAT_DIMENSIONS:
+        body = _decrement_sql("OLD", dimension, column) + _increment_sql("NEW", dimension, column)
+        statements.append(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_contacts_stats_update_{dimension}
+            AFTER UPDATE OF company_id, {column} ON contacts
+            WHEN OLD.company_id IS NOT NEW.company_id OR OLD.{column} IS NOT NEW.{column}
+            BEGIN{body}
+            END
+            """
+        )
+    return statements
+
+
+def _trigger_names() -> list[str]:
+    return [
+        "trg_contacts_stats_insert",
+        "trg_contacts_stats_delete",
+        *(f"trg_contacts_stats_update_{dimension}" for dimension, _ in STAT_DIMENSIONS),
+    ]
+
+
+def _recount(conn: sqlite3.Connection, company_filter: str | None = None) -> int:
+    """
+    contacts を GROUP BY して集計行を入れ直す。company_filter（company_id の SELECT）を
+    渡すとその会社だけを対象にする（idx_contacts_company_id を使う）。
+    """
+    where = f"WHERE company_id IN ({company_filter})" if company_filter else ""
+    conn.execute(f"DELETE FROM company_contact_stats {where}")
+    inserted = 0
+    for dimension, column in STAT_DIMENSIONS:
+        cursor = conn.execute(
+            f"""
+            INSERT INTO company_contact_stats (company_id, dimension, category, contact_count)
+            SELECT company_id, ?, COALESCE({column}, ?), COUNT(*)
+            FROM contacts
+            {where}
+            GROUP BY company_id, COALESCE({column}, ?)
+            """,
+            (dimension, UNCATEGORIZED, UNCATEGORIZED),
+        )
+        inserted += cursor.rowcount
+    return inserted
+
+
+def rebuild_company_contact_stats(conn: sqlite3.Connection) -> Result[int, Exception]:
+    """contacts を集計し直して company_contact_stats を作り直す。作成した行数を返す。"""
+    try:
+        inserted = _recount(conn)
+        conn.commit()
+        return Result.ok(inserted)
+    except Exception as exc:
+        conn.rollback()
+        return Result.err(exc)
+
+
+def execute_bulk_contact_update(
+    conn: sqlite3.Connection, sql: str, params: tuple[object, ...], target_where: str
+) -> sqlite3.Cursor:
+    """
+    contacts への一括 UPDATE（sql）を、行ごとのトリガーを止めて実行し、
+    target_where に当たる行の会社だけを集計し直す。
+    トリガーの削除から再作成までを 1 つの書き込みトランザクションで行うので、
+    他の接続の書き込みは必ずトリガーがある状態で走る。commit / rollback は呼び出し側で行う。
+    集計表がまだ無い DB では sql をそのまま実行する。
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'company_contact_stats'"
+    ).fetchone()
+    if not exists:
+        return conn.execute(sql, params)
+
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    conn.execute("DROP TABLE IF EXISTS temp.company_contact_stats_touched")
+    conn.execute(
+        "CREATE TEMP TABLE company_contact_stats_touched AS "
+        f"SELECT DISTINCT company_id FROM contacts WHERE {target_where}"
+    )
+    for name in _trigger_names():
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    cursor = conn.execute(sql, params)
+    touched = conn.execute("SELECT COUNT(*) FROM temp.company_contact_stats_touched").fetchone()[0]
+    companies = conn.execute(
+        "SELECT COUNT(*) FROM (SELECT DISTINCT company_id FROM company_contact_stats)"
+    ).fetchone()[0]
+    # 大半の会社に触れたなら、索引を引いて会社ごとに数えるより全件を 1 回なめる方が速い
+    if touched * 2 >= companies:
+        _recount(conn)
+    else:
+        _recount(conn, "SELECT company_id FROM temp.company_contact_stats_touched")
+    for statement in _trigger_statements():
+        conn.execute(statement)
+    conn.execute("DROP TABLE temp.company_contact_stats_touched")
+    return cursor
+
+
+def ensure_company_contact_stats(conn: sqlite3.Connection) -> Result[None, Exception]:
+    """
+    会社ごと・軸（department / position / seniority）ごとの担当者数の集計表と、
+    それを contacts の変更に追従させるトリガーを作成する。
+    表を新しく作ったときは既存の contacts から集計して埋める（以降はトリガーが差分を反映）。
+    contacts に department_category / position_category / seniority がある状態で呼ぶこと。
+    """
+    try:
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'company_contact_stats'"
+        ).fetchone()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS company_contact_stats (
+              company_id TEXT NOT NULL,
+              dimension TEXT NOT NULL,
+              category TEXT NOT NULL,
+              contact_count INTEGER NOT NULL DEFAULT 0,
+              PRIMARY KEY (company_id, dimension, category)
+            ) WITHOUT ROWID
+            """
+        )
+        # 会社単位の数え直し（execute_bulk_contact_update）で使う。web 側のスキーマと同名
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_contacts_company_id ON contacts (company_id)")
+        for statement in _trigger_statements():
+            conn.execute(statement)
+        conn.commit()
+    except Exception as exc:
+        conn.rollback()
+        return Result.err(exc)
+
+    if exists:
+        return Result.ok(None)
+    rebuild_result = rebuild_company_contact_stats(conn)
+    if rebuild_result.is_err():
+        return Result.err(rebuild_result.unwrap_err())
+    return Result.ok(None)
+
+
+def get_company_contact_stats(
+    conn: sqlite3.Connection, company_id: str
+) -> Result[dict[str, dict[str, int]], Exception]:
+    """company_id の {dimension: {category: 担当者数}} を返す（未分類は UNCATEGORIZED）。"""
+    try:
+        rows = conn.execute(
+            "SELECT dimension, category, contact_count FROM company_contact_stats "
+            "WHERE company_id = ? ORDER BY dimension, contact_count DESC, category",
+            (company_id,),
+        ).fetchall()
+    except Exception as exc:
+        return Result.err(exc)
+    stats: dict[str, dict[str, int]] = {}
+    for dimension, category, count in rows:
+        stats.setdefault(dimension, {})[category] = int(count)
+    return Result.ok(stats)
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from pydantic import BaseModel, TypeAdapter
+
+from src.result import Result
+
+DEFAULT_DB_PATH = Path(__file__).resolve().parents[2] / "data" / "jordan.sqlite"
+
+# 個人向けのフリーメール・キャリアメール。会社のドメインではないので票や候補に使わない
+WEBMAIL_DOMAINS: frozenset[str] = frozenset(
+    {
+        # 国内
+        "yahoo.co.jp", "hotmail.co.jp", "outlook.jp", "live.jp",
+        "docomo.ne.jp", "ezweb.ne.jp", "au.com", "softbank.ne.jp", "i.softbank.jp",
+        "disney.ne.jp", "ymobile.ne.jp", "y-mobile.ne.jp", "willcom.com", "rakuten.jp",
+        "nifty.com", "nifty.ne.jp", "biglobe.ne.jp", "so-net.ne.jp", "ocn.ne.jp",
+        "plala.or.jp", "odn.ne.jp", "dion.ne.jp", "excite.co.jp", "livedoor.com",
+        "infoseek.jp", "goo.jp", "mail.goo.ne.jp",
+        # 海外
+        "gmail.com", "googlemail.com", "yahoo.com", "yahoo.co.uk", "yahoo.fr", "yahoo.de",
+        "ymail.com", "rocketmail.com", "hotmail.com", "hotmail.co.uk", "hotmail.fr",
+        "outlook.com", "live.com", "msn.com", "passport.com", "icloud.com", "me.com",
+        "mac.com", "aol.com", "aim.com", "protonmail.com", "protonmail.ch", "proton.me",
+        "pm.me", "tutanota.com", "tuta.io", "fastmail.com", "fastmail.fm", "hushmail.com",
+        "zoho.com", "zohomail.com", "gmx.com", "gmx.net", "gmx.de", "web.de",
+        "t-online.de", "mail.com", "email.com", "yandex.com", "yandex.ru", "mail.ru",
+        "inbox.ru", "bk.ru", "list.ru", "rambler.ru", "orange.fr", "free.fr", "laposte.net",
+        "libero.it", "virgilio.it", "qq.com", "foxmail.com", "163.com", "126.com",
+        "yeah.net", "sina.com", "sohu.com", "naver.com", "daum.net", "hanmail.net",
+        "rediffmail.com", "comcast.net", "verizon.net", "att.net", "sbcglobal.net",
+        "bellsouth.net", "cox.net", "btinternet.com", "sky.com", "shaw.ca", "rogers.com",
+        "bigpond.com", "optusnet.com.au", "seznam.cz", "wp.pl", "o2.pl", "interia.pl",
+    }
+)  # fmt: skip
+
+# 使い捨て（一時）メールのサービス
+DISPOSABLE_DOMAINS: frozenset[str] = frozenset(
+    {
+        "mailinator.com", "mailinator.net", "guerrillamail.com", "guerrillamail.net",
+        "guerrillamail.org", "guerrillamailblock.com", "sharklasers.com", "grr.la",
+        "10minutemail.com", "10minutemail.net", "20minutemail.com", "temp-mail.org",
+        "temp-mail.io", "tempmail.com", "tempmail.net", "tempmailo.com", "tempr.email",
+        "tmpmail.org", "tmpmail.net", "yopmail.com", "yopmail.fr", "yopmail.net",
+        "trashmail.com", "trashmail.de", "trash-mail.com", "dispostable.com", "getnada.com",
+        "nada.email", "maildrop.cc", "throwawaymail.com", "fakeinbox.com", "mintemail.com",
+        "mohmal.com", "emailondeck.com", "mailnesia.com", "spamgourmet.com", "moakt.com",
+        "discard.email", "burnermail.io", "33mail.com", "mailcatch.com", "spambox.us",
+        "mytemp.email", "1secmail.com", "1secmail.net", "emailfake.com", "fakemail.net",
+        "getairmail.com", "mailpoof.com", "mvrht.com", "owlymail.com", "spam4.me",
+        "inboxkitten.com", "harakirimail.com", "jetable.org", "mailtemp.info", "minuteinbox.com",
+        "linshiyouxiang.net", "dropmail.me", "emltmp.com", "tempail.com", "mail.tm",
+        "sute.jp", "kuku.lu", "meruado.uk", "fuwamofu.com", "eay.jp",
+    }
+)  # fmt: skip
+
+
+class Args(BaseModel):
+    db: Path = DEFAULT_DB_PATH
+
+
+@dataclass(frozen=True)
+class DomainClass:
+    webmail: bool = False
+    disposable: bool = False
+
+    @property
+    def flagged(self) -> bool:
+        """会社のドメインとして扱わない（Web メールか使い捨て）なら True。"""
+        return self.webmail or self.disposable
+
+
+def _suffixes(domain: str) -> list[str]:
+    """"mail.example.co.jp" -> ["mail.example.co.jp", "example.co.jp", "co.jp", "jp"]"""
+    labels = domain.split(".")
+    return [".".join(labels[index:]) for index in range(len(labels))]
+
+
+def classify_domain(domain: Optional[str]) -> DomainClass:
+    """
+    ドメイン（メールアドレスでもよい）を同梱のリストで判定する。
+    リストのドメインのサブドメイン（例: xxx.mailinator.com）も同じ扱い。
+    """
+    value = (domain or "").strip().lower().rsplit("@", 1)[-1].rstrip(".")
+    if not value:
+        return DomainClass()
+    suffixes = _suffixes(value)
+    return DomainClass(
+        webmail=not WEBMAIL_DOMAINS.isdisjoint(suffixes),
+        disposable=not DISPOSABLE_DOMAINS.isdisjoint(suffixes),
+    )
+
+
+def classify_domains(conn: sqlite3.Connection) -> Result[int, Exception]:
+    """
+    全ドメインの domains.webmail / domains.disposable を同梱のリストで付け直す。
+    値が変わった行数を返す（同じ値の行は updated_at も触らない）。
+    """
+    now = int(time.time())
+    try:
+        updates = []
+        for domain_id, domain in conn.execute("SELECT id, domain FROM domains").fetchall():
+            kind = classify_domain(domain)
+            webmail, disposable = int(kind.webmail), int(kind.disposable)
+            updates.append((webmail, disposable, now, domain_id, webmail, disposable))
+        cursor = conn.executemany(
+            "UPDATE domains SET webmail = ?, disposable = ?, updated_at = ? "
+            "WHERE id = ? AND (webmail IS NOT ? OR disposable IS NOT ?)",
+            updates,
+        )
+        conn.commit()
+        return Result.ok(cursor.rowcount)
+    except Exception as exc:
+        conn.rollback()
+        return Result.err(exc)
+
+
+def _parse_args() -> Args:
+    parser = argparse.ArgumentParser(
+        description="Flag webmail and disposable domains using the bundled domain lists."
+    )
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH, help="Path to SQLite DB")
+    return TypeAdapter(Args).validate_python(vars(parser.parse_args()))
+
+
+def main() -> None:
+    args = _parse_args()
+    conn = sqlite3.connect(args.db)
+    try:
+        result = classify_domains(conn)
+    finally:
+        conn.close()
+    if result.is_err():
+        raise SystemExit(f"[domain_classifier] {result.unwrap_err()}")
+    print(f"Reclassified {result.unwrap()} domains.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import sqlite3
+import time
+from typing import Iterable, Optional
+
+from src.result import Result
+
+# 検証結果のステータス（小文字）ごとに加算するカラム。それ以外（Unverifiable 等）は数えない
+_STATUS_COLUMNS = {"ok": "ok_count", "bad": "bad_count"}
+
+
+def ensure_domain_pattern_votes_table(conn: sqlite3.Connection) -> Result[None, Exception]:
+    """ドメインごと・パターンごとの検証済みメール数を持つ domain_pattern_votes を作成する。"""
+    try:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS domain_pattern_votes (
+              domain_id INTEGER NOT NULL,
+              pattern TEXT NOT NULL,
+              ok_count INTEGER NOT NULL DEFAULT 0,
+              bad_count INTEGER NOT NULL DEFAULT 0,
+              updated_at INTEGER NOT NULL,
+              PRIMARY KEY (domain_id, pattern)
+            ) WITHOUT ROWID
+            """
+        )
+        conn.commit()
+        return Result.ok(None)
+    except Exception as exc:
+        return Result.err(exc)
+
+
+def record_pattern_vote(
+    conn: sqlite3.Connection, domain_id: int, pattern: str, status: Optional[str]
+) -> Result[bool, Exception]:
+    """
+    検証済みメール 1 件分の票を加算する（Ok は ok_count、Bad は bad_count）。
+    数えないステータスなら False。
+    メールの INSERT と同じトランザクションで呼び、commit は呼び出し側で行う。
+    """
+    column = _STATUS_COLUMNS.get((status or "").strip().lower())
+    if column is None:
+        return Result.ok(False)
+    try:
+        conn.execute(
+            f"""
+            INSERT INTO domain_pattern_votes (domain_id, pattern, {column}, updated_at)
+            VALUES (?, ?, 1, ?)
+            ON CONFLICT(domain_id, pattern) DO UPDATE SET
+              {column} = {column} + 1,
+              updated_at = excluded.updated_at
+            """,
+            (domain_id, pattern, int(time.time())),
+        )
+        return Result.ok(True)
+    except Exception as exc:
+        return Result.err(exc)
+
+
+def replace_pattern_votes(
+    conn: sqlite3.Connection, votes: Iterable[tuple[int, str, int, int]]
+) -> Result[int, Exception]:
+    """表の中身を votes（[(domain_id, pattern, ok_count, bad_count), ...]）で置き換える。"""
+    now = int(time.time())
+    try:
+        conn.execute("DELETE FROM domain_pattern_votes")
+        cursor = conn.executemany(
+            "INSERT INTO domain_pattern_votes "
+            "(domain_id, pattern, ok_count, bad_count, updated_at) VALUES (?, ?, ?, ?, ?)",
+            ((domain_id, pattern, ok, bad, now) for domain_id, pattern, ok, bad in votes),
+        )
+        conn.commit()
+        return Result.ok(cursor.rowcount)
+    except Exception as exc:
+        conn.rollback()
+        return Result.err(exc)
+
+
+def load_vote_winners(conn: sqlite3.Connection) -> Result[dict[str, str], Exception]:
+    """
+    ドメインごとに ok_count が最大のパターンを返す（{str(domain_id): pattern}）。
+    従来の多数決と同じく、Ok が 1 件も無いドメインと最多が同数で並ぶドメインは含めない。
+    """
+    try:
+        cursor = conn.execute(
+            """
+            SELECT domain_id, pattern, ok_count
+            FROM domain_pattern_votes
+            WHERE ok_count > 0
+            ORDER BY domain_id, ok_count DESC
+            """
+        )
+        winners: dict[str, str] = {}
+        current: Optional[int] = None
+        top_count = 0
+        tied = False
+        for domain_id, pattern, ok_count in cursor:
+            if domain_id != current:
+                current, top_count, tied = domain_id, ok_count, False
+                winners[str(domain_id)] = pattern
+            elif ok_count == top_count and not tied:
+                tied = True
+                del winners[str(domain_id)]
+        return Result.ok(winners)
+    except Exception as exc:
+        return Result.err(exc)
+
+
+def load_vote_counts(
+    conn: sqlite3.Connection,
+) -> Result[dict[int, tuple[dict[str, int], dict[str, int]]], Exception]:
+    """{domain_id: ({pattern: ok_count}, {pattern: bad_count})} を返す。"""
+    try:
+        counts: dict[int, tuple[dict[str, int], dict[str, int]]] = {}
+        cursor = conn.execute(
+            "SELECT domain_id, pattern, ok_count, bad_count FROM domain_pattern_votes"
+        )
+        for domain_id, pattern, ok_count, bad_count in cursor:
+            ok, bad = counts.setdefault(int(domain_id), ({}, {}))
+            ok[pattern] = int(ok_count)
+            bad[pattern] = int(bad_count)
+        return Result.ok(counts)
+    except Exception as exc:
+        return Result.err(exc)
+
+
+def load_verified_patterns(conn: sqlite3.Connection) -> Result[dict[str, set[str]], Exception]:
+    """
+    Ok が 1 件以上あり Bad が 1 件も無いパターンを {str(domain_id): パターンの集合} で返す。
+    表が無ければ空。
+    """
+    try:
+        cursor = conn.execute(
+            "SELECT domain_id, pattern FROM domain_pattern_votes "
+            "WHERE ok_count > 0 AND bad_count = 0"
+        )
+    except sqlite3.OperationalError:
+        return Result.ok({})
+    except Exception as exc:
+        return Result.err(exc)
+    verified: dict[str, set[str]] = {}
+    for domain_id, pattern in cursor:
+        verified.setdefault(str(domain_id), set()).add(pattern)
+    return Result.ok(verified)
+
+
+def ensure_domain_pattern_ranks_table(conn: sqlite3.Connection) -> Result[None, Exception]:
+    """ドメインごとのパターンの順位と事後確率を持つ domain_pattern_ranks を作成する。"""
+    try:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS domain_pattern_ranks (
+              domain_id INTEGER NOT NULL,
+              rank INTEGER NOT NULL,
+              pattern TEXT NOT NULL,
+              confidence REAL NOT NULL,
+              updated_at INTEGER NOT NULL,
+              PRIMARY KEY (domain_id, rank)
+            ) WITHOUT ROWID
+            """
+        )
+        conn.commit()
+        return Result.ok(None)
+    except Exception as exc:
+        return Result.err(exc)
+
+
+def replace_pattern_ranks(
+    conn: sqlite3.Connection, ranks: Iterable[tuple[int, list[tuple[str, float]]]]
+) -> Result[int, Exception]:
+    """表の中身を ranks（[(domain_id, [(pattern, confidence), ...降順]), ...]）で置き換える。"""
+    now = int(time.time())
+    try:
+        conn.execute("DELETE FROM domain_pattern_ranks")
+        cursor = conn.executemany(
+            "INSERT INTO domain_pattern_ranks "
+            "(domain_id, rank, pattern, confidence, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (
+                (domain_id, rank, pattern, confidence, now)
+                for domain_id, ranked in ranks
+                for rank, (pattern, confidence) in enumerate(ranked, start=1)
+            ),
+        )
+        conn.commit()
+        return Result.ok(cursor.rowcount)
+    except Exception as exc:
+        conn.rollback()
+        return Result.err(exc)
+
+
+def load_pattern_ranks(
+    conn: sqlite3.Connection,
+) -> Result[dict[str, list[tuple[str, float]]], Exception]:
+    """{str(domain_id): [(pattern, confidence), ...順位順]} を返す。表が無ければ空。"""
+    try:
+        cursor = conn.execute(
+            "SELECT domain_id, pattern, confidence FROM domain_pattern_ranks "
+            "ORDER BY domain_id, rank"
+        )
+    except sqlite3.OperationalError:
+        # 票を集計していない DB でもエクスポートできるようにする
+        return Result.ok({})
+    except Exception as exc:
+        return Result.err(exc)
+    ranks: dict[str, list[tuple[str, float]]] = {}
+    for domain_id, pattern, confidence in cursor:
+        ranks.setdefault(str(domain_id), []).append((pattern, float(confidence)))
+    return Result.ok(ranks)
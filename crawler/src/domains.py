@@ -1,7 +1,8 @@
 from __future__ import annotations
 
+from dataclasses import dataclass, fields
 from datetime import datetime
-from typing import Literal, Optional
+from typing import Any, ClassVar, Literal, Optional, Sequence
 
 from pydantic import BaseModel, ConfigDict
 
@@ -87,3 +88,105 @@ class Email(JordanBaseModel):
     last_seen_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
+
+
+# 一括処理用の軽量な行。DB から読んだ行を検証せずにそのまま詰める（属性名はモデルと同じなので
+# Enricher にはどちらも渡せる）。日時は UNIX 秒のまま持ち、検証は to_model() / --strict で行う。
+
+
+@dataclass(slots=True)
+class CompanyRow:
+    id: str
+    name: str
+    website_url: Optional[str]
+    logo_url: Optional[str]
+    description: Optional[str]
+    industry: Optional[str]
+    city: Optional[str]
+    employee_range: Optional[str]
+    primary_domain_id: Optional[int]
+    created_at: Any
+    updated_at: Any
+
+    COLUMNS: ClassVar[tuple[str, ...]]
+
+    @classmethod
+    def from_tuple(cls, row: Sequence[Any]) -> "CompanyRow":
+        return cls(str(row[0]), *row[1:])
+
+    def to_model(self) -> Company:
+        return Company.model_validate(_row_to_dict(self))
+
+
+@dataclass(slots=True)
+class DomainRow:
+    id: str
+    company_id: str
+    domain: str
+    disposable: bool
+    webmail: bool
+    accept_all: bool
+    pattern: Optional[str]
+    first_seen_at: Any
+    last_seen_at: Any
+    created_at: Any
+    updated_at: Any
+
+    COLUMNS: ClassVar[tuple[str, ...]]
+
+    @classmethod
+    def from_tuple(cls, row: Sequence[Any]) -> "DomainRow":
+        return cls(
+            str(row[0]),
+            str(row[1]),
+            row[2],
+            bool(row[3]),
+            bool(row[4]),
+            bool(row[5]),
+            *row[6:],
+        )
+
+    def to_model(self) -> Domain:
+        return Domain.model_validate(_row_to_dict(self))
+
+
+@dataclass(slots=True)
+class ContactRow:
+    id: str
+    company_id: str
+    full_name: str
+    first_name: Optional[str]
+    last_name: Optional[str]
+    position: Optional[str]
+    department: Optional[str]
+    department_category: Optional[str]
+    position_category: Optional[str]
+    seniority: Optional[str]
+    city: Optional[str]
+    linkedin_url: Optional[str]
+    twitter_url: Optional[str]
+    phone_number: Optional[str]
+    source_label: Optional[str]
+    source_url: Optional[str]
+    first_seen_at: Any
+    last_seen_at: Any
+    created_at: Any
+    updated_at: Any
+
+    COLUMNS: ClassVar[tuple[str, ...]]
+
+    @classmethod
+    def from_tuple(cls, row: Sequence[Any]) -> "ContactRow":
+        return cls(str(row[0]), str(row[1]), *row[2:])
+
+    def to_model(self) -> Contact:
+        return Contact.model_validate(_row_to_dict(self))
+
+
+def _row_to_dict(row: CompanyRow | DomainRow | ContactRow) -> dict[str, Any]:
+    return {name: getattr(row, name) for name in type(row).COLUMNS}
+
+
+# SELECT の列順は dataclass のフィールド順と一致させる
+for _row_type in (CompanyRow, DomainRow, ContactRow):
+    _row_type.COLUMNS = tuple(f.name for f in fields(_row_type))
@@ -8,7 +8,7 @@ import httpx
 from pydantic import BaseModel, TypeAdapter
 from tqdm import tqdm
 
-from src.domains import Company
+from src.domains import Company, CompanyRow
 from src.enrichers.company import CompanyEnricher
 from src.result import Result
 
@@ -43,11 +43,12 @@ def ensure_industry_column(conn: sqlite3.Connection) -> Result[None, Exception]:
 
 
 def iter_companies(
-    conn: sqlite3.Connection, only_missing: bool = True
-) -> Iterable[Company]:
+    conn: sqlite3.Connection, only_missing: bool = True, *, strict: bool = False
+) -> Iterable[CompanyRow | Company]:
     """
     website_url があり、logo_url / industry / description が未設定の企業を逐次返す。
     recompute_all の場合は website_url がある全件を返す。
+    既定では検証なしの CompanyRow を返し、strict=True なら Company として検証する。
     """
     where_clause = (
         """
@@ -65,27 +66,22 @@ def iter_companies(
           AND TRIM(website_url) != ''
         """
     )
-    cursor = conn.execute(
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    cursor.execute(
         """
-        SELECT
-            id,
-            name,
-            website_url,
-            logo_url,
-            description,
-            industry,
-            city,
-            employee_range,
-            primary_domain_id,
-            created_at,
-            updated_at
+        SELECT {columns}
         FROM companies
         WHERE {where_clause}
         ORDER BY id
-        """.format(where_clause=where_clause)
+        """.format(columns=", ".join(CompanyRow.COLUMNS), where_clause=where_clause)
     )
-    for row in cursor:
-        yield Company.model_validate(dict(row))
+    if strict:
+        for row in cursor:
+            yield CompanyRow.from_tuple(row).to_model()
+    else:
+        for row in cursor:
+            yield CompanyRow.from_tuple(row)
 
 
 def count_pending(conn: sqlite3.Connection, only_missing: bool = True) -> int:
@@ -200,7 +196,10 @@ async def _writer(
 
 
 async def run_async(
-    db_path: Path, recompute_all: bool = False, concurrency: int = DEFAULT_CONCURRENCY
+    db_path: Path,
+    recompute_all: bool = False,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    strict: bool = False,
 ) -> Result[int, Exception]:
     """
     DB から企業を取得し、favicon / meta description / 業種を並列で探索して DB にバッチ書き戻しする。
@@ -222,7 +221,7 @@ async def run_async(
 
     try:
         only_missing = not recompute_all
-        companies = list(iter_companies(conn, only_missing=only_missing))
+        companies = list(iter_companies(conn, only_missing=only_missing, strict=strict))
         total = len(companies)
         if total == 0:
             return Result.ok(0)
@@ -256,7 +255,7 @@ async def run_async(
                 progress = tqdm(total=total, desc="enriching companies")
 
                 async def _process_company(
-                    company: Company,
+                    company: CompanyRow | Company,
                 ) -> Result[UpdatePayload | None, Exception]:
                     async with semaphore:
                         try:
@@ -314,15 +313,16 @@ async def run_async(
 
 
 def run(
-    db_path: Path, recompute_all: bool = False
+    db_path: Path, recompute_all: bool = False, strict: bool = False
 ) -> Result[int, Exception]:
     """同期 API として async 実装をラップする。"""
-    return asyncio.run(run_async(db_path, recompute_all=recompute_all))
+    return asyncio.run(run_async(db_path, recompute_all=recompute_all, strict=strict))
 
 
 class Args(BaseModel):
     db: Path = DEFAULT_DB_PATH
     recompute_all: bool = False
+    strict: bool = False
 
 
 class UpdatePayload(BaseModel):
@@ -355,6 +355,11 @@ def _parse_args() -> Args:
             "（デフォルトは未設定のみ更新）。"
         ),
     )
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="各行を Pydantic の Company として検証します（遅いが型を保証）。",
+    )
     parsed_args = parser.parse_args()
     return TypeAdapter(Args).validate_python(vars(parsed_args))
 
@@ -362,7 +367,7 @@ def _parse_args() -> Args:
 def main() -> None:
     args = _parse_args()
 
-    result = run(args.db, recompute_all=args.recompute_all)
+    result = run(args.db, recompute_all=args.recompute_all, strict=args.strict)
     if result.is_err():
         error = result.unwrap_err()
         print(f"Error: {error}")
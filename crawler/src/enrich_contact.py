@@ -1,18 +1,44 @@
 import argparse
+import multiprocessing
 import sqlite3
-import time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Literal
 
 from pydantic import BaseModel, TypeAdapter
 from tqdm import tqdm
 
-from src.domains import Contact
-from src.enrichers.contact import ContactEnricher
+from src.company_contact_stats import (
+    ensure_company_contact_stats,
+    execute_bulk_contact_update,
+)
+from src.domains import Contact, ContactRow
+from src.enrichers.contact import (
+    CLASSIFIER_VERSION,
+    DEPARTMENT_SQL_FUNCTION,
+    POSITION_SQL_FUNCTION,
+    SENIORITY_SQL_FUNCTION,
+    ContactEnricher,
+    classify_department_category,
+    classify_position_category,
+    classify_seniority,
+    register_sqlite_functions,
+)
+from src.job_watermarks import ensure_job_watermarks_table, get_watermark, set_watermark
 from src.result import Result
 
 DEFAULT_DB_PATH = Path(__file__).resolve().parents[2] / "data" / "jordan.sqlite"
 DEFAULT_BATCH_SIZE = 100
+WATERMARK_JOB = "enrich_contact"
+# --workers で 1 タスク（id 範囲）あたりに読む行数の目安。書き込みもこの単位で 1 コミット
+PARALLEL_CHUNK_ROWS = 50_000
+# --workers の書き込み接続がロック解除を待つ時間と、範囲 1 つの書き込みを試す回数
+WRITE_BUSY_TIMEOUT_MS = 30_000
+WRITE_ATTEMPTS = 3
+
+# rows: 1 行ずつ Contact にして分類 / distinct: 異なり値だけ分類して一時テーブルから反映 /
+# sql: SQLite に登録した分類関数で UPDATE 1 文
+Mode = Literal["rows", "distinct", "sql"]
 
 
 def ensure_department_category_column(conn: sqlite3.Connection) -> Result[None, Exception]:
@@ -39,39 +65,65 @@ def ensure_position_category_column(conn: sqlite3.Connection) -> Result[None, Ex
         return Result.err(exc)
 
 
-def count_targets(conn: sqlite3.Connection, only_missing: bool = True) -> int:
-    """分類対象件数を返す。"""
-    where_clause = (
-        """
-        (
-            department IS NOT NULL
-            AND TRIM(department) != ''
-            AND (department_category IS NULL OR TRIM(department_category) = '')
-        )
-        OR (
-            position IS NOT NULL
-            AND TRIM(position) != ''
-            AND (position_category IS NULL OR TRIM(position_category) = '')
-        )
-        """
-        if only_missing
-        else """
-        (
-            department IS NOT NULL AND TRIM(department) != ''
-        )
-        OR (
-            position IS NOT NULL AND TRIM(position) != ''
-        )
-        """
-    )
-    row = conn.execute(f"SELECT COUNT(*) AS cnt FROM contacts WHERE {where_clause}").fetchone()
-    return int(row["cnt"]) if row and "cnt" in row.keys() else 0
+def ensure_category_version_column(conn: sqlite3.Connection) -> Result[None, Exception]:
+    """category_version（分類に使ったルールのバージョン）カラムが存在しない場合は追加する。"""
+    try:
+        columns = conn.execute("PRAGMA table_info(contacts)").fetchall()
+        has_column = any(col[1] == "category_version" for col in columns)
+        if not has_column:
+            conn.execute("ALTER TABLE contacts ADD COLUMN category_version TEXT")
+        return Result.ok(None)
+    except Exception as exc:
+        return Result.err(exc)
 
 
-def iter_contacts(conn: sqlite3.Connection, only_missing: bool = True) -> Iterable[Contact]:
-    """department / position がありカテゴリ未設定の担当者を逐次返す。"""
-    where_clause = (
-        """
+def ensure_seniority_column(conn: sqlite3.Connection) -> Result[None, Exception]:
+    """seniority カラムと、絞り込み用の idx_contacts_seniority を作成する。"""
+    try:
+        columns = conn.execute("PRAGMA table_info(contacts)").fetchall()
+        has_column = any(col[1] == "seniority" for col in columns)
+        if not has_column:
+            conn.execute("ALTER TABLE contacts ADD COLUMN seniority TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_contacts_seniority ON contacts (seniority)")
+        conn.commit()
+        return Result.ok(None)
+    except Exception as exc:
+        return Result.err(exc)
+
+
+def ensure_updated_at_index(conn: sqlite3.Connection) -> Result[None, Exception]:
+    """差分実行で updated_at の範囲検索に使う索引を作成する。"""
+    try:
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_contacts_updated_at ON contacts (updated_at)")
+        conn.commit()
+        return Result.ok(None)
+    except Exception as exc:
+        return Result.err(exc)
+
+
+def _target_where_clause(
+    only_missing: bool = True, since: int | None = None, stale_version: str | None = None
+) -> str:
+    """
+    分類対象の contacts を絞り込む WHERE 句。
+    since を渡すと updated_at >= since の行だけに絞る（idx_contacts_updated_at の範囲検索になる）。
+    範囲内の行は部署・役職が編集されている可能性があるので、カテゴリの有無にかかわらず対象にする。
+    stale_version を渡すと category_version がそれと異なる（古いルールで分類された）行だけに絞る。
+    """
+    if since is not None:
+        clause = f"({_category_predicate(False)}) AND updated_at >= {int(since)}"
+    else:
+        clause = _category_predicate(only_missing)
+    if stale_version is not None:
+        if not stale_version.isalnum():
+            raise ValueError(f"invalid classifier version: {stale_version!r}")
+        clause = f"({clause}) AND category_version IS NOT '{stale_version}'"
+    return clause
+
+
+def _category_predicate(only_missing: bool) -> str:
+    if only_missing:
+        return """
         (
             department IS NOT NULL
             AND TRIM(department) != ''
@@ -80,11 +132,13 @@ def iter_contacts(conn: sqlite3.Connection, only_missing: bool = True) -> Iterab
         OR (
             position IS NOT NULL
             AND TRIM(position) != ''
-            AND (position_category IS NULL OR TRIM(position_category) = '')
+            AND (
+                position_category IS NULL OR TRIM(position_category) = ''
+                OR contacts.seniority IS NULL OR TRIM(contacts.seniority) = ''
+            )
         )
         """
-        if only_missing
-        else """
+    return """
         (
             department IS NOT NULL
             AND TRIM(department) != ''
@@ -94,56 +148,127 @@ def iter_contacts(conn: sqlite3.Connection, only_missing: bool = True) -> Iterab
             AND TRIM(position) != ''
         )
         """
-    )
-    cursor = conn.execute(
+
+
+def count_targets(
+    conn: sqlite3.Connection,
+    only_missing: bool = True,
+    since: int | None = None,
+    stale_version: str | None = None,
+) -> int:
+    """分類対象件数を返す。"""
+    where_clause = _target_where_clause(only_missing, since, stale_version)
+    row = conn.execute(f"SELECT COUNT(*) AS cnt FROM contacts WHERE {where_clause}").fetchone()
+    return int(row["cnt"]) if row and "cnt" in row.keys() else 0
+
+
+def iter_contacts(
+    conn: sqlite3.Connection,
+    only_missing: bool = True,
+    since: int | None = None,
+    stale_version: str | None = None,
+    *,
+    strict: bool = False,
+    id_range: tuple[str | None, str | None] = (None, None),
+) -> Iterable[ContactRow | Contact]:
+    """
+    department / position がありカテゴリ未設定の担当者を逐次返す。
+    既定では検証なしの ContactRow を返し、strict=True なら Contact として検証する。
+    id_range=(lo, hi) を渡すと lo <= id < hi の行だけに絞る（None はその側を制限しない）。
+    """
+    where_clause = f"({_target_where_clause(only_missing, since, stale_version)})"
+    params: list[str] = []
+    lo, hi = id_range
+    if lo is not None:
+        where_clause += " AND id >= ?"
+        params.append(lo)
+    if hi is not None:
+        where_clause += " AND id < ?"
+        params.append(hi)
+    cursor = conn.cursor()
+    # sqlite3.Row / dict を経由せず tuple のまま受け取る
+    cursor.row_factory = None
+    cursor.execute(
         f"""
-        SELECT
-            id,
-            company_id,
-            full_name,
-            first_name,
-            last_name,
-            position,
-            department,
-            department_category,
-            position_category,
-            seniority,
-            city,
-            linkedin_url,
-            twitter_url,
-            phone_number,
-            source_label,
-            source_url,
-            first_seen_at,
-            last_seen_at,
-            created_at,
-            updated_at
+        SELECT {", ".join(ContactRow.COLUMNS)}
         FROM contacts
         WHERE {where_clause}
         ORDER BY id
-        """
+        """,
+        params,
     )
-    for row in cursor:
-        item = dict(row)
-        # SQLite は TEXT カラムでも int を返すケースがあるため、明示的に文字列化する
-        item["id"] = str(row["id"])
-        item["company_id"] = str(row["company_id"])
-        yield Contact.model_validate(item)
+    # SQLite は TEXT カラムでも int を返すケースがあるため、id / company_id は from_tuple で str 化
+    if strict:
+        for row in cursor:
+            yield ContactRow.from_tuple(row).to_model()
+    else:
+        for row in cursor:
+            yield ContactRow.from_tuple(row)
+
+
+def _category_update(
+    enricher: ContactEnricher, contact: ContactRow | Contact, recompute_all: bool
+) -> Result[tuple[str | None, str | None, str | None, str] | None, Exception]:
+    """
+    1 件を分類し、update_categories_batch に渡す行を返す。書き込むものが無ければ None。
+    既存カテゴリが埋まっている場合は上書きしない（再計算モード除く）。
+    seniority は position_category を書く行で書くほか、position_category だけ埋まっていて
+    seniority が無い行（seniority を入れる前に分類した行）でも埋める。
+    """
+    original_dept_category = contact.department_category
+    original_pos_category = contact.position_category
+    original_seniority = contact.seniority
+
+    enriched_result = enricher.enrich(contact)
+    if enriched_result.is_err():
+        return Result.err(enriched_result.unwrap_err())
+
+    enriched = enriched_result.unwrap()
+    if not enriched.department_category and not enriched.position_category:
+        return Result.ok(None)
+
+    dept_value: str | None = None
+    pos_value: str | None = None
+    if recompute_all or not (original_dept_category and str(original_dept_category).strip()):
+        dept_value = enriched.department_category
+    if recompute_all or not (original_pos_category and str(original_pos_category).strip()):
+        pos_value = enriched.position_category
+    seniority_value: str | None = None
+    if pos_value is not None or not (original_seniority and str(original_seniority).strip()):
+        seniority_value = enriched.seniority
+    if dept_value is None and pos_value is None and seniority_value is None:
+        return Result.ok(None)
+    return Result.ok((dept_value, pos_value, seniority_value, enriched.id))
 
 
 def update_categories_batch(
     conn: sqlite3.Connection,
-    batch: list[tuple[str | None, str | None, str]],
+    batch: list[tuple[str | None, str | None, str | None, str]],
+    version: str | None = None,
 ) -> Result[None, Exception]:
     """
-    department_category / position_category をまとめて更新する。
-    batch: [(department_category, position_category, contact_id), ...]
+    department_category / position_category / seniority をまとめて更新する。
+    batch: [(department_category, position_category, seniority, contact_id), ...]
+    None のカテゴリは既存値を残す。seniority は position_category を書く行では空も含めて書き、
+    それ以外の行では None でなければ書く。
+    version を渡すと、両方のカテゴリを書いた行の category_version をそれにする。
+    updated_at は触らない（_category_set_clause と同じ）。
     """
     if not batch:
         return Result.ok(None)
 
-    now_ts = int(time.time())
-    payload = [(dept, pos, now_ts, contact_id) for dept, pos, contact_id in batch]
+    payload = [
+        (
+            dept,
+            pos,
+            pos,
+            seniority,
+            seniority,
+            version if dept is not None and pos is not None else None,
+            contact_id,
+        )
+        for dept, pos, seniority, contact_id in batch
+    ]
     try:
         conn.executemany(
             """
@@ -151,7 +276,8 @@ def update_categories_batch(
             SET
               department_category = COALESCE(?, department_category),
               position_category = COALESCE(?, position_category),
-              updated_at = ?
+              seniority = CASE WHEN ? IS NOT NULL OR ? IS NOT NULL THEN ? ELSE seniority END,
+              category_version = COALESCE(?, category_version)
             WHERE id = ?
             """,
             payload,
@@ -162,8 +288,486 @@ def update_categories_batch(
         return Result.err(exc)
 
 
-def run(db_path: Path, recompute_all: bool = False) -> Result[int, Exception]:
-    """部署名のテキストを正規化カテゴリに分類し、contacts.department_category を埋める。"""
+def load_distinct_values(
+    conn: sqlite3.Connection,
+    column: Literal["department", "position"],
+    only_missing: bool = True,
+    since: int | None = None,
+    stale_version: str | None = None,
+) -> list[str]:
+    """分類対象行に現れる column の異なり値を返す。NULL は '' として扱う。"""
+    where_clause = _target_where_clause(only_missing, since, stale_version)
+    cursor = conn.execute(
+        f"SELECT DISTINCT COALESCE({column}, '') AS value FROM contacts WHERE {where_clause}"
+    )
+    return [str(row[0]) for row in cursor]
+
+
+def _load_category_map(
+    conn: sqlite3.Connection, table: str, mapping: dict[str, tuple[str, str | None]]
+) -> None:
+    conn.execute(f"DROP TABLE IF EXISTS temp.{table}")
+    conn.execute(
+        f"CREATE TEMP TABLE {table} "
+        "(value TEXT PRIMARY KEY, category TEXT NOT NULL, seniority TEXT)"
+    )
+    conn.executemany(
+        f"INSERT INTO temp.{table} (value, category, seniority) VALUES (?, ?, ?)",
+        ((value, category, seniority) for value, (category, seniority) in mapping.items()),
+    )
+
+
+def _category_set_clause(
+    department_expr: str, position_expr: str, seniority_expr: str, only_missing: bool
+) -> str:
+    """
+    UPDATE の SET 句。行ごとの経路と同じく、未設定モードでは既に入っているカテゴリを残す。
+    seniority は position_category と同じ行で書くほか、未設定モードでは seniority だけ無い行でも
+    埋める。category_version は両方のカテゴリを書いた行だけ更新する。
+    パラメータは (category_version,) を渡す。
+    updated_at は触らない（差分実行の範囲に分類自身の書き込みを混ぜないため）。
+    """
+    keep_existing = "{column} IS NOT NULL AND TRIM({column}) != ''" if only_missing else "0"
+    keep_department = keep_existing.format(column="department_category")
+    keep_position = keep_existing.format(column="position_category")
+    keep_seniority = f"{keep_position} AND {keep_existing.format(column='contacts.seniority')}"
+    return f"""
+              department_category = CASE
+                WHEN {keep_department} THEN department_category ELSE {department_expr} END,
+              position_category = CASE
+                WHEN {keep_position} THEN position_category ELSE {position_expr} END,
+              seniority = CASE
+                WHEN {keep_seniority} THEN contacts.seniority ELSE {seniority_expr} END,
+              category_version = CASE
+                WHEN {keep_department} OR {keep_position} THEN category_version ELSE ? END
+    """
+
+
+def apply_category_mappings(
+    conn: sqlite3.Connection,
+    department_map: dict[str, str],
+    position_map: dict[str, tuple[str, str | None]],
+    only_missing: bool = True,
+    since: int | None = None,
+    stale_version: str | None = None,
+    version: str = CLASSIFIER_VERSION,
+) -> Result[int, Exception]:
+    """
+    異なり値 -> カテゴリの対応表を一時テーブルに入れ、UPDATE ... FROM の 1 文で反映する。
+    書き込む列と対象行は 1 行ずつ分類する経路と同じ（未設定のカテゴリのみ / 再計算時は両方）。
+    position_map の値は (position_category, seniority)。
+    """
+    try:
+        _load_category_map(
+            conn,
+            "department_category_map",
+            {value: (category, None) for value, category in department_map.items()},
+        )
+        _load_category_map(conn, "position_category_map", position_map)
+        set_clause = _category_set_clause("d.category", "p.category", "p.seniority", only_missing)
+        target_where = _target_where_clause(only_missing, since, stale_version)
+        cursor = execute_bulk_contact_update(
+            conn,
+            f"""
+            UPDATE contacts
+            SET {set_clause}
+            FROM temp.department_category_map AS d, temp.position_category_map AS p
+            WHERE d.value = COALESCE(contacts.department, '')
+              AND p.value = COALESCE(contacts.position, '')
+              AND ({target_where})
+            """,
+            (version,),
+            target_where,
+        )
+        updated = cursor.rowcount
+        conn.execute("DROP TABLE temp.department_category_map")
+        conn.execute("DROP TABLE temp.position_category_map")
+        conn.commit()
+        return Result.ok(updated)
+    except Exception as exc:
+        conn.rollback()
+        return Result.err(exc)
+
+
+def run_distinct(
+    conn: sqlite3.Connection,
+    recompute_all: bool = False,
+    since: int | None = None,
+    stale_version: str | None = None,
+) -> Result[int, Exception]:
+    """
+    部署・役職の異なり値だけを分類して一括反映する。
+    処理時間は行数ではなく語彙数に比例する（同じ「営業部」「部長」を何千回も分類しない）。
+    役職の異なり値 1 つにつき position_category と seniority を同時に求める。
+    """
+    only_missing = not recompute_all
+    try:
+        departments = load_distinct_values(conn, "department", only_missing, since, stale_version)
+        positions = load_distinct_values(conn, "position", only_missing, since, stale_version)
+    except Exception as exc:
+        return Result.err(exc)
+
+    department_map = {value: classify_department_category(value) for value in departments}
+    position_map = {
+        value: (classify_position_category(value), classify_seniority(value)) for value in positions
+    }
+    return apply_category_mappings(
+        conn, department_map, position_map, only_missing, since, stale_version
+    )
+
+
+def run_sql(
+    conn: sqlite3.Connection,
+    recompute_all: bool = False,
+    since: int | None = None,
+    stale_version: str | None = None,
+) -> Result[int, Exception]:
+    """
+    分類関数を SQLite に登録し、UPDATE 1 文で反映する。行を Python に取り出さない。
+    関数側のメモにより、同じ文字列の分類は 1 度だけ行われる。
+    """
+    only_missing = not recompute_all
+    try:
+        register_sqlite_functions(conn)
+        set_clause = _category_set_clause(
+            f"{DEPARTMENT_SQL_FUNCTION}(department)",
+            f"{POSITION_SQL_FUNCTION}(position)",
+            f"{SENIORITY_SQL_FUNCTION}(position)",
+            only_missing,
+        )
+        target_where = _target_where_clause(only_missing, since, stale_version)
+        cursor = execute_bulk_contact_update(
+            conn,
+            f"""
+            UPDATE contacts
+            SET {set_clause}
+            WHERE {target_where}
+            """,
+            (CLASSIFIER_VERSION,),
+            target_where,
+        )
+        conn.commit()
+        return Result.ok(cursor.rowcount)
+    except Exception as exc:
+        conn.rollback()
+        return Result.err(exc)
+
+
+@dataclass(frozen=True)
+class CategoryChange:
+    """再分類で変わるカテゴリの組（column の before -> after が count 行）。"""
+
+    column: Literal["department", "position", "seniority"]
+    before: str | None
+    after: str | None
+    count: int
+
+
+def category_diff(
+    conn: sqlite3.Connection,
+    only_missing: bool = True,
+    since: int | None = None,
+    stale_version: str | None = None,
+) -> Result[list[CategoryChange], Exception]:
+    """書き込まずに、実行した場合に変わるカテゴリを before / after ごとに件数で返す。"""
+    keep_existing = "{column} IS NOT NULL AND TRIM({column}) != ''" if only_missing else "0"
+    where_clause = _target_where_clause(only_missing, since, stale_version)
+    selects = []
+    keep_position = keep_existing.format(column="position_category")
+    # (表示名, 書き込む列, 既存値を残す条件, 新しい値の式)。_category_set_clause と同じ条件
+    for label, target, keep, expr in (
+        (
+            "department",
+            "department_category",
+            keep_existing.format(column="department_category"),
+            f"{DEPARTMENT_SQL_FUNCTION}(department)",
+        ),
+        ("position", "position_category", keep_position, f"{POSITION_SQL_FUNCTION}(position)"),
+        (
+            "seniority",
+            "seniority",
+            f"{keep_position} AND {keep_existing.format(column='seniority')}",
+            f"{SENIORITY_SQL_FUNCTION}(position)",
+        ),
+    ):
+        selects.append(
+            f"""
+            SELECT '{label}' AS column_name, before, after, COUNT(*) AS cnt
+            FROM (
+              SELECT
+                {target} AS before,
+                CASE WHEN {keep} THEN {target} ELSE {expr} END AS after
+              FROM contacts
+              WHERE {where_clause}
+            )
+            WHERE before IS NOT after
+            GROUP BY before, after
+            """
+        )
+    try:
+        register_sqlite_functions(conn)
+        cursor = conn.execute(" UNION ALL ".join(selects) + " ORDER BY cnt DESC, column_name")
+        return Result.ok(
+            [
+                CategoryChange(
+                    column=row["column_name"],
+                    before=row["before"],
+                    after=row["after"],
+                    count=int(row["cnt"]),
+                )
+                for row in cursor
+            ]
+        )
+    except Exception as exc:
+        return Result.err(exc)
+
+
+def format_category_diff(changes: list[CategoryChange]) -> str:
+    if not changes:
+        return "No category changes."
+    lines = [f"{'column':<10} {'before':<16} {'after':<16} {'count':>8}"]
+    for change in changes:
+        before = change.before if change.before is not None else "(none)"
+        after = change.after if change.after is not None else "(none)"
+        lines.append(f"{change.column:<10} {before:<16} {after:<16} {change.count:>8}")
+    lines.append(f"total {sum(change.count for change in changes)} changes")
+    return "\n".join(lines)
+
+
+def _prepare_incremental(
+    conn: sqlite3.Connection,
+) -> Result[tuple[int | None, int | None], Exception]:
+    """
+    差分実行の準備をし、(since, high_water) を返す。
+    since は前回完了時の高水位、high_water は今回の開始時点の MAX(updated_at)。
+    分類の書き込みは updated_at を更新しないので、次回の範囲に入るのは
+    分類後に作成・編集された行だけ。
+    """
+    for ensure in (ensure_updated_at_index, ensure_job_watermarks_table):
+        ensure_result = ensure(conn)
+        if ensure_result.is_err():
+            return Result.err(ensure_result.unwrap_err())
+    since_result = get_watermark(conn, WATERMARK_JOB)
+    if since_result.is_err():
+        return Result.err(since_result.unwrap_err())
+    try:
+        row = conn.execute("SELECT MAX(updated_at) FROM contacts").fetchone()
+    except Exception as exc:
+        return Result.err(exc)
+    high_water = int(row[0]) if row and row[0] is not None else None
+    return Result.ok((since_result.unwrap(), high_water))
+
+
+def _run_rows(
+    conn: sqlite3.Connection,
+    recompute_all: bool,
+    since: int | None,
+    stale_version: str | None,
+    strict: bool,
+    total: int,
+) -> tuple[int, list[tuple[str, str]]]:
+    """1 プロセスで 1 行ずつ分類し、DEFAULT_BATCH_SIZE ごとに書き込む。(更新件数, エラー)。"""
+    only_missing = not recompute_all
+    enricher = ContactEnricher()
+    updated = 0
+    errors: list[tuple[str, str]] = []
+    pending_updates: list[tuple[str | None, str | None, str | None, str]] = []
+
+    progress = tqdm(
+        iter_contacts(conn, only_missing, since, stale_version, strict=strict),
+        total=total,
+        desc="classifying contacts",
+    )
+    for contact in progress:
+        classified = _category_update(enricher, contact, recompute_all)
+        if classified.is_err():
+            errors.append((contact.full_name or "", str(classified.unwrap_err())))
+            continue
+        update = classified.unwrap()
+        if update is None:
+            continue
+
+        pending_updates.append(update)
+        if len(pending_updates) >= DEFAULT_BATCH_SIZE:
+            update_result = update_categories_batch(conn, pending_updates, CLASSIFIER_VERSION)
+            if update_result.is_err():
+                errors.append((contact.full_name or "", str(update_result.unwrap_err())))
+            else:
+                updated += len(pending_updates)
+                progress.set_postfix(dept=update[0], pos=update[1], updated=updated, refresh=False)
+            pending_updates.clear()
+
+    if pending_updates:
+        update_result = update_categories_batch(conn, pending_updates, CLASSIFIER_VERSION)
+        if update_result.is_err():
+            errors.append(("[batch]", str(update_result.unwrap_err())))
+        else:
+            updated += len(pending_updates)
+            progress.set_postfix(updated=updated, refresh=False)
+    return updated, errors
+
+
+def split_id_ranges(
+    conn: sqlite3.Connection, parts: int
+) -> list[tuple[str | None, str | None]]:
+    """
+    contacts の id を件数がほぼ等しい parts 個の [lo, hi) 範囲に分ける。
+    主キー索引を 1 回なめるだけで境界を求める（OFFSET を繰り返さない）。
+    """
+    total = int(conn.execute("SELECT COUNT(*) FROM contacts").fetchone()[0])
+    if parts <= 1 or total <= 1:
+        return [(None, None)]
+    step = -(-total // parts)
+    rows = conn.execute(
+        """
+        SELECT id FROM (
+          SELECT id, ROW_NUMBER() OVER (ORDER BY id) AS rn FROM contacts
+        )
+        WHERE rn > 1 AND (rn - 1) % ? = 0
+        ORDER BY id
+        """,
+        (step,),
+    ).fetchall()
+    edges: list[str | None] = [None, *(str(row[0]) for row in rows), None]
+    return list(zip(edges, edges[1:]))
+
+
+@dataclass(frozen=True)
+class RangeTask:
+    """ワーカー 1 回分の仕事。プロセス間で受け渡すので DB のパスと条件だけを持つ。"""
+
+    db_path: Path
+    recompute_all: bool
+    since: int | None
+    stale_version: str | None
+    strict: bool
+    id_range: tuple[str | None, str | None]
+
+
+@dataclass(frozen=True)
+class RangeResult:
+    processed: int
+    updates: list[tuple[str | None, str | None, str | None, str]]
+    errors: list[tuple[str, str]]
+
+
+# ワーカープロセスごとに 1 つ作り、分類のメモ（lru_cache）をタスク間で使い回す
+_worker_enricher: ContactEnricher | None = None
+
+
+def _init_worker() -> None:
+    global _worker_enricher
+    _worker_enricher = ContactEnricher()
+
+
+def classify_range(task: RangeTask) -> RangeResult:
+    """
+    ワーカープロセスで id 範囲を読み取り専用の接続で読み、分類結果を返す（書き込みはしない）。
+    読み込みは先に済ませて接続を閉じ、書き込み側のロックを待たせる時間を短くする。
+    """
+    enricher = _worker_enricher or ContactEnricher()
+    conn = sqlite3.connect(f"{task.db_path.resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        contacts = list(
+            iter_contacts(
+                conn,
+                not task.recompute_all,
+                task.since,
+                task.stale_version,
+                strict=task.strict,
+                id_range=task.id_range,
+            )
+        )
+    finally:
+        conn.close()
+
+    updates: list[tuple[str | None, str | None, str | None, str]] = []
+    errors: list[tuple[str, str]] = []
+    for contact in contacts:
+        classified = _category_update(enricher, contact, task.recompute_all)
+        if classified.is_err():
+            errors.append((contact.full_name or "", str(classified.unwrap_err())))
+        elif classified.unwrap() is not None:
+            updates.append(classified.unwrap())
+    return RangeResult(processed=len(contacts), updates=updates, errors=errors)
+
+
+def run_parallel(
+    conn: sqlite3.Connection,
+    db_path: Path,
+    workers: int,
+    recompute_all: bool,
+    since: int | None,
+    stale_version: str | None,
+    strict: bool,
+    total: int,
+) -> Result[tuple[int, list[tuple[str, str]]], Exception]:
+    """
+    contacts を id 範囲に分け、workers 個のプロセスで読み込みと分類を並列に行う。
+    分類結果は終わった範囲から順に受け取り、この接続（唯一の書き込み手）で範囲ごとに
+    1 コミットで反映する。範囲は互いに重ならないので、どの順で書いても結果は同じ。
+    書き込みはロックを WRITE_BUSY_TIMEOUT_MS まで待ち、失敗したら巻き戻して
+    WRITE_ATTEMPTS 回まで試す。それでも書けなければ残りを処理せず Err を返す。
+    """
+    parts = max(workers * 4, -(-total // PARALLEL_CHUNK_ROWS))
+    tasks = [
+        RangeTask(db_path, recompute_all, since, stale_version, strict, id_range)
+        for id_range in split_id_ranges(conn, parts)
+    ]
+    updated = 0
+    errors: list[tuple[str, str]] = []
+    conn.execute(f"PRAGMA busy_timeout = {WRITE_BUSY_TIMEOUT_MS}")
+    progress = tqdm(total=total, desc=f"classifying contacts ({workers} workers)")
+    try:
+        with multiprocessing.Pool(workers, initializer=_init_worker) as pool:
+            for result in pool.imap_unordered(classify_range, tasks):
+                errors.extend(result.errors)
+                update_result = _write_range(conn, result.updates)
+                if update_result.is_err():
+                    return Result.err(update_result.unwrap_err())
+                updated += len(result.updates)
+                progress.update(result.processed)
+                progress.set_postfix(updated=updated, refresh=False)
+    finally:
+        progress.close()
+    return Result.ok((updated, errors))
+
+
+def _write_range(
+    conn: sqlite3.Connection, updates: list[tuple[str | None, str | None, str | None, str]]
+) -> Result[None, Exception]:
+    """範囲 1 つ分の分類結果を書き込む。失敗したら巻き戻して WRITE_ATTEMPTS 回まで試す。"""
+    update_result: Result[None, Exception] = Result.ok(None)
+    for _ in range(WRITE_ATTEMPTS):
+        update_result = update_categories_batch(conn, updates, CLASSIFIER_VERSION)
+        if update_result.is_ok():
+            return update_result
+        conn.rollback()
+    return update_result
+
+
+def run(
+    db_path: Path,
+    recompute_all: bool = False,
+    mode: Mode = "rows",
+    incremental: bool = False,
+    recompute_stale: bool = False,
+    strict: bool = False,
+    workers: int = 1,
+) -> Result[int, Exception]:
+    """
+    部署名のテキストを正規化カテゴリに分類し、contacts.department_category を埋める。
+    incremental では前回の完了以降に作成・更新された担当者だけを対象にし、
+    最後まで成功したら job_watermarks の高水位を進める。
+    recompute_stale では category_version が現在のルールと異なる担当者だけを再分類する。
+    strict は rows モードで各行を Contact として検証する（既定は検証なしの軽量な行）。
+    workers > 1 は rows モードの読み込みと分類を id 範囲ごとにプロセスへ分け、書き込みは
+    この関数の接続 1 本にまとめる。
+    """
+    if workers < 1:
+        return Result.err(ValueError(f"workers must be >= 1: {workers}"))
+    if workers > 1 and mode != "rows":
+        return Result.err(ValueError("--workers は --mode rows でのみ使えます"))
     try:
         conn = sqlite3.connect(db_path)
         conn.row_factory = sqlite3.Row
@@ -178,75 +782,79 @@ def run(db_path: Path, recompute_all: bool = False) -> Result[int, Exception]:
     if pos_result.is_err():
         conn.close()
         return Result.err(pos_result.unwrap_err())
+    version_result = ensure_category_version_column(conn)
+    if version_result.is_err():
+        conn.close()
+        return Result.err(version_result.unwrap_err())
+    seniority_result = ensure_seniority_column(conn)
+    if seniority_result.is_err():
+        conn.close()
+        return Result.err(seniority_result.unwrap_err())
+    # 会社ごとの集計は同じトランザクション内で更新する（rows / --workers はトリガー、
+    # distinct / sql はトリガーを止めて対象会社だけ数え直す）
+    stats_result = ensure_company_contact_stats(conn)
+    if stats_result.is_err():
+        conn.close()
+        return Result.err(stats_result.unwrap_err())
+
+    stale_version: str | None = None
+    if recompute_stale and not recompute_all:
+        recompute_all = True
+        stale_version = CLASSIFIER_VERSION
+
+    since: int | None = None
+    high_water: int | None = None
+    if incremental:
+        incremental_result = _prepare_incremental(conn)
+        if incremental_result.is_err():
+            conn.close()
+            return Result.err(incremental_result.unwrap_err())
+        since, high_water = incremental_result.unwrap()
+        # 範囲内の行は部署・役職が編集されたかもしれないので、既存のカテゴリも書き直す
+        if since is not None:
+            recompute_all = True
+
+    def _finish(updated: int) -> Result[int, Exception]:
+        if high_water is not None:
+            watermark_result = set_watermark(conn, WATERMARK_JOB, high_water, updated)
+            if watermark_result.is_err():
+                return Result.err(watermark_result.unwrap_err())
+        return Result.ok(updated)
+
+    if mode != "rows":
+        try:
+            if mode == "distinct":
+                result = run_distinct(conn, recompute_all, since, stale_version)
+            else:
+                result = run_sql(conn, recompute_all, since, stale_version)
+            if result.is_err():
+                return result
+            return _finish(result.unwrap())
+        finally:
+            conn.close()
 
     try:
         only_missing = not recompute_all
-        total = count_targets(conn, only_missing=only_missing)
-        enricher = ContactEnricher()
-        updated = 0
-        errors: list[tuple[str, str]] = []
-        pending_updates: list[tuple[str | None, str | None, str]] = []
-
-        progress = tqdm(
-            iter_contacts(conn, only_missing=only_missing),
-            total=total,
-            desc="classifying contacts",
-        )
-        for contact in progress:
-            original_dept_category = contact.department_category
-            original_pos_category = contact.position_category
-
-            enriched_result = enricher.enrich(contact)
-            if enriched_result.is_err():
-                errors.append((contact.full_name or "", str(enriched_result.unwrap_err())))
-                continue
-
-            enriched = enriched_result.unwrap()
-            if not enriched.department_category and not enriched.position_category:
-                continue
-
-            # 既存カテゴリが埋まっている場合は上書きしない（再計算モード除く）
-            dept_value: str | None = None
-            pos_value: str | None = None
-            if recompute_all or not (
-                original_dept_category and str(original_dept_category).strip()
-            ):
-                dept_value = enriched.department_category
-            if recompute_all or not (original_pos_category and str(original_pos_category).strip()):
-                pos_value = enriched.position_category
-            if dept_value is None and pos_value is None:
-                continue
-
-            pending_updates.append((dept_value, pos_value, enriched.id))
-            if len(pending_updates) >= DEFAULT_BATCH_SIZE:
-                update_result = update_categories_batch(conn, pending_updates)
-                if update_result.is_err():
-                    errors.append((contact.full_name or "", str(update_result.unwrap_err())))
-                else:
-                    updated += len(pending_updates)
-                    progress.set_postfix(
-                        dept=enriched.department_category,
-                        pos=enriched.position_category,
-                        updated=updated,
-                        refresh=False,
-                    )
-                pending_updates.clear()
-
-        if pending_updates:
-            update_result = update_categories_batch(conn, pending_updates)
-            if update_result.is_err():
-                errors.append(("[batch]", str(update_result.unwrap_err())))
-            else:
-                updated += len(pending_updates)
-                progress.set_postfix(updated=updated, refresh=False)
+        total = count_targets(conn, only_missing, since, stale_version)
+        if workers > 1:
+            parallel_result = run_parallel(
+                conn, db_path, workers, recompute_all, since, stale_version, strict, total
+            )
+            if parallel_result.is_err():
+                return Result.err(parallel_result.unwrap_err())
+            updated, errors = parallel_result.unwrap()
+        else:
+            updated, errors = _run_rows(conn, recompute_all, since, stale_version, strict, total)
 
         if errors:
             print(f"Processed with {len(errors)} errors:")
             for name, message in errors:
                 prefix = f"[{name}]" if name else "[unknown]"
                 print(f"{prefix} {message}")
+            # 失敗した行を次回も拾えるよう、高水位は進めない
+            return Result.ok(updated)
 
-        return Result.ok(updated)
+        return _finish(updated)
     finally:
         conn.close()
 
@@ -254,6 +862,12 @@ def run(db_path: Path, recompute_all: bool = False) -> Result[int, Exception]:
 class Args(BaseModel):
     db: Path = DEFAULT_DB_PATH
     recompute_all: bool = False
+    mode: Mode = "rows"
+    incremental: bool = False
+    recompute_stale: bool = False
+    diff: bool = False
+    strict: bool = False
+    workers: int = 1
 
 
 def _parse_args() -> Args:
@@ -271,13 +885,103 @@ def _parse_args() -> Args:
         action="store_true",
         help="既存のカテゴリが入っていても再計算して上書きします（デフォルトは未設定のみ更新）。",
     )
+    parser.add_argument(
+        "--mode",
+        choices=["rows", "distinct", "sql"],
+        default="rows",
+        help=(
+            "rows: 1 行ずつ分類（デフォルト）/ distinct: 部署・役職の異なり値だけ分類して"
+            "一時テーブル経由の UPDATE で反映 / sql: SQLite に登録した分類関数で UPDATE 1 文"
+        ),
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=(
+            "前回の完了以降に作成・更新された担当者だけを対象にします"
+            "（job_watermarks に高水位を記録）。"
+        ),
+    )
+    parser.add_argument(
+        "--recompute-stale",
+        action="store_true",
+        help=(
+            "category_version が現在のルール（正規化とルール定義のハッシュ）と異なる担当者だけを"
+            "再分類して上書きします。"
+        ),
+    )
+    parser.add_argument(
+        "--diff",
+        action="store_true",
+        help="書き込まずに、変わるカテゴリを before / after ごとの件数で表示します。",
+    )
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="rows モードで各行を Pydantic の Contact として検証します（遅いが型を保証）。",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help=(
+            "rows モードで担当者を id 範囲に分け、N プロセスで並列に読み込み・分類します"
+            "（書き込みはメインプロセスの 1 接続）。"
+        ),
+    )
     parsed_args = parser.parse_args()
     return TypeAdapter(Args).validate_python(vars(parsed_args))
 
 
+def diff(
+    db_path: Path, recompute_all: bool = False, recompute_stale: bool = False
+) -> Result[list[CategoryChange], Exception]:
+    """run と同じ対象範囲で、書き込んだ場合に変わるカテゴリを集計する。"""
+    try:
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+    except Exception as exc:  # pragma: no cover - sqlite3 error is enough
+        return Result.err(exc)
+
+    try:
+        for ensure in (
+            ensure_department_category_column,
+            ensure_position_category_column,
+            ensure_category_version_column,
+            ensure_seniority_column,
+        ):
+            ensure_result = ensure(conn)
+            if ensure_result.is_err():
+                return Result.err(ensure_result.unwrap_err())
+        stale_version = CLASSIFIER_VERSION if recompute_stale and not recompute_all else None
+        only_missing = not (recompute_all or recompute_stale)
+        return category_diff(conn, only_missing, stale_version=stale_version)
+    finally:
+        conn.close()
+
+
 def main() -> None:
     args = _parse_args()
-    result = run(args.db, recompute_all=args.recompute_all)
+    if args.diff:
+        diff_result = diff(
+            args.db, recompute_all=args.recompute_all, recompute_stale=args.recompute_stale
+        )
+        if diff_result.is_err():
+            print(f"Error: {diff_result.unwrap_err()}")
+            raise SystemExit(1)
+        print(f"classifier version: {CLASSIFIER_VERSION}")
+        print(format_category_diff(diff_result.unwrap()))
+        return
+
+    result = run(
+        args.db,
+        recompute_all=args.recompute_all,
+        mode=args.mode,
+        incremental=args.incremental,
+        recompute_stale=args.recompute_stale,
+        strict=args.strict,
+        workers=args.workers,
+    )
     if result.is_err():
         error = result.unwrap_err()
         print(f"Error: {error}")
@@ -1,21 +1,46 @@
 from __future__ import annotations
 
 import argparse
+import itertools
 import sqlite3
 import time
+from collections import Counter
 from pathlib import Path
+from typing import Iterator
 
 from pydantic import BaseModel, TypeAdapter
 from tqdm import tqdm
 
-from src.domains import Domain
-from src.enrichers.domain import DomainEnricher, EmailEntry
+from src.domain_classifier import classify_domains
+from src.domain_pattern_votes import (
+    ensure_domain_pattern_ranks_table,
+    ensure_domain_pattern_votes_table,
+    load_vote_counts,
+    load_vote_winners,
+    replace_pattern_ranks,
+    replace_pattern_votes,
+)
+from src.domains import Domain, DomainRow
+from src.enrichers.domain import (
+    DomainEnricher,
+    EmailEntry,
+    infer_pattern,
+    rank_patterns,
+    vote_pattern,
+)
+from src.pattern_feedback import load_demoted_patterns
+from src.pattern_priors import refresh_pattern_priors
 from src.result import Result
 
 DEFAULT_DB_PATH = Path(__file__).resolve().parents[2] / "data" / "jordan.sqlite"
 DEFAULT_BATCH_SIZE = 100
 
 
+def _email_domain_sql(column: str = "email") -> str:
+    """メールアドレスのドメイン部（小文字）。索引と問い合わせで同じ式を使うこと。"""
+    return f"lower(substr({column}, instr({column}, '@') + 1))"
+
+
 def load_emails_by_domain(
     conn: sqlite3.Connection,
 ) -> Result[dict[str, list[EmailEntry]], Exception]:
@@ -56,34 +81,92 @@ def load_emails_by_domain(
     return Result.ok(mapping)
 
 
-def load_domains(conn: sqlite3.Connection) -> Result[list[Domain], Exception]:
-    """domains テーブルを全件ロードする。"""
+def ensure_domain_stream_indexes(conn: sqlite3.Connection) -> Result[None, Exception]:
+    """
+    ストリーミング集計用の式インデックスを作成する。
+    idx_emails_domain_lower はドメイン順の走査（並べ替え不要）に、
+    idx_domains_domain_lower はドメインごとの domains 行の検索に使う。
+    """
     try:
-        cursor = conn.execute(
-            """
-            SELECT
-                id,
-                company_id,
-                domain,
-                disposable,
-                webmail,
-                accept_all,
-                pattern,
-                first_seen_at,
-                last_seen_at,
-                created_at,
-                updated_at
-            FROM domains
-            ORDER BY id
-            """
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_emails_domain_lower "
+            f"ON emails ({_email_domain_sql()})"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_domains_domain_lower ON domains (lower(domain))"
         )
-        domains = []
-        for row in cursor:
-            item = dict(row)
-            item["id"] = str(row["id"])
-            item["company_id"] = str(row["company_id"])
-            domains.append(Domain.model_validate(item))
-        return Result.ok(domains)
+        conn.commit()
+        return Result.ok(None)
+    except Exception as exc:
+        return Result.err(exc)
+
+
+def iter_emails_by_domain(conn: sqlite3.Connection) -> Iterator[tuple[str, list[EmailEntry]]]:
+    """
+    Ok のメールを contacts と突き合わせ、ドメイン順に 1 ドメイン分ずつ返す。
+    メモリに載るのは常に 1 ドメイン分だけ（load_emails_by_domain は全件を辞書に載せる）。
+    """
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    cursor.execute(
+        f"""
+        SELECT
+            {_email_domain_sql("e.email")} AS email_domain,
+            e.email,
+            e.status,
+            c.first_name,
+            c.last_name
+        FROM emails AS e
+        INNER JOIN contacts AS c ON c.id = e.contact_id
+        WHERE instr(e.email, '@') > 0
+          AND e.status = 'Ok'
+        ORDER BY email_domain
+        """
+    )
+    for email_domain, rows in itertools.groupby(cursor, key=lambda row: row[0]):
+        entries = [
+            EmailEntry(
+                local=email.split("@", 1)[0],
+                first_name=first_name,
+                last_name=last_name,
+                status=status,
+            )
+            for _, email, status, first_name, last_name in rows
+        ]
+        yield email_domain, entries
+
+
+def load_domains_for(
+    conn: sqlite3.Connection, email_domain: str, *, strict: bool = False
+) -> list[DomainRow] | list[Domain]:
+    """小文字のドメイン名に一致する domains 行を返す（idx_domains_domain_lower を使う）。"""
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    cursor.execute(
+        f"SELECT {', '.join(DomainRow.COLUMNS)} FROM domains WHERE lower(domain) = ? ORDER BY id",
+        (email_domain,),
+    )
+    rows = [DomainRow.from_tuple(row) for row in cursor]
+    if strict:
+        return [row.to_model() for row in rows]
+    return rows
+
+
+def load_domains(
+    conn: sqlite3.Connection, *, strict: bool = False
+) -> Result[list[DomainRow] | list[Domain], Exception]:
+    """
+    domains テーブルを全件ロードする。
+    既定では検証なしの DomainRow を返し、strict=True なら Domain として検証する。
+    """
+    try:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(f"SELECT {', '.join(DomainRow.COLUMNS)} FROM domains ORDER BY id")
+        rows = [DomainRow.from_tuple(row) for row in cursor]
+        if strict:
+            return Result.ok([row.to_model() for row in rows])
+        return Result.ok(rows)
     except Exception as exc:  # pragma: no cover - sqlite3 error is enough
         return Result.err(exc)
 
@@ -123,57 +206,199 @@ def update_patterns_batch(
         return Result.err(exc)
 
 
-def run(db_path: Path, recompute_all: bool = False) -> Result[int, Exception]:
-    """既存のメールアドレスからパターンを推定し、domains.pattern を埋める。"""
+def rebuild_pattern_votes(conn: sqlite3.Connection) -> Result[int, Exception]:
+    """
+    emails 全件から domain_pattern_votes を作り直す（表を導入する前のメールの取り込みや、
+    取り込み以外の経路で emails を書き換えた後に使う）。作成した行数を返す。
+    票はドメイン名（大文字小文字を無視）が一致する domains 行ごとに数える。
+    """
+    ensure_result = ensure_domain_pattern_votes_table(conn)
+    if ensure_result.is_err():
+        return Result.err(ensure_result.unwrap_err())
+    ensure_result = ensure_domain_stream_indexes(conn)
+    if ensure_result.is_err():
+        return Result.err(ensure_result.unwrap_err())
+
+    counts: Counter[tuple[int, str, str]] = Counter()
     try:
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(
+            f"""
+            SELECT d.id, e.email, lower(e.status), c.first_name, c.last_name
+            FROM emails AS e
+            INNER JOIN contacts AS c ON c.id = e.contact_id
+            INNER JOIN domains AS d ON lower(d.domain) = {_email_domain_sql("e.email")}
+            WHERE instr(e.email, '@') > 0
+              AND lower(e.status) IN ('ok', 'bad')
+              AND d.webmail = 0 AND d.disposable = 0
+            """
+        )
+        for domain_id, email, status, first_name, last_name in cursor:
+            pattern = infer_pattern(email.split("@", 1)[0], first_name, last_name)
+            if pattern:
+                counts[(int(domain_id), pattern, status)] += 1
     except Exception as exc:  # pragma: no cover - sqlite3 error is enough
         return Result.err(exc)
 
+    votes = {(domain_id, pattern) for domain_id, pattern, _ in counts}
+    return replace_pattern_votes(
+        conn,
+        (
+            (domain_id, pattern, counts[(domain_id, pattern, "ok")],
+             counts[(domain_id, pattern, "bad")])
+            for domain_id, pattern in sorted(votes)
+        ),
+    )
+
+
+def store_pattern_ranks(conn: sqlite3.Connection) -> Result[int, Exception]:
+    """
+    domain_pattern_votes の Ok / Bad 数から、票のあるドメインごとに全パターンの順位と
+    事後確率（rank_patterns）を domain_pattern_ranks に書き直す。書いた行数を返す。
+    """
+    for ensure in (ensure_domain_pattern_votes_table, ensure_domain_pattern_ranks_table):
+        ensure_result = ensure(conn)
+        if ensure_result.is_err():
+            return Result.err(ensure_result.unwrap_err())
+    counts_result = load_vote_counts(conn)
+    if counts_result.is_err():
+        return Result.err(counts_result.unwrap_err())
+    return replace_pattern_ranks(
+        conn,
+        (
+            (domain_id, rank_patterns(ok_counts, bad_counts))
+            for domain_id, (ok_counts, bad_counts) in sorted(counts_result.unwrap().items())
+        ),
+    )
+
+
+def run_from_votes(
+    conn: sqlite3.Connection, recompute_all: bool = False, strict: bool = False
+) -> Result[int, Exception]:
+    """domain_pattern_votes の最多得票パターンで domains.pattern を埋める（メールは読まない）。"""
+    ensure_result = ensure_domain_pattern_votes_table(conn)
+    if ensure_result.is_err():
+        return Result.err(ensure_result.unwrap_err())
+
+    winners_result = load_vote_winners(conn)
+    if winners_result.is_err():
+        return Result.err(winners_result.unwrap_err())
+    winners = winners_result.unwrap()
+
+    demoted_result = load_demoted_patterns(conn)
+    if demoted_result.is_err():
+        return Result.err(demoted_result.unwrap_err())
+
+    domains_result = load_domains(conn, strict=strict)
+    if domains_result.is_err():
+        return Result.err(domains_result.unwrap_err())
+
+    targets = [
+        domain
+        for domain in domains_result.unwrap()
+        if str(domain.id) in winners
+        and (recompute_all or not (domain.pattern and str(domain.pattern).strip()))
+    ]
+    enricher = DomainEnricher(voted_patterns=winners, demoted_patterns=demoted_result.unwrap())
+    return Result.ok(_apply_enricher(conn, targets, enricher))
+
+
+def _apply_enricher(
+    conn: sqlite3.Connection,
+    targets: list[DomainRow] | list[Domain],
+    enricher: DomainEnricher,
+) -> int:
+    """targets に enricher を適用し、決まった pattern をまとめて書き込む。更新件数を返す。"""
+    updated = 0
+    pending_updates: list[tuple[str, str]] = []
+    errors: list[tuple[str, str]] = []
+    progress = tqdm(targets, desc="updating domain patterns")
+    for domain in progress:
+        enriched_result = enricher.enrich(domain)
+        if enriched_result.is_err():
+            errors.append((domain.domain or "", str(enriched_result.unwrap_err())))
+            continue
+
+        enriched = enriched_result.unwrap()
+        if not enriched.pattern:
+            continue
+
+        pending_updates.append((enriched.pattern, enriched.id))
+        if len(pending_updates) >= DEFAULT_BATCH_SIZE:
+            update_result = update_patterns_batch(conn, pending_updates)
+            if update_result.is_err():
+                errors.append(
+                    (f"batch({domain.domain or ''}...)", str(update_result.unwrap_err()))
+                )
+            else:
+                updated += len(pending_updates)
+                progress.set_postfix(pattern=enriched.pattern, updated=updated, refresh=False)
+            pending_updates.clear()
+
+    if pending_updates:
+        update_result = update_patterns_batch(conn, pending_updates)
+        if update_result.is_err():
+            errors.append(("batch(final)", str(update_result.unwrap_err())))
+        else:
+            updated += len(pending_updates)
+            progress.set_postfix(updated=updated, refresh=False)
+
+    if errors:
+        print(f"Processed with {len(errors)} errors:")
+        for domain_value, message in errors:
+            prefix = f"[{domain_value}]" if domain_value else "[unknown]"
+            print(f"{prefix} {message}")
+
+    return updated
+
+
+def run_stream(
+    conn: sqlite3.Connection, recompute_all: bool = False, strict: bool = False
+) -> Result[int, Exception]:
+    """
+    メールをドメイン順に読み、1 ドメインずつ多数決して domains.pattern を埋める。
+    メールも domains も全件は読み込まないので、メモリは最大のドメインの件数に比例する。
+    """
+    ensure_result = ensure_domain_stream_indexes(conn)
+    if ensure_result.is_err():
+        return Result.err(ensure_result.unwrap_err())
+    demoted_result = load_demoted_patterns(conn)
+    if demoted_result.is_err():
+        return Result.err(demoted_result.unwrap_err())
+    demoted = demoted_result.unwrap()
+
+    # 書き込みは走査中のカーソルと同じ接続で行う（走査は emails / contacts、書くのは domains）。
+    # 別接続にすると読み込み側の共有ロックでコミットが待たされる
+    updated = 0
+    pending_updates: list[tuple[str, str]] = []
+    errors: list[tuple[str, str]] = []
     try:
-        email_result = load_emails_by_domain(conn)
-        if email_result.is_err():
-            return Result.err(email_result.unwrap_err())
-        emails_by_domain = email_result.unwrap()
-
-        domains_result = load_domains(conn)
-        if domains_result.is_err():
-            return Result.err(domains_result.unwrap_err())
-        domains = domains_result.unwrap()
-
-        targets = [
-            domain
-            for domain in domains
-            if domain.domain.lower() in emails_by_domain
-            and (recompute_all or not (domain.pattern and str(domain.pattern).strip()))
-        ]
-        enricher = DomainEnricher(emails_by_domain)
-
-        updated = 0
-        pending_updates: list[tuple[str, str]] = []
-        errors: list[tuple[str, str]] = []
-        progress = tqdm(targets, desc="updating domain patterns")
-        for domain in progress:
-            enriched_result = enricher.enrich(domain)
-            if enriched_result.is_err():
-                errors.append((domain.domain or "", str(enriched_result.unwrap_err())))
+        progress = tqdm(iter_emails_by_domain(conn), desc="voting domain patterns")
+        for email_domain, entries in progress:
+            domains = [
+                domain
+                for domain in load_domains_for(conn, email_domain, strict=strict)
+                if not (domain.webmail or domain.disposable)
+                and (recompute_all or not (domain.pattern and str(domain.pattern).strip()))
+            ]
+            if not domains:
                 continue
-
-            enriched = enriched_result.unwrap()
-            if not enriched.pattern:
+            pattern = vote_pattern(entries)
+            if not pattern:
                 continue
-
-            pending_updates.append((enriched.pattern, enriched.id))
+            pending_updates.extend(
+                (pattern, domain.id)
+                for domain in domains
+                if pattern not in demoted.get(str(domain.id), ())
+            )
             if len(pending_updates) >= DEFAULT_BATCH_SIZE:
                 update_result = update_patterns_batch(conn, pending_updates)
                 if update_result.is_err():
-                    errors.append(
-                        (f"batch({domain.domain or ''}...)", str(update_result.unwrap_err()))
-                    )
+                    errors.append((f"batch({email_domain}...)", str(update_result.unwrap_err())))
                 else:
                     updated += len(pending_updates)
-                    progress.set_postfix(pattern=enriched.pattern, updated=updated, refresh=False)
+                    progress.set_postfix(pattern=pattern, updated=updated, refresh=False)
                 pending_updates.clear()
 
         if pending_updates:
@@ -182,15 +407,96 @@ def run(db_path: Path, recompute_all: bool = False) -> Result[int, Exception]:
                 errors.append(("batch(final)", str(update_result.unwrap_err())))
             else:
                 updated += len(pending_updates)
-                progress.set_postfix(updated=updated, refresh=False)
+    except Exception as exc:  # pragma: no cover - sqlite3 error is enough
+        return Result.err(exc)
 
-        if errors:
-            print(f"Processed with {len(errors)} errors:")
-            for domain_value, message in errors:
-                prefix = f"[{domain_value}]" if domain_value else "[unknown]"
-                print(f"{prefix} {message}")
+    if errors:
+        print(f"Processed with {len(errors)} errors:")
+        for domain_value, message in errors:
+            print(f"[{domain_value}] {message}")
+    return Result.ok(updated)
+
+
+def _run_in_memory(
+    conn: sqlite3.Connection, recompute_all: bool = False, strict: bool = False
+) -> Result[int, Exception]:
+    """メールと domains を全件読み込み、ドメインごとに多数決する。"""
+    email_result = load_emails_by_domain(conn)
+    if email_result.is_err():
+        return Result.err(email_result.unwrap_err())
+    emails_by_domain = email_result.unwrap()
+
+    domains_result = load_domains(conn, strict=strict)
+    if domains_result.is_err():
+        return Result.err(domains_result.unwrap_err())
+    domains = domains_result.unwrap()
+
+    demoted_result = load_demoted_patterns(conn)
+    if demoted_result.is_err():
+        return Result.err(demoted_result.unwrap_err())
+
+    targets = [
+        domain
+        for domain in domains
+        if domain.domain.lower() in emails_by_domain
+        and (recompute_all or not (domain.pattern and str(domain.pattern).strip()))
+    ]
+    enricher = DomainEnricher(emails_by_domain, demoted_patterns=demoted_result.unwrap())
+    return Result.ok(_apply_enricher(conn, targets, enricher))
+
+
+def run(
+    db_path: Path,
+    recompute_all: bool = False,
+    strict: bool = False,
+    stream: bool = False,
+    from_votes: bool = False,
+    rebuild_votes: bool = False,
+) -> Result[int, Exception]:
+    """
+    既存のメールアドレスからパターンを推定し、domains.pattern を埋める。
+    stream=True ならドメイン順に 1 ドメインずつ処理する（run_stream）。
+    from_votes=True なら domain_pattern_votes の最多得票を使う（run_from_votes）。
+    rebuild_votes=True なら先に emails から票を数え直す（from_votes を含む）。
+    最初に domains.webmail / disposable を付け直し、該当するドメインは更新しない。
+    pattern_feedback が外したパターン（domain_pattern_demotions）には戻さない。
+    どのモードでも最後に domain_pattern_ranks を票から書き直し（エクスポートが古い順位を
+    使わないように）、pattern_priors を差分で更新する。
+    """
+    try:
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+    except Exception as exc:  # pragma: no cover - sqlite3 error is enough
+        return Result.err(exc)
 
-        return Result.ok(updated)
+    try:
+        # 先に Web メール・使い捨てのドメインに印を付け、多数決の対象から外す
+        classify_result = classify_domains(conn)
+        if classify_result.is_err():
+            return Result.err(classify_result.unwrap_err())
+
+        if from_votes or rebuild_votes:
+            if rebuild_votes:
+                rebuild_result = rebuild_pattern_votes(conn)
+                if rebuild_result.is_err():
+                    return Result.err(rebuild_result.unwrap_err())
+            result = run_from_votes(conn, recompute_all, strict)
+        elif stream:
+            result = run_stream(conn, recompute_all, strict)
+        else:
+            result = _run_in_memory(conn, recompute_all, strict)
+        if result.is_err():
+            return result
+
+        ranks_result = store_pattern_ranks(conn)
+        if ranks_result.is_err():
+            return Result.err(ranks_result.unwrap_err())
+
+        # 更新した pattern を TLD・業種・規模ごとの事前分布に反映する（変わったドメインだけ）
+        priors_result = refresh_pattern_priors(conn)
+        if priors_result.is_err():
+            return Result.err(priors_result.unwrap_err())
+        return result
     finally:
         conn.close()
 
@@ -198,6 +504,10 @@ def run(db_path: Path, recompute_all: bool = False) -> Result[int, Exception]:
 class Args(BaseModel):
     db: Path = DEFAULT_DB_PATH
     recompute_all: bool = False
+    strict: bool = False
+    stream: bool = False
+    from_votes: bool = False
+    rebuild_votes: bool = False
 
 
 def _parse_args() -> Args:
@@ -215,13 +525,46 @@ def _parse_args() -> Args:
         action="store_true",
         help="既存の pattern が入っていても再計算して上書きします（デフォルトは未設定のみ更新）。",
     )
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="各行を Pydantic の Domain として検証します（遅いが型を保証）。",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help=(
+            "メールをドメイン順（式インデックス）に読み、1 ドメインずつ多数決します。"
+            "全件を辞書に載せないため、メモリは最大のドメインの件数分で済みます。"
+        ),
+    )
+    parser.add_argument(
+        "--from-votes",
+        action="store_true",
+        help=(
+            "メールを読まず、取り込み時に加算した domain_pattern_votes の最多得票で更新します"
+            "（同数・Ok なしのドメインは更新しません）。"
+        ),
+    )
+    parser.add_argument(
+        "--rebuild-votes",
+        action="store_true",
+        help="emails から domain_pattern_votes を数え直してから --from-votes と同じ更新をします。",
+    )
     parsed_args = parser.parse_args()
     return TypeAdapter(Args).validate_python(vars(parsed_args))
 
 
 def main() -> None:
     args = _parse_args()
-    result = run(args.db, recompute_all=args.recompute_all)
+    result = run(
+        args.db,
+        recompute_all=args.recompute_all,
+        strict=args.strict,
+        stream=args.stream,
+        from_votes=args.from_votes,
+        rebuild_votes=args.rebuild_votes,
+    )
     if result.is_err():
         error = result.unwrap_err()
         print(f"Error: {error}")
@@ -1,17 +1,58 @@
 """Contact-related enrichers and helpers."""
 
-from .enricher import (
+from .enricher import (  # noqa: F401
+    CLASSIFIER_VERSION,
     DEPARTMENT_CATEGORY_CHOICES,
+    DEPARTMENT_SQL_FUNCTION,
     POSITION_CATEGORY_CHOICES,
+    POSITION_SQL_FUNCTION,
+    SENIORITY_CHOICES,
+    SENIORITY_SQL_FUNCTION,
     ContactEnricher,
+    SeniorityFieldEnricher,
+    _normalize,
+    classifier_version,
     classify_department_category,
     classify_position_category,
+    classify_seniority,
+    match_department_category,
+    match_position_category,
+    match_seniority,
+    register_sqlite_functions,
+)
+from .rules import (
+    DEPARTMENT_RULES,
+    POSITION_RULES,
+    SENIORITY_RULES,
+    ClassificationRule,
+    RuleEngine,
+    RuleMatch,
+    load_rule_file,
 )
 
 __all__ = [
+    "CLASSIFIER_VERSION",
+    "ClassificationRule",
     "ContactEnricher",
     "DEPARTMENT_CATEGORY_CHOICES",
+    "DEPARTMENT_RULES",
+    "DEPARTMENT_SQL_FUNCTION",
     "POSITION_CATEGORY_CHOICES",
+    "POSITION_RULES",
+    "POSITION_SQL_FUNCTION",
+    "RuleEngine",
+    "RuleMatch",
+    "SENIORITY_CHOICES",
+    "SENIORITY_RULES",
+    "SENIORITY_SQL_FUNCTION",
+    "SeniorityFieldEnricher",
+    "classifier_version",
     "classify_department_category",
     "classify_position_category",
+    "classify_seniority",
+    "load_rule_file",
+    "match_department_category",
+    "match_position_category",
+    "match_seniority",
+    "register_sqlite_functions",
 ]
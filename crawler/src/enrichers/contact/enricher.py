@@ -1,12 +1,16 @@
 from __future__ import annotations
 
+import functools
+import hashlib
 import re
+import sqlite3
 import unicodedata
 
-from src.domains import Contact
+from src.domains import Contact, ContactRow
 from src.result import Result
 
-from ..base import Enricher
+from ..base import Enricher, FieldEnricher
+from .rules import DEPARTMENT_RULES, POSITION_RULES, SENIORITY_RULES, RuleEngine, RuleMatch
 
 DEPARTMENT_CATEGORY_CHOICES = [
     "経営",
@@ -20,6 +24,16 @@ DEPARTMENT_CATEGORY_CHOICES = [
     "その他",
 ]
 
+# IC は役職名が入っているがどの階層にも当たらない担当者（個人貢献者）
+SENIORITY_CHOICES = [
+    "C-level",
+    "VP",
+    "Director",
+    "Manager",
+    "Senior",
+    "IC",
+]
+
 POSITION_CATEGORY_CHOICES = [
     "経営",
     "部長",
@@ -30,6 +44,10 @@ POSITION_CATEGORY_CHOICES = [
 ]
 
 
+# _normalize の挙動を変えたら上げる（分類結果が変わり得るため classifier_version に含める）
+NORMALIZER_VERSION = 1
+
+
 def _normalize(department: str) -> str:
     """ 部署名を正規化する """
     if not department:
@@ -47,108 +65,157 @@ def _normalize(department: str) -> str:
     return text.lower()
 
 
+DEPARTMENT_ENGINE = RuleEngine(DEPARTMENT_RULES)
+POSITION_ENGINE = RuleEngine(POSITION_RULES)
+SENIORITY_ENGINE = RuleEngine(SENIORITY_RULES, default="IC")
+
+
+def classifier_version(
+    department_engine: RuleEngine = DEPARTMENT_ENGINE,
+    position_engine: RuleEngine = POSITION_ENGINE,
+    seniority_engine: RuleEngine = SENIORITY_ENGINE,
+) -> str:
+    """正規化とルールの組み合わせを表すバージョン。contacts.category_version に保存する。"""
+    key = ":".join(
+        [
+            str(NORMALIZER_VERSION),
+            department_engine.fingerprint,
+            position_engine.fingerprint,
+            seniority_engine.fingerprint,
+        ]
+    )
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:12]
+
+
+CLASSIFIER_VERSION = classifier_version()
+
+
+# 部署・役職の文字列は重複が非常に多いため、正規化と判定の結果を入力文字列ごとに使い回す
+@functools.lru_cache(maxsize=65536)
+def _normalize_cached(text: str) -> str:
+    return _normalize(text)
+
+
+@functools.lru_cache(maxsize=65536)
+def _match_cached(text: str, engine: RuleEngine) -> RuleMatch:
+    return engine.match(_normalize_cached(text))
+
+
+def match_department_category(
+    department: str, engine: RuleEngine = DEPARTMENT_ENGINE
+) -> RuleMatch:
+    """部署名を分類し、成立したルールごと返す。"""
+    return _match_cached(department or "", engine)
+
+
+def match_position_category(position: str, engine: RuleEngine = POSITION_ENGINE) -> RuleMatch:
+    """役職名を分類し、成立したルールごと返す。"""
+    return _match_cached(position or "", engine)
+
+
+def match_seniority(position: str, engine: RuleEngine = SENIORITY_ENGINE) -> RuleMatch:
+    """役職名からシニアリティを判定し、成立したルールごと返す。"""
+    return _match_cached(position or "", engine)
+
+
 def classify_department_category(department: str) -> str:
-    normalized = _normalize(department or "")
-    if not normalized:
-        return "その他"
-
-    if re.search(
-        r"経営|経営企画|事業企画|企画室|社長|代表|取締役|president|ceo|coo|cxo",
-        normalized,
-    ):
-        return "経営"
-
-    if re.search(
-        r"人事|労務|hr|タレントマネジメント|組織開発|人材開発|採用|リクルート",
-        normalized,
-    ):
-        return "人事・労務"
-
-    if re.search(
-        r"財務|経理|ファイナンス|finance|管理会計|経営管理|会計|経営企画財務",
-        normalized,
-    ):
-        return "経理・財務"
-
-    if re.search(r"法務|legal|リーガル|コンプライアンス|規制|契約", normalized):
-        return "法務"
-
-    if re.search(r"購買|調達|資材|仕入|バイヤ|procurement|purchase", normalized):
-        return "購買"
-
-    if re.search(
-        r"営業|営業本部|営業統括|営業管理|国内営業|海外営業|営業技術|セールス|sales|"
-        r"アカウントマネージャ|アカウントマネジャ|インサイドセールス|フィールドセールス|"
-        r"法人営業|ソリューション営業",
-        normalized,
-    ):
-        return "営業"
-
-    if re.search(
-        r"マーケティング|マーケ|marketing|プロモーション|宣伝|広報|ブランド|brand",
-        normalized,
-    ):
-        return "マーケティング"
-
-    if re.search(
-        r"情報システム|情シス|社内it|it基盤|インフラ|it企画|it推進|dx推進|デジタル推進|it戦略|"
-        r"デジタル戦略|テクノロジー本部|テクノロジー部|cio|cto|システム|it統括|itソリューション|"
-        r"情報管理|情報企画|情報統括|情報部|(?<![a-z])it(?![a-z])|ict",
-        normalized,
-    ):
-        return "情報システム"
-
-    return "その他"
+    return match_department_category(department).category
 
 
 def classify_position_category(position: str) -> str:
-    normalized = _normalize(position or "")
-    if not normalized:
-        return "その他"
-
-    # 経営層
-    if re.search(
-        r"代表取締役|取締役|社長|会長|president|経営|executive|役員|顧問|相談役|監査役|専務|常務|"
-        r"(?<![a-z])c(?:eo|oo|fo|to|mo|xo)(?![a-z])",
-        normalized,
-    ):
-        return "経営"
-
-    # 部長クラス
-    if re.search(
-        r"部長|本部長|部門長|局長|室長|所長|センター長|支社長|支店長|工場長|ヘッド|head|"
-        r"gm|generalmanager|ディレクター|director|マネージングディレクター|md|"
-        r"vicepresident|vp|svp|evp",
-        normalized,
-    ):
-        return "部長"
-
-    # 次長・課長/マネージャクラス
-    if re.search(
-        r"次長|課長|マネージャ|mgr|manager|スーパーバイザ|supervisor|リーダー|lead|グループ長|チーム長|"
-        r"課長代理|assistantmanager|assoc(?:iate)?manager|リーダ|リーダー補佐|サブマネージャ|副長",
-        normalized,
-    ):
-        return "次長・課長"
-
-    # 主任/係長/チーフ
-    if re.search(r"主任|係長|チーフ|chief|sublead|副主任|サブリーダ|submanager|副主幹", normalized):
-        return "主任"
-
-    # 一般メンバー/担当
-    if re.search(r"担当|メンバー|スタッフ|staff|アソシエイト|associate", normalized):
-        return "担当者"
-
-    return "その他"
+    return match_position_category(position).category
+
+
+def classify_seniority(position: str) -> str | None:
+    """役職名が空ならシニアリティは不明（None）とする。"""
+    if not _normalize_cached(position or ""):
+        return None
+    return match_seniority(position).category
+
+
+DEPARTMENT_SQL_FUNCTION = "jordan_dept"
+POSITION_SQL_FUNCTION = "jordan_position"
+SENIORITY_SQL_FUNCTION = "jordan_seniority"
+
+
+def _sql_text(value: object) -> str:
+    # SQLite からは NULL / 数値も渡ってくるため、分類前に文字列へ揃える
+    return "" if value is None else str(value)
+
+
+def register_sqlite_functions(conn: sqlite3.Connection) -> None:
+    """
+    分類関数を SQLite のユーザー定義関数として登録する。
+    jordan_dept(department) / jordan_position(position) / jordan_seniority(position) は
+    決定的（deterministic）なので、
+    UPDATE 文のほか式インデックスや生成列からも使える。結果は入力文字列ごとにメモされる。
+    """
+    conn.create_function(
+        DEPARTMENT_SQL_FUNCTION,
+        1,
+        lambda value: classify_department_category(_sql_text(value)),
+        deterministic=True,
+    )
+    conn.create_function(
+        POSITION_SQL_FUNCTION,
+        1,
+        lambda value: classify_position_category(_sql_text(value)),
+        deterministic=True,
+    )
+    conn.create_function(
+        SENIORITY_SQL_FUNCTION,
+        1,
+        lambda value: classify_seniority(_sql_text(value)),
+        deterministic=True,
+    )
+
+
+class SeniorityFieldEnricher(FieldEnricher[Contact | ContactRow, str, str]):
+    """
+    役職名から contacts.seniority を求める。
+    context に正規化済みの役職名を渡すと、position_category と同じ正規化結果を使い回す。
+    """
+
+    field_name = "seniority"
+
+    def __init__(self, engine: RuleEngine = SENIORITY_ENGINE) -> None:
+        self.engine = engine
+
+    def compute(
+        self, item: Contact | ContactRow, context: str | None = None
+    ) -> Result[str | None, Exception]:
+        normalized = context if context is not None else _normalize_cached(item.position or "")
+        if not normalized:
+            return Result.ok(None)
+        return Result.ok(self.engine.match(normalized).category)
 
 
 class ContactEnricher(Enricher[Contact]):
-    """部署名から department_category を推定する。"""
-
-    def enrich(self, item: Contact) -> Result[Contact, Exception]:
-        dept_category = classify_department_category(item.department or "")
-        pos_category = classify_position_category(item.position or "")
+    """部署名・役職名から department_category / position_category / seniority を推定する。"""
+
+    def __init__(
+        self,
+        department_engine: RuleEngine = DEPARTMENT_ENGINE,
+        position_engine: RuleEngine = POSITION_ENGINE,
+        seniority_enricher: SeniorityFieldEnricher | None = None,
+    ) -> None:
+        self.department_engine = department_engine
+        self.position_engine = position_engine
+        self.seniority_enricher = seniority_enricher or SeniorityFieldEnricher()
+
+    def enrich(self, item: Contact | ContactRow) -> Result[Contact | ContactRow, Exception]:
+        dept_category = match_department_category(
+            item.department or "", self.department_engine
+        ).category
+        pos_category = match_position_category(item.position or "", self.position_engine).category
+        # 役職の正規化は 1 回だけ行い、position_category と seniority で共有する
+        seniority_result = self.seniority_enricher.compute(
+            item, context=_normalize_cached(item.position or "")
+        )
+        if seniority_result.is_err():
+            return Result.err(seniority_result.unwrap_err())
 
         item.department_category = dept_category
         item.position_category = pos_category
+        item.seniority = seniority_result.unwrap()
         return Result.ok(item)
@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable, Mapping, Sequence
+
+DEFAULT_CATEGORY = "その他"
+
+
+@dataclass(frozen=True)
+class ClassificationRule:
+    """カテゴリ判定ルール。priority が小さいほど優先される。"""
+
+    category: str
+    priority: int
+    patterns: tuple[str, ...]
+
+    @classmethod
+    def from_dict(cls, raw: Mapping[str, Any]) -> "ClassificationRule":
+        patterns = raw["patterns"]
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        return cls(
+            category=str(raw["category"]),
+            priority=int(raw["priority"]),
+            patterns=tuple(str(p) for p in patterns),
+        )
+
+
+@dataclass(frozen=True)
+class RuleMatch:
+    """判定結果。rule / matched_text はどのルールのどの文字列で決まったかを示す。"""
+
+    category: str
+    rule: ClassificationRule | None = None
+    matched_text: str | None = None
+
+
+class RuleEngine:
+    """
+    ルール群を名前付きグループの 1 本の正規表現にコンパイルし、最優先カテゴリを返す。
+
+    まず全ルールの alternation で最左マッチを探し、見つかったルールより優先度の高いルールだけの
+    alternation で再検索する（見つかればそのルールで繰り返す）。最終的に優先度の高いルールが
+    文字列のどこにもマッチしないことを確認しているので、priority 順に 1 本ずつ re.search する
+    if 連鎖と同じ結果になる。多くの入力は 1〜2 回の走査で決まる。
+    """
+
+    def __init__(self, rules: Iterable[ClassificationRule], default: str = DEFAULT_CATEGORY):
+        self.default = default
+        self.rules: tuple[ClassificationRule, ...] = tuple(
+            sorted(rules, key=lambda rule: rule.priority)
+        )
+        for rule in self.rules:
+            for pattern in rule.patterns:
+                # どのルールが成立したかを名前付きグループで判別するため、捕捉グループは禁止する
+                if re.compile(pattern).groups:
+                    raise ValueError(
+                        f"rule {rule.category!r} pattern {pattern!r} must use (?:...) groups"
+                    )
+        alternatives = [
+            f"(?P<r{index}>{'|'.join(rule.patterns)})" for index, rule in enumerate(self.rules)
+        ]
+        # _higher[i] は rules[:i] だけの alternation（i=0 は不要なので None）
+        self._higher: list[re.Pattern[str] | None] = [None] + [
+            re.compile("|".join(alternatives[:index])) for index in range(1, len(alternatives))
+        ]
+        self._pattern = re.compile("|".join(alternatives)) if alternatives else None
+
+    @property
+    def fingerprint(self) -> str:
+        """ルール内容（カテゴリ・優先度・パターン・既定値）から決まる短いハッシュ。"""
+        payload = json.dumps(
+            [self.default, [[r.category, r.priority, list(r.patterns)] for r in self.rules]],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+    @classmethod
+    def from_dicts(
+        cls, raw_rules: Sequence[Mapping[str, Any]], default: str = DEFAULT_CATEGORY
+    ) -> "RuleEngine":
+        return cls((ClassificationRule.from_dict(raw) for raw in raw_rules), default=default)
+
+    def match(self, normalized: str) -> RuleMatch:
+        """正規化済みの文字列を判定する。"""
+        if not normalized or self._pattern is None:
+            return RuleMatch(category=self.default)
+
+        found = self._pattern.search(normalized)
+        if found is None:
+            return RuleMatch(category=self.default)
+        index = int(found.lastgroup[1:])  # type: ignore[index]
+        while index:
+            higher = self._higher[index].search(normalized)  # type: ignore[union-attr]
+            if higher is None:
+                break
+            found = higher
+            index = int(found.lastgroup[1:])  # type: ignore[index]
+        rule = self.rules[index]
+        return RuleMatch(category=rule.category, rule=rule, matched_text=found.group())
+
+
+def load_rule_file(path: Path) -> dict[str, RuleEngine]:
+    """
+    JSON のルール定義を読み込む。
+    形式: {"department": [{"category": ..., "priority": ..., "patterns": [...]}, ...],
+           "position": [...]}
+    """
+    raw = json.loads(path.read_text(encoding="utf-8"))
+    return {name: RuleEngine.from_dicts(rules) for name, rules in raw.items()}
+
+
+DEPARTMENT_RULES: tuple[ClassificationRule, ...] = (
+    ClassificationRule(
+        category="経営",
+        priority=10,
+        patterns=(r"経営|経営企画|事業企画|企画室|社長|代表|取締役|president|ceo|coo|cxo",),
+    ),
+    ClassificationRule(
+        category="人事・労務",
+        priority=20,
+        patterns=(r"人事|労務|hr|タレントマネジメント|組織開発|人材開発|採用|リクルート",),
+    ),
+    ClassificationRule(
+        category="経理・財務",
+        priority=30,
+        patterns=(r"財務|経理|ファイナンス|finance|管理会計|経営管理|会計|経営企画財務",),
+    ),
+    ClassificationRule(
+        category="法務",
+        priority=40,
+        patterns=(r"法務|legal|リーガル|コンプライアンス|規制|契約",),
+    ),
+    ClassificationRule(
+        category="購買",
+        priority=50,
+        patterns=(r"購買|調達|資材|仕入|バイヤ|procurement|purchase",),
+    ),
+    ClassificationRule(
+        category="営業",
+        priority=60,
+        patterns=(
+            r"営業|営業本部|営業統括|営業管理|国内営業|海外営業|営業技術|セールス|sales",
+            r"アカウントマネージャ|アカウントマネジャ|インサイドセールス|フィールドセールス",
+            r"法人営業|ソリューション営業",
+        ),
+    ),
+    ClassificationRule(
+        category="マーケティング",
+        priority=70,
+        patterns=(r"マーケティング|マーケ|marketing|プロモーション|宣伝|広報|ブランド|brand",),
+    ),
+    ClassificationRule(
+        category="情報システム",
+        priority=80,
+        patterns=(
+            r"情報システム|情シス|社内it|it基盤|インフラ|it企画|it推進|dx推進|デジタル推進|it戦略",
+            r"デジタル戦略|テクノロジー本部|テクノロジー部|cio|cto|システム|it統括|itソリューション",
+            r"情報管理|情報企画|情報統括|情報部|(?<![a-z])it(?![a-z])|ict",
+        ),
+    ),
+)
+
+POSITION_RULES: tuple[ClassificationRule, ...] = (
+    # 経営層
+    ClassificationRule(
+        category="経営",
+        priority=10,
+        patterns=(
+            r"代表取締役|取締役|社長|会長|president|経営|executive|役員|顧問|相談役|監査役|専務|常務",
+            r"(?<![a-z])c(?:eo|oo|fo|to|mo|xo)(?![a-z])",
+        ),
+    ),
+    # 部長クラス
+    ClassificationRule(
+        category="部長",
+        priority=20,
+        patterns=(
+            r"部長|本部長|部門長|局長|室長|所長|センター長|支社長|支店長|工場長|ヘッド|head",
+            r"gm|generalmanager|ディレクター|director|マネージングディレクター|md",
+            r"vicepresident|vp|svp|evp",
+        ),
+    ),
+    # 次長・課長/マネージャクラス
+    ClassificationRule(
+        category="次長・課長",
+        priority=30,
+        patterns=(
+            r"次長|課長|マネージャ|mgr|manager|スーパーバイザ|supervisor|リーダー|lead|グループ長",
+            r"チーム長|課長代理|assistantmanager|assoc(?:iate)?manager|リーダ|リーダー補佐",
+            r"サブマネージャ|副長",
+        ),
+    ),
+    # 主任/係長/チーフ
+    ClassificationRule(
+        category="主任",
+        priority=40,
+        patterns=(r"主任|係長|チーフ|chief|sublead|副主任|サブリーダ|submanager|副主幹",),
+    ),
+    # 一般メンバー/担当
+    ClassificationRule(
+        category="担当者",
+        priority=50,
+        patterns=(r"担当|メンバー|スタッフ|staff|アソシエイト|associate",),
+    ),
+)
+
+# 役職の正規化済み文字列からシニアリティを判定する。position_category より細かく、
+# 執行役員 / 副社長 / VP を経営層から分け、該当しない肩書きは IC（個人貢献者）とする。
+# 正規化で空白が除かれるため、英字の略語は語頭側だけを区切りとして見る。
+SENIORITY_RULES: tuple[ClassificationRule, ...] = (
+    ClassificationRule(
+        category="C-level",
+        priority=10,
+        patterns=(
+            r"代表取締役|取締役|(?<!副)社長|会長|(?<!vice)president|(?<!執行)役員|専務|常務",
+            r"監査役|executive|(?<![a-z])c(?:eo|oo|fo|to|mo|io|xo)(?![a-z])",
+        ),
+    ),
+    ClassificationRule(
+        category="VP",
+        priority=20,
+        patterns=(r"執行役員|副社長|vicepresident|(?<![a-z])[se]?vp",),
+    ),
+    ClassificationRule(
+        category="Director",
+        priority=30,
+        patterns=(
+            r"部長|本部長|部門長|局長|室長|所長|センター長|支社長|支店長|工場長|ヘッド|head",
+            r"(?<![a-z])gm(?![a-z])|generalmanager|ディレクター|director",
+        ),
+    ),
+    ClassificationRule(
+        category="Manager",
+        priority=40,
+        patterns=(
+            r"次長|課長|マネージャ|マネジャ|mgr|manager|スーパーバイザ|supervisor",
+            r"リーダ|lead|グループ長|チーム長|副長",
+        ),
+    ),
+    ClassificationRule(
+        category="Senior",
+        priority=50,
+        patterns=(r"主任|係長|チーフ|chief|副主幹|主査|senior|シニア",),
+    ),
+)
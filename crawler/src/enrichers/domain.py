@@ -1,12 +1,24 @@
 from __future__ import annotations
 
+import functools
 import re
 from collections import Counter
-from typing import Callable, Dict, Iterable, Optional
+from types import MappingProxyType
+from typing import (
+    Callable,
+    Collection,
+    Dict,
+    Generic,
+    Hashable,
+    Iterable,
+    Mapping,
+    Optional,
+    TypeVar,
+)
 
 from pydantic import BaseModel
 
-from src.domains import Domain
+from src.domains import Domain, DomainRow
 from src.result import Result
 
 from .base import Enricher
@@ -38,43 +50,101 @@ class EmailEntry(BaseModel):
     status: Optional[str] = None
 
 
+@functools.lru_cache(maxsize=65536)
 def _normalize_token(token: str) -> str:
     """小文字化し英数字以外を除去して比較しやすい形に整える。"""
     return re.sub(r"[^a-z0-9]", "", token.lower())
 
 
-def infer_pattern(local: str, first_name: Optional[str], last_name: Optional[str]) -> Optional[str]:
-    """local-part と氏名からメールパターンを推定する。"""
+@functools.lru_cache(maxsize=65536)
+def pattern_index(first: str, last: str) -> Mapping[str, str]:
+    """
+    正規化済みの (first, last) から {local-part: パターン} の逆引きを作る。
+    同じ local-part になるパターンが複数ある場合は PATTERN_BUILDERS で先のものを採る。
+    同姓同名は何度も現れるため、氏名ごとにメモして使い回す。
+    """
+    index: dict[str, str] = {}
+    for pattern, builder in PATTERN_BUILDERS.items():
+        index.setdefault(builder(first, last), pattern)
+    return MappingProxyType(index)
+
+
+def _name_tokens(
+    first_name: Optional[str], last_name: Optional[str]
+) -> Optional[tuple[str, str]]:
     if not first_name or not last_name:
         return None
-
     first = _normalize_token(first_name)
     last = _normalize_token(last_name)
     if not first or not last:
         return None
+    return first, last
 
-    normalized_local = local.lower()
-    for pattern, builder in PATTERN_BUILDERS.items():
-        candidate = builder(first, last)
-        if candidate == normalized_local:
-            return pattern
 
-    return None
+def infer_pattern(local: str, first_name: Optional[str], last_name: Optional[str]) -> Optional[str]:
+    """local-part と氏名からメールパターンを推定する（氏名ごとの逆引きを 1 回引くだけ）。"""
+    tokens = _name_tokens(first_name, last_name)
+    if tokens is None:
+        return None
+    return pattern_index(*tokens).get(local.lower())
 
 
-class DomainEnricher(Enricher[Domain]):
-    """既存メールから多数決で Domain.pattern を推定する。"""
+OwnerT = TypeVar("OwnerT", bound=Hashable)
+
+
+class LocalPartIndex(Generic[OwnerT]):
+    """
+    複数人の氏名から作った local-part の逆引き（local-part -> {持ち主: パターン}）。
+    会社の担当者をまとめて登録しておけば、メール 1 件の照合は辞書を 1 回引くだけで済む。
+    """
 
-    def __init__(self, emails_by_domain: Dict[str, Iterable[EmailEntry]]) -> None:
-        self.emails_by_domain = emails_by_domain
+    def __init__(self) -> None:
+        self._owners: dict[str, dict[OwnerT, str]] = {}
 
-    def enrich(self, domain: Domain) -> Result[Domain, Exception]:
+    def add(self, owner: OwnerT, first_name: Optional[str], last_name: Optional[str]) -> None:
+        tokens = _name_tokens(first_name, last_name)
+        if tokens is None:
+            return
+        for local, pattern in pattern_index(*tokens).items():
+            self._owners.setdefault(local, {}).setdefault(owner, pattern)
+
+    def lookup(self, local: str) -> Mapping[OwnerT, str]:
+        """local-part に一致する持ち主と、そのときのパターンを返す。"""
+        return self._owners.get(local.lower(), {})
+
+
+class DomainEnricher(Enricher[Domain]):
+    """
+    既存メールから多数決で Domain.pattern を推定する。
+    voted_patterns（{str(domain_id): pattern}、domain_pattern_votes の最多得票）を渡すと、
+    メールを数え直さずにそれを引くだけにする。
+    demoted_patterns（{str(domain_id): パターンの集合}、pattern_feedback が外したもの）の
+    パターンに決まった場合は採用しない。
+    """
+
+    def __init__(
+        self,
+        emails_by_domain: Optional[Dict[str, Iterable[EmailEntry]]] = None,
+        voted_patterns: Optional[Mapping[str, str]] = None,
+        demoted_patterns: Optional[Mapping[str, Collection[str]]] = None,
+    ) -> None:
+        self.emails_by_domain = emails_by_domain or {}
+        self.voted_patterns = voted_patterns
+        self.demoted_patterns = demoted_patterns or {}
+
+    def enrich(self, domain: Domain | DomainRow) -> Result[Domain | DomainRow, Exception]:
+        # Web メール・使い捨てのドメインは会社のパターンを持たない
+        if domain.webmail or domain.disposable:
+            return Result.ok(domain)
         try:
-            pattern = self._decide_pattern(domain.domain)
+            if self.voted_patterns is not None:
+                pattern = self.voted_patterns.get(str(domain.id))
+            else:
+                pattern = self._decide_pattern(domain.domain)
         except Exception as exc:  # pragma: no cover - defensive
             return Result.err(exc)
 
-        if pattern:
+        if pattern and pattern not in self.demoted_patterns.get(str(domain.id), ()):
             domain.pattern = pattern
         return Result.ok(domain)
 
@@ -82,24 +152,62 @@ class DomainEnricher(Enricher[Domain]):
         emails = self.emails_by_domain.get(domain_value.lower())
         if not emails:
             return None
+        return vote_pattern(emails)
 
-        counts: Counter[str] = Counter()
-        for email in emails:
-            if email.status and email.status.lower() == "bad":
-                continue
 
-            pattern = infer_pattern(email.local, email.first_name, email.last_name)
-            if pattern:
-                counts[pattern] += 1
+def vote_pattern(emails: Iterable[EmailEntry]) -> Optional[str]:
+    """1 ドメイン分のメールからパターンを多数決で決める（Bad は除外、同数なら決めない）。"""
+    counts: Counter[str] = Counter()
+    for email in emails:
+        if email.status and email.status.lower() == "bad":
+            continue
 
-        if not counts:
-            return None
+        pattern = infer_pattern(email.local, email.first_name, email.last_name)
+        if pattern:
+            counts[pattern] += 1
 
-        most_common = counts.most_common()
-        top_count = most_common[0][1]
-        top_patterns = [pattern for pattern, count in most_common if count == top_count]
+    if not counts:
+        return None
 
-        if len(top_patterns) != 1:
-            return None
+    most_common = counts.most_common()
+    top_count = most_common[0][1]
+    top_patterns = [pattern for pattern, count in most_common if count == top_count]
+
+    if len(top_patterns) != 1:
+        return None
 
-        return top_patterns[0]
+    return top_patterns[0]
+
+
+# rank_patterns の事前分布の強さ（全パターン合計の擬似票数）。小さいほど実績の票を重く見る
+PRIOR_STRENGTH = 1.0
+
+
+def rank_patterns(
+    ok_counts: Mapping[str, int],
+    bad_counts: Mapping[str, int],
+    prior: Optional[Mapping[str, float]] = None,
+) -> list[tuple[str, float]]:
+    """
+    1 ドメイン分の票から、全パターンの事後確率（合計 1）を降順に並べて返す。
+    重みは (事前の擬似票 + Ok 数) × 有効率で、有効率はパターンごとの Beta(1, 1) 事後平均
+    (Ok + 1) / (Ok + Bad + 2)。Bad になったパターンは Ok が無ければ 1/3 以下に押し下げられる。
+    prior（{パターン: 重み}、合計 1 に正規化）が無ければ一様。同率は PATTERN_BUILDERS の順。
+    """
+    weights: dict[str, float] = {}
+    prior_total = sum(prior.values()) if prior else 0.0
+    for pattern in PATTERN_BUILDERS:
+        if prior and prior_total > 0:
+            pseudo = PRIOR_STRENGTH * prior.get(pattern, 0.0) / prior_total
+        else:
+            pseudo = PRIOR_STRENGTH / len(PATTERN_BUILDERS)
+        ok = ok_counts.get(pattern, 0)
+        bad = bad_counts.get(pattern, 0)
+        weights[pattern] = (pseudo + ok) * (ok + 1) / (ok + bad + 2)
+
+    total = sum(weights.values())
+    if total <= 0:
+        return []
+    ranked = [(pattern, weight / total) for pattern, weight in weights.items()]
+    # sorted は安定なので、同率なら PATTERN_BUILDERS の順が残る
+    return sorted(ranked, key=lambda item: item[1], reverse=True)
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import functools
+import re
+from collections import Counter
+from typing import Callable, Iterable, Mapping, Optional
+
+from .domain import PATTERN_BUILDERS, _name_tokens
+
+# テンプレートの記法: {first} / {last} は名・姓、{f} / {l} はその頭文字。それ以外は文字どおり。
+# 例: "{last}.{f}", "{first}_{l}", "{last}{f}"
+_PLACEHOLDER = re.compile(r"\{(first|last|f|l)\}")
+# 氏名以外に local-part に現れてよい文字（区切りだけ）。数字は同姓同名の区別など本人ごとの
+# 値なので、テンプレートに写すと他の人にも同じ数字を付けてしまう
+_LITERAL_CHARS = frozenset("._-")
+_FIRST_TOKENS = ("{first}", "{f}")
+
+TemplateBuilder = Callable[[str, str], str]
+
+
+def compile_template(template: str) -> TemplateBuilder:
+    """テンプレートを (first, last) -> local-part の関数にする。"""
+    return _compile(template)
+
+
+@functools.lru_cache(maxsize=4096)
+def _compile(template: str) -> TemplateBuilder:
+    parts: list[tuple[Optional[str], str]] = []
+    position = 0
+    for match in _PLACEHOLDER.finditer(template):
+        if match.start() > position:
+            parts.append((None, template[position : match.start()]))
+        parts.append((match.group(1), ""))
+        position = match.end()
+    if position < len(template):
+        parts.append((None, template[position:]))
+    frozen = tuple(parts)
+
+    def build(first: str, last: str) -> str:
+        values = {"first": first, "last": last, "f": first[:1], "l": last[:1]}
+        return "".join(values[name] if name else literal for name, literal in frozen)
+
+    return build
+
+
+def _builtin_templates() -> dict[str, str]:
+    """PATTERN_BUILDERS の各パターンをテンプレート記法にした {テンプレート: パターン名}。"""
+    # 名と姓を区別できる番兵で組み立て、頭文字（1 文字目）と全体を置き換える
+    first, last = "\x01\x03", "\x02\x04"
+    templates: dict[str, str] = {}
+    for name, builder in PATTERN_BUILDERS.items():
+        rendered = builder(first, last)
+        template = (
+            rendered.replace(first, "{first}")
+            .replace(last, "{last}")
+            .replace("\x01", "{f}")
+            .replace("\x02", "{l}")
+        )
+        templates.setdefault(template, name)
+    return templates
+
+
+BUILTIN_TEMPLATES: Mapping[str, str] = _builtin_templates()
+
+
+def build_local(template: str, first: Optional[str], last: Optional[str]) -> Optional[str]:
+    """テンプレートで local-part を作る。テンプレートが使う名・姓が無ければ None。"""
+    if not first and ("{first}" in template or "{f}" in template):
+        return None
+    if not last and ("{last}" in template or "{l}" in template):
+        return None
+    return compile_template(template)(first or "", last or "") or None
+
+
+def align_local_part(
+    local: str, first_name: Optional[str], last_name: Optional[str]
+) -> Optional[str]:
+    """
+    local-part を正規化した名・姓と突き合わせ、テンプレートにする。
+    名・姓はそれぞれ全体か頭文字で高々 1 回、残りは区切り（. _ -）だけを許す。
+    姓か名の全体を含まない、または説明できない文字（数字を含む）が残る場合は None。
+    複数の分け方があれば、文字どおりの部分が少なく、頭文字より全体を使うものを選ぶ。
+    """
+    tokens = _name_tokens(first_name, last_name)
+    if tokens is None:
+        return None
+    first, last = tokens
+    text = local.lower()
+    values = {"{first}": first, "{f}": first[0], "{last}": last, "{l}": last[0]}
+
+    @functools.lru_cache(maxsize=None)
+    def best(position: int, used_first: bool, used_last: bool):
+        # (文字どおりの文字数, 頭文字の数, 部品) の最小
+        if position == len(text):
+            return (0, 0, ())
+        options = []
+        for token, value in values.items():
+            is_first = token in _FIRST_TOKENS
+            if (used_first if is_first else used_last) or not text.startswith(value, position):
+                continue
+            rest = best(
+                position + len(value),
+                used_first or is_first,
+                used_last or not is_first,
+            )
+            if rest is not None:
+                initial = int(token in ("{f}", "{l}"))
+                options.append((rest[0], rest[1] + initial, (token, *rest[2])))
+        if text[position] in _LITERAL_CHARS:
+            rest = best(position + 1, used_first, used_last)
+            if rest is not None:
+                options.append((rest[0] + 1, rest[1], (text[position], *rest[2])))
+        return min(options) if options else None
+
+    result = best(0, False, False)
+    if result is None:
+        return None
+    parts = result[2]
+    if "{first}" not in parts and "{last}" not in parts:
+        return None
+    return "".join(parts)
+
+
+def mine_templates(
+    emails: Iterable[tuple[str, Optional[str], Optional[str]]],
+) -> Counter[str]:
+    """(local-part, 名, 姓) の列からテンプレートごとの支持数を数える。"""
+    support: Counter[str] = Counter()
+    for local, first_name, last_name in emails:
+        template = align_local_part(local, first_name, last_name)
+        if template:
+            support[template] += 1
+    return support
@@ -5,11 +5,16 @@ import csv
 import sqlite3
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, Sequence
+from typing import Collection, Iterable, Sequence
 
-from pydantic import BaseModel, TypeAdapter
+from pydantic import BaseModel, Field, TypeAdapter
 
-from src.enrichers.domain import PATTERN_BUILDERS
+from src.domain_pattern_votes import load_pattern_ranks, load_verified_patterns
+from src.enrichers.domain import PATTERN_BUILDERS, rank_patterns
+from src.enrichers.local_templates import build_local
+from src.mine_local_templates import load_domain_templates
+from src.pattern_feedback import load_demoted_patterns
+from src.pattern_priors import PatternPriorModel, load_pattern_prior_model
 from src.result import Result
 
 DEFAULT_DB_PATH = Path(__file__).resolve().parents[2] / "data" / "jordan.sqlite"
@@ -29,12 +34,17 @@ FALLBACK_PATTERNS: Sequence[str] = (
     "f_last",
     "flast",
 )
+# domain_pattern_ranks のあるドメインは、上位から事後確率の累計がこの値に達するまで出す
+DEFAULT_CONFIDENCE_THRESHOLD = 0.9
+DEFAULT_MAX_CANDIDATES = len(FALLBACK_PATTERNS)
 
 
 class Args(BaseModel):
     db: Path = DEFAULT_DB_PATH
     output: Path = DEFAULT_OUTPUT_PATH
     skip_if_email_exists: bool = False
+    confidence_threshold: float = Field(default=DEFAULT_CONFIDENCE_THRESHOLD, gt=0, le=1)
+    max_candidates: int = Field(default=DEFAULT_MAX_CANDIDATES, ge=1)
 
 
 @dataclass
@@ -42,6 +52,8 @@ class CompanyRecord:
     id: str
     name: str
     primary_domain_id: str | None
+    industry: str | None = None
+    employee_range: str | None = None
 
 
 @dataclass
@@ -50,6 +62,11 @@ class DomainRecord:
     company_id: str
     domain: str
     pattern: str | None
+    accept_all: bool = False
+    webmail: bool = False
+    disposable: bool = False
+    # resolve_mx の判定。None は未判定（候補を出す）、False は MX なし（候補を出さない）
+    mail_capable: bool | None = None
 
 
 @dataclass
@@ -67,6 +84,13 @@ class ContactRecord:
     source_url: str | None
 
 
+@dataclass
+class EmailCandidate:
+    email: str
+    pattern: str
+    confidence: float | None
+
+
 @dataclass
 class CandidateRow:
     company_id: str
@@ -84,6 +108,8 @@ class CandidateRow:
     domain: str | None
     pattern: str | None
     email_candidate: str | None
+    candidate_pattern: str | None = None
+    candidate_confidence: float | None = None
 
     def to_csv(self) -> dict[str, str | None]:
         return {
@@ -102,6 +128,12 @@ class CandidateRow:
             "domain": self.domain,
             "pattern": self.pattern,
             "email_candidate": self.email_candidate,
+            "candidate_pattern": self.candidate_pattern,
+            "candidate_confidence": (
+                f"{self.candidate_confidence:.4f}"
+                if self.candidate_confidence is not None
+                else None
+            ),
         }
 
 
@@ -122,6 +154,21 @@ def _parse_args() -> Args:
         action="store_true",
         help="Ignore contacts that already have at least one email row.",
     )
+    parser.add_argument(
+        "--confidence-threshold",
+        type=float,
+        default=DEFAULT_CONFIDENCE_THRESHOLD,
+        help=(
+            "domain_pattern_ranks のあるドメインは、上位パターンから事後確率の累計が"
+            f"この値に達するまで候補を出します (default: {DEFAULT_CONFIDENCE_THRESHOLD})"
+        ),
+    )
+    parser.add_argument(
+        "--max-candidates",
+        type=int,
+        default=DEFAULT_MAX_CANDIDATES,
+        help=f"1 人あたりの候補数の上限 (default: {DEFAULT_MAX_CANDIDATES})",
+    )
     parsed = parser.parse_args()
     args = TypeAdapter(Args).validate_python(vars(parsed))
     return args
@@ -138,9 +185,11 @@ def _connect(db_path: Path) -> Result[sqlite3.Connection, Exception]:
 
 
 def _load_companies(conn: sqlite3.Connection) -> Result[dict[str, CompanyRecord], Exception]:
-    """企業 ID をキーに名前と primary_domain_id を取得する。"""
+    """企業 ID をキーに名前と primary_domain_id、事前分布の条件に使う業種・規模を取得する。"""
     try:
-        cursor = conn.execute("SELECT id, name, primary_domain_id FROM companies")
+        cursor = conn.execute(
+            "SELECT id, name, primary_domain_id, industry, employee_range FROM companies"
+        )
         mapping: dict[str, CompanyRecord] = {}
         for row in cursor:
             company_id = str(row["id"])
@@ -149,6 +198,8 @@ def _load_companies(conn: sqlite3.Connection) -> Result[dict[str, CompanyRecord]
                 id=company_id,
                 name=row["name"],
                 primary_domain_id=str(primary_domain_id) if primary_domain_id is not None else None,
+                industry=row["industry"],
+                employee_range=row["employee_range"],
             )
         return Result.ok(mapping)
     except Exception as exc:
@@ -160,7 +211,13 @@ def _load_domains(
 ) -> Result[tuple[dict[str, DomainRecord], dict[str, list[DomainRecord]]], Exception]:
     """ドメインを ID 単位と企業単位の双方で参照できるよう読み込む。"""
     try:
-        cursor = conn.execute("SELECT id, company_id, domain, pattern FROM domains ORDER BY id")
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(domains)")}
+        # mail_capable は resolve_mx が追加する。まだ無い DB では未判定として扱う
+        mail_capable = "mail_capable" if "mail_capable" in columns else "NULL AS mail_capable"
+        cursor = conn.execute(
+            "SELECT id, company_id, domain, pattern, accept_all, webmail, disposable, "
+            f"{mail_capable} FROM domains ORDER BY id"
+        )
         domain_by_id: dict[str, DomainRecord] = {}
         domains_by_company: dict[str, list[DomainRecord]] = {}
         for row in cursor:
@@ -169,6 +226,12 @@ def _load_domains(
                 company_id=str(row["company_id"]),
                 domain=row["domain"],
                 pattern=row["pattern"],
+                accept_all=bool(row["accept_all"]),
+                webmail=bool(row["webmail"]),
+                disposable=bool(row["disposable"]),
+                mail_capable=(
+                    bool(row["mail_capable"]) if row["mail_capable"] is not None else None
+                ),
             )
             domain_by_id[record.id] = record
             domains_by_company.setdefault(record.company_id, []).append(record)
@@ -285,30 +348,63 @@ def _generate_candidates(
     pattern: str | None,
     first_name: str | None,
     last_name: str | None,
-) -> list[str]:
-    """ドメイン・パターン情報からユニークなメール候補を作る。"""
+    ranked: Sequence[tuple[str, float]] | None = None,
+    confidence_threshold: float = DEFAULT_CONFIDENCE_THRESHOLD,
+    max_candidates: int = DEFAULT_MAX_CANDIDATES,
+    template: str | None = None,
+    demoted: Collection[str] = (),
+    verified: Collection[str] = (),
+) -> list[EmailCandidate]:
+    """
+    ドメイン・パターン情報からユニークなメール候補を作る。
+    template（mine_local_templates が見つけた既存パターン外の形式）があり、氏名から作れれば
+    その 1 件だけを出す（demoted に入っているテンプレートは使わない）。
+    ranked（順位付きの分布、または事前分布の順位）があれば上位から、作れた候補の確率の累計が
+    confidence_threshold に達するまで出す。無ければ pattern、それも無ければ FALLBACK_PATTERNS。
+    いずれも max_candidates 件まで。demoted（検証結果で外したパターン）は使わない。
+    verified（Ok があり Bad の無いパターン）の候補を出したら、確率の累計によらずそこで止める
+    （事後確率は未検証のパターンにも重みを残すので、少ない Ok では閾値に届かない）。
+    """
     if not domain_value:
         return []
 
     first = _normalize_name_token(first_name)
     last = _normalize_name_token(last_name)
-    patterns: Iterable[str]
-    if pattern and pattern in PATTERN_BUILDERS:
-        patterns = (pattern,)
+    if template and template not in demoted:
+        local = build_local(template, first, last)
+        if local:
+            return [EmailCandidate(f"{local}@{domain_value}", template, None)]
+
+    patterns: Iterable[tuple[str, float | None]]
+    if ranked:
+        patterns = ranked
+    elif pattern and pattern in PATTERN_BUILDERS and pattern not in demoted:
+        patterns = ((pattern, None),)
     else:
-        patterns = FALLBACK_PATTERNS
+        patterns = ((pattern_name, None) for pattern_name in FALLBACK_PATTERNS)
 
-    candidates: list[str] = []
+    candidates: list[EmailCandidate] = []
     seen: set[str] = set()
-    for pattern_name in patterns:
+    covered = 0.0
+    for pattern_name, confidence in patterns:
+        if len(candidates) >= max_candidates:
+            break
+        if pattern_name in demoted:
+            continue
         local = _build_local(pattern_name, first, last)
         if not local:
             continue
         email = f"{local}@{domain_value}"
         if email in seen:
             continue
-        candidates.append(email)
+        candidates.append(EmailCandidate(email, pattern_name, confidence))
         seen.add(email)
+        if pattern_name in verified:
+            break
+        if confidence is not None:
+            covered += confidence
+            if covered >= confidence_threshold:
+                break
     return candidates
 
 
@@ -317,9 +413,28 @@ def _build_candidate_rows(
     companies: dict[str, CompanyRecord],
     company_domains: dict[str, DomainRecord | None],
     skip_contact_ids: set[str],
+    pattern_ranks: dict[str, list[tuple[str, float]]] | None = None,
+    confidence_threshold: float = DEFAULT_CONFIDENCE_THRESHOLD,
+    max_candidates: int = DEFAULT_MAX_CANDIDATES,
+    prior_model: PatternPriorModel | None = None,
+    local_templates: dict[str, str] | None = None,
+    demoted_patterns: dict[str, set[str]] | None = None,
+    verified_patterns: dict[str, set[str]] | None = None,
 ) -> list[CandidateRow]:
-    """候補ごとに 1 行のレコードを作成し CSV に渡す。"""
+    """
+    候補ごとに 1 行のレコードを作成し CSV に渡す。
+    票も pattern も無いドメインは、prior_model に学習データがあれば TLD・業種・規模の
+    事前分布の順に並べて絞り込む（無ければ FALLBACK_PATTERNS の全件）。
+    accept-all のドメインはどの候補も Ok になり検証で絞れないので、最上位の 1 件だけ出す。
+    MX が無いと判定したドメイン（mail_capable = 0）と、Web メール・使い捨てのドメインの担当者は
+    行ごと出さない。
+    local_templates（{domain_id: テンプレート}）のドメインは、そのテンプレートの 1 件を優先する。
+    demoted_patterns（{domain_id: パターンの集合}）のパターンは、どの経路でも候補にしない。
+    verified_patterns（{domain_id: Ok があり Bad の無いパターンの集合}）の候補が出たら
+    そのドメインの候補はそこまでにする。
+    """
     rows: list[CandidateRow] = []
+    prior_ranks: dict[str, list[tuple[str, float]]] = {}
     for contact in contacts:
         if skip_contact_ids and contact.id in skip_contact_ids:
             continue
@@ -329,13 +444,37 @@ def _build_candidate_rows(
             continue
 
         domain_record = company_domains.get(contact.company_id)
+        if domain_record is not None and (
+            domain_record.mail_capable is False or domain_record.webmail or domain_record.disposable
+        ):
+            continue
         domain_value = domain_record.domain if domain_record else None
         pattern_value = domain_record.pattern if domain_record else None
+        ranked = (pattern_ranks or {}).get(domain_record.id) if domain_record else None
+        if (
+            ranked is None
+            and domain_record is not None
+            and not pattern_value
+            and prior_model is not None
+            and prior_model.domain_count > 0
+        ):
+            ranked = prior_ranks.get(domain_record.id)
+            if ranked is None:
+                prior = prior_model.prior(
+                    domain_record.domain, company.industry, company.employee_range
+                )
+                ranked = prior_ranks[domain_record.id] = rank_patterns({}, {}, prior)
         candidate_emails = _generate_candidates(
             domain_value,
             pattern_value,
             contact.first_name,
             contact.last_name,
+            ranked=ranked,
+            confidence_threshold=confidence_threshold,
+            max_candidates=1 if domain_record and domain_record.accept_all else max_candidates,
+            template=(local_templates or {}).get(domain_record.id) if domain_record else None,
+            demoted=(demoted_patterns or {}).get(domain_record.id, ()) if domain_record else (),
+            verified=(verified_patterns or {}).get(domain_record.id, ()) if domain_record else (),
         )
 
         if not candidate_emails:
@@ -360,7 +499,7 @@ def _build_candidate_rows(
             )
             continue
 
-        for candidate_email in candidate_emails:
+        for candidate in candidate_emails:
             rows.append(
                 CandidateRow(
                     company_id=contact.company_id,
@@ -377,7 +516,9 @@ def _build_candidate_rows(
                     source_url=contact.source_url,
                     domain=domain_value,
                     pattern=pattern_value,
-                    email_candidate=candidate_email,
+                    email_candidate=candidate.email,
+                    candidate_pattern=candidate.pattern,
+                    candidate_confidence=candidate.confidence,
                 )
             )
     return rows
@@ -413,6 +554,31 @@ def export_candidates(args: Args) -> Result[int, Exception]:
                 return Result.err(skip_result.unwrap_err())
             skip_ids = skip_result.unwrap()
 
+        ranks_result = load_pattern_ranks(conn)
+        if ranks_result.is_err():
+            return Result.err(ranks_result.unwrap_err())
+        pattern_ranks = ranks_result.unwrap()
+
+        verified_result = load_verified_patterns(conn)
+        if verified_result.is_err():
+            return Result.err(verified_result.unwrap_err())
+        verified_patterns = verified_result.unwrap()
+
+        prior_result = load_pattern_prior_model(conn)
+        if prior_result.is_err():
+            return Result.err(prior_result.unwrap_err())
+        prior_model = prior_result.unwrap()
+
+        templates_result = load_domain_templates(conn)
+        if templates_result.is_err():
+            return Result.err(templates_result.unwrap_err())
+        local_templates = templates_result.unwrap()
+
+        demoted_result = load_demoted_patterns(conn)
+        if demoted_result.is_err():
+            return Result.err(demoted_result.unwrap_err())
+        demoted_patterns = demoted_result.unwrap()
+
         company_domains = _select_company_domain(companies, domain_by_id, domains_by_company)
 
     finally:
@@ -423,6 +589,13 @@ def export_candidates(args: Args) -> Result[int, Exception]:
         companies=companies,
         company_domains=company_domains,
         skip_contact_ids=skip_ids,
+        pattern_ranks=pattern_ranks,
+        confidence_threshold=args.confidence_threshold,
+        max_candidates=args.max_candidates,
+        prior_model=prior_model,
+        local_templates=local_templates,
+        demoted_patterns=demoted_patterns,
+        verified_patterns=verified_patterns,
     )
 
     args.output.parent.mkdir(parents=True, exist_ok=True)
@@ -442,6 +615,8 @@ def export_candidates(args: Args) -> Result[int, Exception]:
         "domain",
         "pattern",
         "email_candidate",
+        "candidate_pattern",
+        "candidate_confidence",
     ]
     try:
         with args.output.open("w", newline="", encoding="utf-8") as handle:
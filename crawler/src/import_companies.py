@@ -11,6 +11,7 @@ from urllib.parse import urlsplit, urlunsplit
 import httpx
 from pydantic import BaseModel, Field, TypeAdapter
 
+from src.domain_classifier import classify_domain
 from src.result import Result
 
 DEFAULT_DB_PATH = Path(__file__).resolve().parents[2] / "data" / "jordan.sqlite"
@@ -300,6 +301,8 @@ def _insert_company_and_domain(
 
         # ここで UUID を発行
         company_id = str(uuid.uuid4())
+        # フリーメール・使い捨てのドメインは取り込み時に印を付け、票や候補の対象から外す
+        kind = classify_domain(domain)
 
         # id を含めて INSERT する
         conn.execute(
@@ -340,9 +343,16 @@ def _insert_company_and_domain(
               last_seen_at,
               created_at,
               updated_at
-            ) VALUES (?, ?, 0, 0, 0, NULL, NULL, NULL, ?, ?)
+            ) VALUES (?, ?, ?, ?, 0, NULL, NULL, NULL, ?, ?)
             """,
-            (company_id, domain, now_ts, now_ts),
+            (
+                company_id,
+                domain,
+                int(kind.disposable),
+                int(kind.webmail),
+                now_ts,
+                now_ts,
+            ),
         )
         domain_id = str(domain_cursor.lastrowid)
 
@@ -10,7 +10,10 @@ from typing import Optional
 
 from pydantic import BaseModel, Field, TypeAdapter
 
-from src.enrichers.domain import PATTERN_BUILDERS
+from src.domain_classifier import classify_domain
+from src.domain_pattern_votes import ensure_domain_pattern_votes_table, record_pattern_vote
+from src.enrichers.domain import LocalPartIndex
+from src.pattern_feedback import run_feedback
 from src.result import Result
 
 DEFAULT_DB_PATH = Path(__file__).resolve().parents[2] / "data" / "jordan.sqlite"
@@ -31,13 +34,6 @@ class HippoRow:
     mail_server_country_code: Optional[str]
 
 
-@dataclass
-class ContactName:
-    id: int
-    first_name: Optional[str]
-    last_name: Optional[str]
-
-
 def _parse_args() -> Args:
     parser = argparse.ArgumentParser(
         description="Import EmailHippo GUI CSV and create emails rows."
@@ -131,81 +127,74 @@ def _find_domain_and_company_id(
 
 def _load_contacts_by_company(
     conn: sqlite3.Connection,
-) -> Result[dict[str, list[ContactName]], Exception]:
+) -> Result[dict[str, LocalPartIndex[int]], Exception]:
+    """会社ごとに、担当者の氏名から作れる local-part の逆引きを作る。"""
     try:
         cursor = conn.execute(
-            "SELECT id, company_id, first_name, last_name FROM contacts WHERE first_name IS NOT NULL AND last_name IS NOT NULL"
+            "SELECT id, company_id, first_name, last_name FROM contacts "
+            "WHERE first_name IS NOT NULL AND last_name IS NOT NULL"
         )
-        mapping: dict[str, list[ContactName]] = {}
+        mapping: dict[str, LocalPartIndex[int]] = {}
         for row in cursor:
             company_id = str(row["company_id"])
-            mapping.setdefault(company_id, []).append(
-                ContactName(
-                    id=int(row["id"]),
-                    first_name=row["first_name"],
-                    last_name=row["last_name"],
-                )
-            )
+            index = mapping.get(company_id)
+            if index is None:
+                index = mapping[company_id] = LocalPartIndex()
+            index.add(int(row["id"]), row["first_name"], row["last_name"])
         return Result.ok(mapping)
     except Exception as exc:
         return Result.err(exc)
 
 
-def _normalize_token(value: Optional[str]) -> Optional[str]:
-    if not value:
-        return None
-    normalized = "".join(ch for ch in value.strip().lower() if ch.isascii())
-    filtered = "".join(ch for ch in normalized if ch.isalnum())
-    return filtered or None
-
-
-def _guess_contact_id(
+def _guess_contact(
     local_part: str,
     company_id: Optional[str],
-    contacts_by_company: dict[str, list[ContactName]],
-) -> Optional[int]:
+    contacts_by_company: dict[str, LocalPartIndex[int]],
+) -> Optional[tuple[int, str]]:
+    """
+    local-part がどれかのパターンで一致する担当者が会社内に 1 人だけなら
+    (その id, 一致したパターン) を返す。
+    """
     if not company_id:
         return None
 
-    candidates = contacts_by_company.get(company_id) or []
-    if not candidates:
+    index = contacts_by_company.get(company_id)
+    if index is None:
         return None
 
-    normalized_local = local_part.lower()
-    matches: list[int] = []
-    for contact in candidates:
-        first = _normalize_token(contact.first_name)
-        last = _normalize_token(contact.last_name)
-        if not first or not last:
-            continue
-        for pattern, builder in PATTERN_BUILDERS.items():
-            try:
-                built = builder(first, last)
-            except Exception:
-                continue
-            if built == normalized_local:
-                matches.append(contact.id)
-                break
-
+    matches = index.lookup(local_part)
     if len(matches) == 1:
-        return matches[0]
+        return next(iter(matches.items()))
     return None
 
 
+def _guess_contact_id(
+    local_part: str,
+    company_id: Optional[str],
+    contacts_by_company: dict[str, LocalPartIndex[int]],
+) -> Optional[int]:
+    """local-part がどれかのパターンで一致する担当者が会社内に 1 人だけならその id を返す。"""
+    guessed = _guess_contact(local_part, company_id, contacts_by_company)
+    return guessed[0] if guessed else None
+
+
 def _insert_email(
     conn: sqlite3.Connection,
     row: HippoRow,
     domain_id: Optional[int],
     company_id: Optional[str],
     source: str,
-    contacts_by_company: dict[str, list[ContactName]],
+    contacts_by_company: dict[str, LocalPartIndex[int]],
 ) -> Result[None, Exception]:
     try:
         now = int(time.time())
         contact_id: Optional[int] = None
+        pattern: Optional[str] = None
         try:
             local, _ = row.email.split("@", 1)
-            contact_id = _guess_contact_id(local, company_id, contacts_by_company)
+            guessed = _guess_contact(local, company_id, contacts_by_company)
+            if guessed:
+                contact_id, pattern = guessed
         except Exception:
             contact_id = None
 
@@ -240,9 +229,17 @@ def _insert_email(
                 now,
             ),
         )
+        # 担当者とパターンが決まった検証済みメールは、同じトランザクションで票に加える
+        # （Web メール・使い捨てのドメインは会社のパターンではないので数えない）
+        if domain_id is not None and pattern and not classify_domain(row.email).flagged:
+            vote_result = record_pattern_vote(conn, domain_id, pattern, row.status)
+            if vote_result.is_err():
+                conn.rollback()
+                return Result.err(vote_result.unwrap_err())
         conn.commit()
         return Result.ok(None)
     except Exception as exc:
+        conn.rollback()
         return Result.err(exc)
 
 
@@ -257,6 +254,11 @@ def run(args: Args) -> Result[int, Exception]:
             print("Ensuring email columns failed:", ensure_result.unwrap_err())
             return Result.err(ensure_result.unwrap_err())
 
+        votes_result = ensure_domain_pattern_votes_table(conn)
+        if votes_result.is_err():
+            print("Ensuring domain_pattern_votes failed:", votes_result.unwrap_err())
+            return Result.err(votes_result.unwrap_err())
+
         contacts_result = _load_contacts_by_company(conn)
         if contacts_result.is_err():
             print("Loading contacts by company failed:", contacts_result.unwrap_err())
@@ -279,6 +281,12 @@ def run(args: Args) -> Result[int, Exception]:
                 continue
             inserted += 1
 
+        # 増えた Bad で有効率が閾値を下回ったパターンを外す（票が増えたドメインだけ見る）
+        feedback_result = run_feedback(conn)
+        if feedback_result.is_err():
+            print("Pattern feedback failed:", feedback_result.unwrap_err())
+            return Result.err(feedback_result.unwrap_err())
+
         return Result.ok(inserted)
     finally:
         conn.close()
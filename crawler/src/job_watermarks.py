@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import sqlite3
+import time
+
+from src.result import Result
+
+
+def ensure_job_watermarks_table(conn: sqlite3.Connection) -> Result[None, Exception]:
+    """ジョブごとの処理済み位置（updated_at の高水位）を保存する job_watermarks を作成する。"""
+    try:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS job_watermarks (
+              job TEXT PRIMARY KEY,
+              last_updated_at INTEGER NOT NULL,
+              processed INTEGER NOT NULL DEFAULT 0,
+              updated_at INTEGER NOT NULL
+            )
+            """
+        )
+        conn.commit()
+        return Result.ok(None)
+    except Exception as exc:
+        return Result.err(exc)
+
+
+def get_watermark(conn: sqlite3.Connection, job: str) -> Result[int | None, Exception]:
+    """job の last_updated_at を返す。まだ 1 度も完了していなければ None。"""
+    try:
+        row = conn.execute(
+            "SELECT last_updated_at FROM job_watermarks WHERE job = ?", (job,)
+        ).fetchone()
+        return Result.ok(int(row[0]) if row else None)
+    except Exception as exc:
+        return Result.err(exc)
+
+
+def set_watermark(
+    conn: sqlite3.Connection, job: str, last_updated_at: int, processed: int = 0
+) -> Result[None, Exception]:
+    """job の高水位を更新して commit する。処理が最後まで成功した場合だけ呼ぶこと。"""
+    try:
+        conn.execute(
+            """
+            INSERT INTO job_watermarks (job, last_updated_at, processed, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(job) DO UPDATE SET
+              last_updated_at = excluded.last_updated_at,
+              processed = excluded.processed,
+              updated_at = excluded.updated_at
+            """,
+            (job, last_updated_at, processed, int(time.time())),
+        )
+        conn.commit()
+        return Result.ok(None)
+    except Exception as exc:
+        return Result.err(exc)
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import sqlite3
+import time
+from dataclasses import dataclass
+
+from src.adapters.openai import LlmCallUsage
+from src.result import Result
+
+# USD / 1M tokens（input, cached input, output）。reasoning tokens は output に含まれて課金される。
+MODEL_PRICES_PER_MILLION: dict[str, tuple[float, float, float]] = {
+    "gpt-5-nano-2025-08-07": (0.05, 0.005, 0.40),
+    "gpt-5-mini-2025-08-07": (0.25, 0.025, 2.00),
+}
+# web_search ツール 1 回あたりの料金（USD）
+WEB_SEARCH_COST_PER_CALL = 0.01
+_SNAPSHOT_SUFFIX = re.compile(r"-\d{4}-\d{2}-\d{2}$")
+
+
+@dataclass
+class LlmCallRecord:
+    """llm_calls テーブルの 1 行。"""
+
+    usage: LlmCallUsage
+    prompt_hash: str
+    caller: str
+    run_id: str | None = None
+    prompt_template: str | None = None
+    company_id: str | None = None
+    # 複数部署をまとめて検索した場合はカンマ区切り
+    department: str | None = None
+
+
+def hash_prompt(prompt: str) -> str:
+    """同一プロンプトを突き合わせるための短いハッシュ。"""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+
+
+def _model_prices(model: str) -> tuple[float, float, float] | None:
+    prices = MODEL_PRICES_PER_MILLION.get(model)
+    if prices is not None:
+        return prices
+    # API が返すモデル名はスナップショット日付の有無が揃わないため、日付を除いて突き合わせる
+    base = _SNAPSHOT_SUFFIX.sub("", model)
+    for name, value in MODEL_PRICES_PER_MILLION.items():
+        if _SNAPSHOT_SUFFIX.sub("", name) == base:
+            return value
+    return None
+
+
+def estimate_cost_usd(
+    model: str,
+    input_tokens: int,
+    cached_tokens: int,
+    output_tokens: int,
+    web_search_calls: int = 0,
+) -> float | None:
+    """トークン数と web_search 回数から料金を見積もる。単価不明のモデルは None。"""
+    prices = _model_prices(model)
+    if prices is None:
+        return None
+    input_price, cached_price, output_price = prices
+    uncached = max(0, input_tokens - cached_tokens)
+    return (
+        uncached * input_price
+        + cached_tokens * cached_price
+        + output_tokens * output_price
+    ) / 1_000_000 + web_search_calls * WEB_SEARCH_COST_PER_CALL
+
+
+def estimate_cache_savings_usd(model: str, cached_tokens: int) -> float:
+    """キャッシュヒットした入力トークンで節約できた料金。"""
+    prices = _model_prices(model)
+    if prices is None:
+        return 0.0
+    input_price, cached_price, _ = prices
+    return cached_tokens * (input_price - cached_price) / 1_000_000
+
+
+def ensure_llm_calls_table(conn: sqlite3.Connection) -> Result[None, Exception]:
+    """llm_calls テーブルと集計用の索引を作成する。"""
+    try:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_calls (
+              id INTEGER PRIMARY KEY AUTOINCREMENT,
+              run_id TEXT,
+              caller TEXT NOT NULL,
+              model TEXT NOT NULL,
+              prompt_template TEXT,
+              prompt_hash TEXT NOT NULL,
+              company_id TEXT,
+              department TEXT,
+              input_tokens INTEGER NOT NULL DEFAULT 0,
+              cached_tokens INTEGER NOT NULL DEFAULT 0,
+              output_tokens INTEGER NOT NULL DEFAULT 0,
+              reasoning_tokens INTEGER NOT NULL DEFAULT 0,
+              web_search_calls INTEGER NOT NULL DEFAULT 0,
+              latency_ms INTEGER NOT NULL DEFAULT 0,
+              cost_usd REAL,
+              outcome TEXT NOT NULL,
+              error TEXT,
+              created_at INTEGER NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_calls_run_id ON llm_calls (run_id)")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_llm_calls_company_id ON llm_calls (company_id)"
+        )
+        conn.commit()
+        return Result.ok(None)
+    except Exception as exc:
+        return Result.err(exc)
+
+
+def insert_llm_call(
+    conn: sqlite3.Connection, record: LlmCallRecord
+) -> Result[float | None, Exception]:
+    """llm_calls に 1 行追加し、見積もった料金を返す。commit は呼び出し側で行う。"""
+    usage = record.usage
+    cost = estimate_cost_usd(
+        usage.model,
+        usage.input_tokens,
+        usage.cached_tokens,
+        usage.output_tokens,
+        usage.web_search_calls,
+    )
+    try:
+        conn.execute(
+            """
+            INSERT INTO llm_calls (
+              run_id, caller, model, prompt_template, prompt_hash, company_id, department,
+              input_tokens, cached_tokens, output_tokens, reasoning_tokens, web_search_calls,
+              latency_ms, cost_usd, outcome, error, created_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                record.run_id,
+                record.caller,
+                usage.model,
+                record.prompt_template,
+                record.prompt_hash,
+                record.company_id,
+                record.department,
+                usage.input_tokens,
+                usage.cached_tokens,
+                usage.output_tokens,
+                usage.reasoning_tokens,
+                usage.web_search_calls,
+                usage.latency_ms,
+                cost,
+                usage.outcome,
+                usage.error,
+                int(time.time()),
+            ),
+        )
+        return Result.ok(cost)
+    except Exception as exc:
+        return Result.err(exc)
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import argparse
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Literal
+
+from pydantic import BaseModel, TypeAdapter
+
+from src.llm_ledger import estimate_cache_savings_usd
+from src.result import Result
+
+DEFAULT_DB_PATH = Path(__file__).resolve().parents[2] / "data" / "jordan.sqlite"
+DEFAULT_LIMIT = 20
+
+GroupBy = Literal["company", "department", "run", "prompt", "caller"]
+
+_GROUP_KEY_SQL: dict[str, str] = {
+    "company": "COALESCE(company_id, '')",
+    "department": "COALESCE(department, '')",
+    "run": "COALESCE(run_id, '')",
+    "prompt": "COALESCE(prompt_template, '') || ':' || prompt_hash",
+    "caller": "caller",
+}
+
+
+class Args(BaseModel):
+    db: Path = DEFAULT_DB_PATH
+    by: GroupBy = "company"
+    run_id: str | None = None
+    limit: int = DEFAULT_LIMIT
+
+
+@dataclass
+class ReportRow:
+    key: str
+    calls: float = 0.0
+    errors: float = 0.0
+    input_tokens: float = 0.0
+    cached_tokens: float = 0.0
+    output_tokens: float = 0.0
+    reasoning_tokens: float = 0.0
+    web_search_calls: float = 0.0
+    latency_ms: float = 0.0
+    cost_usd: float = 0.0
+    cache_savings_usd: float = 0.0
+
+    def add(self, other: "ReportRow", weight: float = 1.0) -> None:
+        self.calls += other.calls * weight
+        self.errors += other.errors * weight
+        self.input_tokens += other.input_tokens * weight
+        self.cached_tokens += other.cached_tokens * weight
+        self.output_tokens += other.output_tokens * weight
+        self.reasoning_tokens += other.reasoning_tokens * weight
+        self.web_search_calls += other.web_search_calls * weight
+        self.latency_ms += other.latency_ms * weight
+        self.cost_usd += other.cost_usd * weight
+        self.cache_savings_usd += other.cache_savings_usd * weight
+
+
+def _parse_args() -> Args:
+    parser = argparse.ArgumentParser(
+        description="Aggregate LLM call cost / tokens / latency recorded in llm_calls."
+    )
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH, help="Path to SQLite DB")
+    parser.add_argument(
+        "--by",
+        choices=list(_GROUP_KEY_SQL),
+        default="company",
+        help="Group rows by company / department / run / prompt / caller (default: company)",
+    )
+    parser.add_argument("--run-id", type=str, default=None, help="Only include this run")
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=DEFAULT_LIMIT,
+        help=f"Show the N most expensive groups (default: {DEFAULT_LIMIT}, 0 = all)",
+    )
+    parsed = parser.parse_args()
+    return TypeAdapter(Args).validate_python(vars(parsed))
+
+
+def aggregate_llm_calls(
+    conn: sqlite3.Connection,
+    by: GroupBy = "company",
+    run_id: str | None = None,
+) -> Result[list[ReportRow], Exception]:
+    """
+    llm_calls をグループごとに集計し、料金の高い順に返す。
+    department は複数部署をまとめて検索した呼び出しを部署数で按分する。
+    """
+    where_clause = "WHERE run_id = ?" if run_id else ""
+    params: tuple[str, ...] = (run_id,) if run_id else ()
+    try:
+        cursor = conn.execute(
+            f"""
+            SELECT
+                {_GROUP_KEY_SQL[by]} AS group_key,
+                model,
+                COUNT(*) AS calls,
+                SUM(outcome != 'ok') AS errors,
+                SUM(input_tokens) AS input_tokens,
+                SUM(cached_tokens) AS cached_tokens,
+                SUM(output_tokens) AS output_tokens,
+                SUM(reasoning_tokens) AS reasoning_tokens,
+                SUM(web_search_calls) AS web_search_calls,
+                SUM(latency_ms) AS latency_ms,
+                SUM(COALESCE(cost_usd, 0)) AS cost_usd
+            FROM llm_calls
+            {where_clause}
+            GROUP BY group_key, model
+            """,
+            params,
+        )
+        rows: dict[str, ReportRow] = {}
+        for row in cursor:
+            partial = ReportRow(
+                key=row["group_key"],
+                calls=row["calls"],
+                errors=row["errors"] or 0,
+                input_tokens=row["input_tokens"] or 0,
+                cached_tokens=row["cached_tokens"] or 0,
+                output_tokens=row["output_tokens"] or 0,
+                reasoning_tokens=row["reasoning_tokens"] or 0,
+                web_search_calls=row["web_search_calls"] or 0,
+                latency_ms=row["latency_ms"] or 0,
+                cost_usd=row["cost_usd"] or 0.0,
+                cache_savings_usd=estimate_cache_savings_usd(
+                    row["model"], row["cached_tokens"] or 0
+                ),
+            )
+            keys = [partial.key]
+            if by == "department":
+                keys = partial.key.split(",")
+            for key in keys:
+                rows.setdefault(key, ReportRow(key=key)).add(partial, 1.0 / len(keys))
+        return Result.ok(sorted(rows.values(), key=lambda r: r.cost_usd, reverse=True))
+    except Exception as exc:
+        return Result.err(exc)
+
+
+def _load_company_names(conn: sqlite3.Connection) -> dict[str, str]:
+    try:
+        cursor = conn.execute("SELECT id, name FROM companies")
+        return {str(row["id"]): row["name"] for row in cursor}
+    except sqlite3.OperationalError:
+        # companies テーブルが無い DB でもレポートは出したい
+        return {}
+
+
+def format_report(
+    rows: list[ReportRow], by: GroupBy, labels: dict[str, str] | None = None
+) -> str:
+    """集計結果をテキストの表にする。"""
+    header = (
+        f"{by:<40} {'calls':>7} {'err':>5} {'input':>10} {'cached':>10} {'output':>9} "
+        f"{'reason':>9} {'search':>7} {'avg_ms':>8} {'cost_usd':>10} {'saved_usd':>10}"
+    )
+    lines = [header, "-" * len(header)]
+    total = ReportRow(key="TOTAL")
+    for row in rows:
+        total.add(row)
+    for row in [*rows, total]:
+        label = row.key or "(none)"
+        if labels and row.key in labels:
+            label = f"{labels[row.key]} ({row.key})"
+        avg_latency = row.latency_ms / row.calls if row.calls else 0.0
+        lines.append(
+            f"{label[:40]:<40} {row.calls:>7.0f} {row.errors:>5.0f} {row.input_tokens:>10.0f} "
+            f"{row.cached_tokens:>10.0f} {row.output_tokens:>9.0f} {row.reasoning_tokens:>9.0f} "
+            f"{row.web_search_calls:>7.0f} {avg_latency:>8.0f} {row.cost_usd:>10.4f} "
+            f"{row.cache_savings_usd:>10.4f}"
+        )
+    return "\n".join(lines)
+
+
+def run(args: Args) -> Result[str, Exception]:
+    try:
+        conn = sqlite3.connect(args.db)
+        conn.row_factory = sqlite3.Row
+    except Exception as exc:  # pragma: no cover - sqlite3 error is enough
+        return Result.err(exc)
+
+    try:
+        rows_result = aggregate_llm_calls(conn, by=args.by, run_id=args.run_id)
+        if rows_result.is_err():
+            return Result.err(rows_result.unwrap_err())
+        rows = rows_result.unwrap()
+        if args.limit > 0:
+            # 上位以外は 1 行にまとめ、TOTAL が常に全体の合計になるようにする
+            shown, rest = rows[: args.limit], rows[args.limit :]
+            if rest:
+                other = ReportRow(key=f"(other {len(rest)} groups)")
+                for row in rest:
+                    other.add(row)
+                shown.append(other)
+            rows = shown
+        labels = _load_company_names(conn) if args.by == "company" else None
+        return Result.ok(format_report(rows, args.by, labels))
+    finally:
+        conn.close()
+
+
+def main() -> None:
+    args = _parse_args()
+    result = run(args)
+    if result.is_err():
+        raise SystemExit(f"[llm_report] {result.unwrap_err()}")
+    print(result.unwrap())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import time
+from collections import Counter
+from pathlib import Path
+
+from pydantic import BaseModel, TypeAdapter
+
+from src.enrich_domain import _email_domain_sql, ensure_domain_stream_indexes
+from src.enrichers.local_templates import BUILTIN_TEMPLATES, align_local_part
+from src.pattern_feedback import (
+    DEFAULT_MIN_OBSERVATIONS,
+    DEFAULT_PRECISION_THRESHOLD,
+    is_demoted,
+)
+from src.result import Result
+
+DEFAULT_DB_PATH = Path(__file__).resolve().parents[2] / "data" / "jordan.sqlite"
+# 既存パターン以外のテンプレートを候補生成に使うのに必要な Ok メール数
+DEFAULT_MIN_SUPPORT = 2
+
+
+class Args(BaseModel):
+    db: Path = DEFAULT_DB_PATH
+
+
+def ensure_domain_local_templates_table(conn: sqlite3.Connection) -> Result[None, Exception]:
+    """
+    ドメインごと・テンプレートごとの Ok メール数（支持数）と Bad メール数の表
+    domain_local_templates を作る。bad_count が無い古い表には列を追加する。
+    """
+    try:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS domain_local_templates (
+              domain_id INTEGER NOT NULL,
+              template TEXT NOT NULL,
+              support INTEGER NOT NULL,
+              bad_count INTEGER NOT NULL DEFAULT 0,
+              updated_at INTEGER NOT NULL,
+              PRIMARY KEY (domain_id, template)
+            ) WITHOUT ROWID
+            """
+        )
+        columns = conn.execute("PRAGMA table_info(domain_local_templates)").fetchall()
+        if not any(col[1] == "bad_count" for col in columns):
+            conn.execute(
+                "ALTER TABLE domain_local_templates ADD COLUMN bad_count INTEGER NOT NULL DEFAULT 0"
+            )
+        conn.commit()
+        return Result.ok(None)
+    except Exception as exc:
+        return Result.err(exc)
+
+
+def mine_local_templates(conn: sqlite3.Connection) -> Result[int, Exception]:
+    """
+    Ok / Bad のメール全件の local-part を連絡先の氏名と突き合わせてテンプレートにし、
+    domain_local_templates を作り直す（Ok は support、Bad は bad_count）。作成した行数を返す。
+    ドメインは rebuild_pattern_votes と同じく名前（大文字小文字を無視）で domains 行に対応させる。
+    Web メール・使い捨てのドメインは数えない。
+    """
+    for ensure in (ensure_domain_local_templates_table, ensure_domain_stream_indexes):
+        ensure_result = ensure(conn)
+        if ensure_result.is_err():
+            return Result.err(ensure_result.unwrap_err())
+
+    support: Counter[tuple[int, str]] = Counter()
+    bad: Counter[tuple[int, str]] = Counter()
+    try:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(
+            f"""
+            SELECT d.id, e.email, lower(e.status), c.first_name, c.last_name
+            FROM emails AS e
+            INNER JOIN contacts AS c ON c.id = e.contact_id
+            INNER JOIN domains AS d ON lower(d.domain) = {_email_domain_sql("e.email")}
+            WHERE instr(e.email, '@') > 0
+              AND lower(e.status) IN ('ok', 'bad')
+              AND d.webmail = 0 AND d.disposable = 0
+            """
+        )
+        for domain_id, email, status, first_name, last_name in cursor:
+            template = align_local_part(email.split("@", 1)[0], first_name, last_name)
+            if template:
+                (support if status == "ok" else bad)[(int(domain_id), template)] += 1
+    except Exception as exc:  # pragma: no cover - sqlite3 error is enough
+        return Result.err(exc)
+
+    now = int(time.time())
+    try:
+        conn.execute("DELETE FROM domain_local_templates")
+        cursor = conn.executemany(
+            "INSERT INTO domain_local_templates "
+            "(domain_id, template, support, bad_count, updated_at) VALUES (?, ?, ?, ?, ?)",
+            ((*key, support[key], bad[key], now) for key in sorted(support.keys() | bad.keys())),
+        )
+        conn.commit()
+        return Result.ok(cursor.rowcount)
+    except Exception as exc:
+        conn.rollback()
+        return Result.err(exc)
+
+
+def load_domain_templates(
+    conn: sqlite3.Connection,
+    min_support: int = DEFAULT_MIN_SUPPORT,
+    threshold: float = DEFAULT_PRECISION_THRESHOLD,
+    min_observations: int = DEFAULT_MIN_OBSERVATIONS,
+) -> Result[dict[str, str], Exception]:
+    """
+    ドメインごとに支持数が単独で最多のテンプレートを {domain_id: テンプレート} で返す。
+    有効率（support と bad_count、pattern_feedback と同じ基準）が threshold を下回る
+    テンプレートは数に入れない。既存パターン（BUILTIN_TEMPLATES）で表せるもの、
+    支持数が min_support 未満のもの、同数で並ぶものは含めない。表が無ければ空。
+    """
+    try:
+        cursor = conn.execute(
+            "SELECT domain_id, template, support, bad_count FROM domain_local_templates "
+            "ORDER BY domain_id, support DESC, template"
+        )
+    except sqlite3.OperationalError:
+        return Result.ok({})
+    except Exception as exc:
+        return Result.err(exc)
+
+    ranked: dict[str, list[tuple[str, int]]] = {}
+    for domain_id, template, count, bad_count in cursor:
+        if is_demoted(int(count), int(bad_count), threshold, min_observations):
+            continue
+        ranked.setdefault(str(domain_id), []).append((template, int(count)))
+    winners: dict[str, str] = {}
+    for domain_id, rows in ranked.items():
+        template, count = rows[0]
+        if len(rows) > 1 and rows[1][1] == count:
+            continue
+        if template in BUILTIN_TEMPLATES or count < min_support:
+            continue
+        winners[domain_id] = template
+    return Result.ok(winners)
+
+
+def _parse_args() -> Args:
+    parser = argparse.ArgumentParser(
+        description="Mine local-part templates per domain from verified emails and contact names."
+    )
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH, help="Path to SQLite DB")
+    return TypeAdapter(Args).validate_python(vars(parser.parse_args()))
+
+
+def main() -> None:
+    args = _parse_args()
+    conn = sqlite3.connect(args.db)
+    try:
+        result = mine_local_templates(conn)
+    finally:
+        conn.close()
+    if result.is_err():
+        raise SystemExit(f"[mine_local_templates] {result.unwrap_err()}")
+    print(f"Stored {result.unwrap()} domain templates.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from pydantic import BaseModel, Field, TypeAdapter
+
+from src.domain_pattern_votes import ensure_domain_pattern_votes_table
+from src.enrichers.domain import rank_patterns
+from src.enrichers.local_templates import BUILTIN_TEMPLATES
+from src.job_watermarks import ensure_job_watermarks_table, get_watermark, set_watermark
+from src.result import Result
+
+DEFAULT_DB_PATH = Path(__file__).resolve().parents[2] / "data" / "jordan.sqlite"
+WATERMARK_JOB = "pattern_feedback"
+# 有効率（Beta(1, 1) の事後平均）がこれを下回ったパターンは外す
+DEFAULT_PRECISION_THRESHOLD = 0.5
+# 判定に必要な Ok + Bad の件数。少ない件数の偶然の Bad では外さない
+DEFAULT_MIN_OBSERVATIONS = 3
+
+
+class Args(BaseModel):
+    db: Path = DEFAULT_DB_PATH
+    threshold: float = Field(default=DEFAULT_PRECISION_THRESHOLD, gt=0, lt=1)
+    min_observations: int = Field(default=DEFAULT_MIN_OBSERVATIONS, ge=1)
+    full: bool = False
+
+
+@dataclass
+class FeedbackStats:
+    demoted: int = 0
+    restored: int = 0
+    replaced_patterns: int = 0
+    cleared_patterns: int = 0
+
+
+def ensure_pattern_demotions_table(conn: sqlite3.Connection) -> Result[None, Exception]:
+    """検証結果で外したドメインごとのパターンを持つ domain_pattern_demotions を作成する。"""
+    try:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS domain_pattern_demotions (
+              domain_id INTEGER NOT NULL,
+              pattern TEXT NOT NULL,
+              ok_count INTEGER NOT NULL,
+              bad_count INTEGER NOT NULL,
+              demoted_at INTEGER NOT NULL,
+              PRIMARY KEY (domain_id, pattern)
+            ) WITHOUT ROWID
+            """
+        )
+        conn.commit()
+        return Result.ok(None)
+    except Exception as exc:
+        return Result.err(exc)
+
+
+def pattern_precision(ok: int, bad: int) -> float:
+    """パターンの有効率。rank_patterns と同じ Beta(1, 1) の事後平均 (Ok + 1) / (Ok + Bad + 2)。"""
+    return (ok + 1) / (ok + bad + 2)
+
+
+def is_demoted(
+    ok: int,
+    bad: int,
+    threshold: float = DEFAULT_PRECISION_THRESHOLD,
+    min_observations: int = DEFAULT_MIN_OBSERVATIONS,
+) -> bool:
+    """件数が min_observations 以上あり、有効率が threshold を下回るなら True。"""
+    return ok + bad >= min_observations and pattern_precision(ok, bad) < threshold
+
+
+def load_demoted_patterns(conn: sqlite3.Connection) -> Result[dict[str, set[str]], Exception]:
+    """{str(domain_id): 外したパターンの集合} を返す。表が無ければ空。"""
+    try:
+        cursor = conn.execute("SELECT domain_id, pattern FROM domain_pattern_demotions")
+    except sqlite3.OperationalError:
+        return Result.ok({})
+    except Exception as exc:
+        return Result.err(exc)
+    demoted: dict[str, set[str]] = {}
+    for domain_id, pattern in cursor:
+        demoted.setdefault(str(domain_id), set()).add(pattern)
+    return Result.ok(demoted)
+
+
+def _replacement(
+    ok_counts: dict[str, int], bad_counts: dict[str, int], demoted: set[str]
+) -> Optional[str]:
+    """外したパターンの代わりに、Ok のある外していないパターンのうち最上位を返す。"""
+    for pattern, _ in rank_patterns(ok_counts, bad_counts):
+        if pattern not in demoted and ok_counts.get(pattern, 0) > 0:
+            return pattern
+    return None
+
+
+def _template_demotions(
+    conn: sqlite3.Connection, threshold: float, min_observations: int
+) -> tuple[dict[tuple[int, str], tuple[int, int]], set[tuple[int, str]]]:
+    """
+    mine_local_templates のテンプレート（既存パターンで表せないもの）のうち外すものを
+    {(domain_id, テンプレート): (support, bad_count)} で、今記録されているものを集合で返す。
+    表は作り直されるたびに全件が変わるので、高水位を使わず毎回全件を見る。表が無ければ空。
+    """
+    recorded = {
+        (int(domain_id), pattern)
+        for domain_id, pattern in conn.execute(
+            "SELECT domain_id, pattern FROM domain_pattern_demotions "
+            "WHERE instr(pattern, '{') > 0"
+        )
+    }
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'domain_local_templates'"
+    ).fetchone()
+    if not exists:
+        return {}, recorded
+    demoted = {
+        (int(domain_id), template): (int(support), int(bad_count))
+        for domain_id, template, support, bad_count in conn.execute(
+            "SELECT domain_id, template, support, bad_count FROM domain_local_templates"
+        )
+        if template not in BUILTIN_TEMPLATES
+        and is_demoted(int(support), int(bad_count), threshold, min_observations)
+    }
+    return demoted, recorded
+
+
+def run_feedback(
+    conn: sqlite3.Connection,
+    threshold: float = DEFAULT_PRECISION_THRESHOLD,
+    min_observations: int = DEFAULT_MIN_OBSERVATIONS,
+    full: bool = False,
+) -> Result[FeedbackStats, Exception]:
+    """
+    domain_pattern_votes の Ok / Bad から各パターンの有効率を見直し、threshold を下回った
+    パターンを domain_pattern_demotions に記録する。domains.pattern がそのパターンなら
+    Ok のある次点（rank_patterns の順）に差し替え、無ければ NULL に戻す。
+    有効率が戻ったパターンは記録から外す（domains.pattern は次の多数決で埋まる）。
+    前回以降に票が増えたドメインだけを見る（高水位は job_watermarks）。full=True なら全件。
+    domain_local_templates のテンプレートも support / bad_count で同じように判定し、
+    テンプレート記法のまま記録する（こちらは毎回全件）。
+    """
+    for ensure in (
+        ensure_domain_pattern_votes_table,
+        ensure_pattern_demotions_table,
+        ensure_job_watermarks_table,
+    ):
+        ensure_result = ensure(conn)
+        if ensure_result.is_err():
+            return Result.err(ensure_result.unwrap_err())
+    since_result = get_watermark(conn, WATERMARK_JOB)
+    if since_result.is_err():
+        return Result.err(since_result.unwrap_err())
+    since = None if full else since_result.unwrap()
+
+    stats = FeedbackStats()
+    now = int(time.time())
+    try:
+        high_water = conn.execute("SELECT MAX(updated_at) FROM domain_pattern_votes").fetchone()[0]
+        # 同じ秒の更新を取りこぼさないよう >= で読む（結果が変わらなければ何も書かない）
+        touched = (
+            "SELECT domain_id FROM domain_pattern_votes"
+            if since is None
+            else "SELECT domain_id FROM domain_pattern_votes WHERE updated_at >= ?"
+        )
+        params: tuple[int, ...] = () if since is None else (since,)
+        counts: dict[int, tuple[dict[str, int], dict[str, int]]] = {}
+        for domain_id, pattern, ok_count, bad_count in conn.execute(
+            "SELECT domain_id, pattern, ok_count, bad_count FROM domain_pattern_votes "
+            f"WHERE domain_id IN ({touched})",
+            params,
+        ):
+            ok, bad = counts.setdefault(int(domain_id), ({}, {}))
+            ok[pattern] = int(ok_count)
+            bad[pattern] = int(bad_count)
+        previous: dict[int, set[str]] = {}
+        for domain_id, pattern in conn.execute(
+            "SELECT domain_id, pattern FROM domain_pattern_demotions "
+            f"WHERE domain_id IN ({touched})",
+            params,
+        ):
+            previous.setdefault(int(domain_id), set()).add(pattern)
+        current_patterns = {
+            int(domain_id): pattern
+            for domain_id, pattern in conn.execute(
+                f"SELECT id, pattern FROM domains WHERE id IN ({touched})", params
+            )
+        }
+
+        upserts: list[tuple[int, str, int, int, int]] = []
+        deletes: list[tuple[int, str]] = []
+        pattern_updates: list[tuple[Optional[str], int, int]] = []
+        for domain_id, (ok_counts, bad_counts) in sorted(counts.items()):
+            old = previous.get(domain_id, set())
+            demoted = {
+                pattern
+                for pattern in ok_counts
+                if is_demoted(
+                    ok_counts[pattern], bad_counts.get(pattern, 0), threshold, min_observations
+                )
+            }
+            for pattern in sorted(demoted - old):
+                upserts.append(
+                    (domain_id, pattern, ok_counts[pattern], bad_counts.get(pattern, 0), now)
+                )
+            deletes.extend((domain_id, pattern) for pattern in sorted(old - demoted))
+            stats.demoted += len(demoted - old)
+            stats.restored += len(old - demoted)
+
+            current = current_patterns.get(domain_id)
+            if current in demoted:
+                replacement = _replacement(ok_counts, bad_counts, demoted)
+                pattern_updates.append((replacement, now, domain_id))
+                if replacement:
+                    stats.replaced_patterns += 1
+                else:
+                    stats.cleared_patterns += 1
+
+        template_demoted, template_recorded = _template_demotions(
+            conn, threshold, min_observations
+        )
+        for key in sorted(template_demoted.keys() - template_recorded):
+            upserts.append((*key, *template_demoted[key], now))
+        deletes.extend(sorted(template_recorded - template_demoted.keys()))
+        stats.demoted += len(template_demoted.keys() - template_recorded)
+        stats.restored += len(template_recorded - template_demoted.keys())
+
+        conn.executemany(
+            """
+            INSERT INTO domain_pattern_demotions
+              (domain_id, pattern, ok_count, bad_count, demoted_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(domain_id, pattern) DO UPDATE SET
+              ok_count = excluded.ok_count,
+              bad_count = excluded.bad_count,
+              demoted_at = excluded.demoted_at
+            """,
+            upserts,
+        )
+        conn.executemany(
+            "DELETE FROM domain_pattern_demotions WHERE domain_id = ? AND pattern = ?", deletes
+        )
+        conn.executemany(
+            "UPDATE domains SET pattern = ?, updated_at = ? WHERE id = ?", pattern_updates
+        )
+        conn.commit()
+    except Exception as exc:
+        conn.rollback()
+        return Result.err(exc)
+
+    if high_water is not None:
+        watermark_result = set_watermark(conn, WATERMARK_JOB, int(high_water), len(counts))
+        if watermark_result.is_err():
+            return Result.err(watermark_result.unwrap_err())
+    return Result.ok(stats)
+
+
+def _parse_args() -> Args:
+    parser = argparse.ArgumentParser(
+        description="Demote domain patterns whose verification precision fell below a threshold."
+    )
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH, help="Path to SQLite DB")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_PRECISION_THRESHOLD,
+        help=f"これを下回る有効率のパターンを外します (default: {DEFAULT_PRECISION_THRESHOLD})",
+    )
+    parser.add_argument(
+        "--min-observations",
+        type=int,
+        default=DEFAULT_MIN_OBSERVATIONS,
+        help=f"判定に必要な Ok + Bad の件数 (default: {DEFAULT_MIN_OBSERVATIONS})",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="前回以降に票が増えたドメインだけでなく、全ドメインを見直します。",
+    )
+    return TypeAdapter(Args).validate_python(vars(parser.parse_args()))
+
+
+def main() -> None:
+    args = _parse_args()
+    conn = sqlite3.connect(args.db)
+    try:
+        result = run_feedback(conn, args.threshold, args.min_observations, full=args.full)
+    finally:
+        conn.close()
+    if result.is_err():
+        raise SystemExit(f"[pattern_feedback] {result.unwrap_err()}")
+    stats = result.unwrap()
+    print(
+        "Feedback finished - "
+        f"demoted={stats.demoted}, restored={stats.restored}, "
+        f"replaced_patterns={stats.replaced_patterns}, "
+        f"cleared_patterns={stats.cleared_patterns}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import argparse
+import sqlite3
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, Mapping, Optional
+
+from pydantic import BaseModel, TypeAdapter
+
+from src.enrichers.domain import PATTERN_BUILDERS
+from src.job_watermarks import ensure_job_watermarks_table, get_watermark, set_watermark
+from src.result import Result
+
+DEFAULT_DB_PATH = Path(__file__).resolve().parents[2] / "data" / "jordan.sqlite"
+WATERMARK_JOB = "pattern_priors"
+
+# 事前分布の条件にする特徴。"all" は全ドメイン（value は空文字）
+FEATURES: tuple[str, ...] = ("tld", "industry", "employee_range")
+GLOBAL_FEATURE = "all"
+# 特徴ごとの分布を全体の分布へ寄せる擬似件数。件数の少ない業種などは全体に近くなる
+PRIOR_SMOOTHING = 5.0
+# co.jp / com.au のように 2 階層で 1 つの TLD として扱う第 2 レベル
+_SECOND_LEVEL_LABELS = frozenset(
+    {"co", "or", "ne", "ac", "go", "ed", "gr", "lg", "ad", "com", "net", "org", "gov", "edu"}
+)
+
+Features = tuple[str, str, str]  # (tld, industry, employee_range)
+
+
+class Args(BaseModel):
+    db: Path = DEFAULT_DB_PATH
+    full: bool = False
+
+
+def domain_tld(domain: Optional[str]) -> str:
+    """ドメインの TLD を返す（co.jp などの 2 階層は 2 ラベル）。取れなければ空文字。"""
+    labels = [label for label in (domain or "").strip().lower().rstrip(".").split(".") if label]
+    if len(labels) < 2:
+        return ""
+    if len(labels) >= 3 and labels[-2] in _SECOND_LEVEL_LABELS and len(labels[-1]) == 2:
+        return ".".join(labels[-2:])
+    return labels[-1]
+
+
+def _features(
+    domain: Optional[str], industry: Optional[str], employee_range: Optional[str]
+) -> Features:
+    return (domain_tld(domain), (industry or "").strip(), (employee_range or "").strip())
+
+
+def ensure_pattern_priors_tables(conn: sqlite3.Connection) -> Result[None, Exception]:
+    """
+    特徴の値ごと・パターンごとのドメイン数（pattern_priors）と、
+    差分更新用に各ドメインが数えられている値（pattern_prior_domains）を作成する。
+    """
+    try:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pattern_priors (
+              feature TEXT NOT NULL,
+              value TEXT NOT NULL,
+              pattern TEXT NOT NULL,
+              domain_count INTEGER NOT NULL,
+              PRIMARY KEY (feature, value, pattern)
+            ) WITHOUT ROWID
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pattern_prior_domains (
+              domain_id INTEGER NOT NULL PRIMARY KEY,
+              pattern TEXT NOT NULL,
+              tld TEXT NOT NULL,
+              industry TEXT NOT NULL,
+              employee_range TEXT NOT NULL
+            ) WITHOUT ROWID
+            """
+        )
+        conn.commit()
+        return Result.ok(None)
+    except Exception as exc:
+        return Result.err(exc)
+
+
+def _feature_keys(pattern: str, features: Features) -> Iterable[tuple[str, str, str]]:
+    yield GLOBAL_FEATURE, "", pattern
+    for name, value in zip(FEATURES, features):
+        if value:
+            yield name, value, pattern
+
+
+def refresh_pattern_priors(
+    conn: sqlite3.Connection, full: bool = False
+) -> Result[int, Exception]:
+    """
+    pattern_priors を差分で更新し、数え直したドメイン数を返す。
+    前回以降に domains / companies の updated_at が進んだドメインと、消えたドメインだけを
+    pattern_prior_domains と比べ、変わった分を足し引きする。full=True なら全件を比べる。
+    """
+    ensure_result = ensure_pattern_priors_tables(conn)
+    if ensure_result.is_err():
+        return Result.err(ensure_result.unwrap_err())
+    ensure_result = ensure_job_watermarks_table(conn)
+    if ensure_result.is_err():
+        return Result.err(ensure_result.unwrap_err())
+    since_result = get_watermark(conn, WATERMARK_JOB)
+    if since_result.is_err():
+        return Result.err(since_result.unwrap_err())
+    since = None if full else since_result.unwrap()
+
+    try:
+        high_water = conn.execute(
+            "SELECT MAX(m) FROM (SELECT MAX(updated_at) AS m FROM domains "
+            "UNION ALL SELECT MAX(updated_at) FROM companies)"
+        ).fetchone()[0]
+        # 同じ秒の更新を取りこぼさないよう >= で読む（差分が無ければ何も変わらない）
+        where = "" if since is None else "WHERE d.updated_at >= ? OR c.updated_at >= ?"
+        params: tuple[int, ...] = () if since is None else (since, since)
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(
+            f"""
+            SELECT d.id, d.domain, d.pattern, c.industry, c.employee_range,
+                   s.pattern, s.tld, s.industry, s.employee_range
+            FROM domains AS d
+            LEFT JOIN companies AS c ON c.id = d.company_id
+            LEFT JOIN pattern_prior_domains AS s ON s.domain_id = d.id
+            {where}
+            """,
+            params,
+        )
+        rows = cursor.fetchall()
+        removed = conn.execute(
+            """
+            SELECT s.domain_id, NULL, NULL, NULL, NULL,
+                   s.pattern, s.tld, s.industry, s.employee_range
+            FROM pattern_prior_domains AS s
+            WHERE NOT EXISTS (SELECT 1 FROM domains AS d WHERE d.id = s.domain_id)
+            """
+        ).fetchall()
+
+        deltas: Counter[tuple[str, str, str]] = Counter()
+        upserts: list[tuple[int, str, str, str, str]] = []
+        deletes: list[tuple[int]] = []
+        for domain_id, domain, pattern, industry, employee_range, *old in rows + removed:
+            current = (
+                (pattern, *_features(domain, industry, employee_range))
+                if pattern in PATTERN_BUILDERS
+                else None
+            )
+            previous = tuple(old) if old[0] is not None else None
+            if current == previous:
+                continue
+            if previous is not None:
+                for key in _feature_keys(previous[0], previous[1:]):
+                    deltas[key] -= 1
+                deletes.append((domain_id,))
+            if current is not None:
+                for key in _feature_keys(current[0], current[1:]):
+                    deltas[key] += 1
+                upserts.append((domain_id, *current))
+
+        conn.executemany("DELETE FROM pattern_prior_domains WHERE domain_id = ?", deletes)
+        conn.executemany(
+            "INSERT INTO pattern_prior_domains "
+            "(domain_id, pattern, tld, industry, employee_range) VALUES (?, ?, ?, ?, ?)",
+            upserts,
+        )
+        conn.executemany(
+            """
+            INSERT INTO pattern_priors (feature, value, pattern, domain_count)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(feature, value, pattern)
+              DO UPDATE SET domain_count = domain_count + excluded.domain_count
+            """,
+            ((*key, delta) for key, delta in deltas.items() if delta),
+        )
+        conn.execute("DELETE FROM pattern_priors WHERE domain_count <= 0")
+        conn.commit()
+    except Exception as exc:
+        conn.rollback()
+        return Result.err(exc)
+
+    changed = len({row[0] for row in deletes} | {row[0] for row in upserts})
+    if high_water is not None:
+        watermark_result = set_watermark(conn, WATERMARK_JOB, int(high_water), changed)
+        if watermark_result.is_err():
+            return Result.err(watermark_result.unwrap_err())
+    return Result.ok(changed)
+
+
+class PatternPriorModel:
+    """
+    pattern_priors から、TLD・業種・従業員規模を条件にしたパターンの事前分布を作る。
+    各特徴の分布を全体の分布で割った比を掛け合わせる（特徴を独立とみなす素朴ベイズ）。
+    """
+
+    def __init__(self, counts: Mapping[tuple[str, str], Mapping[str, int]]) -> None:
+        self._counts = counts
+        overall = counts.get((GLOBAL_FEATURE, ""), {})
+        total = sum(overall.values())
+        self.domain_count = total
+        # 全体の分布はラプラス平滑化し、未観測のパターンも 0 にしない
+        self._overall = {
+            pattern: (overall.get(pattern, 0) + 1) / (total + len(PATTERN_BUILDERS))
+            for pattern in PATTERN_BUILDERS
+        }
+
+    def prior(
+        self,
+        domain: Optional[str],
+        industry: Optional[str] = None,
+        employee_range: Optional[str] = None,
+    ) -> dict[str, float]:
+        """{パターン: 確率}（合計 1）を返す。学習データが無ければ一様。"""
+        scores = dict(self._overall)
+        for name, value in zip(FEATURES, _features(domain, industry, employee_range)):
+            counts = self._counts.get((name, value)) if value else None
+            if not counts:
+                continue
+            total = sum(counts.values())
+            for pattern, base in self._overall.items():
+                conditional = (counts.get(pattern, 0) + PRIOR_SMOOTHING * base) / (
+                    total + PRIOR_SMOOTHING
+                )
+                scores[pattern] *= conditional / base
+        normalizer = sum(scores.values())
+        return {pattern: score / normalizer for pattern, score in scores.items()}
+
+
+def load_pattern_prior_model(conn: sqlite3.Connection) -> Result[PatternPriorModel, Exception]:
+    """pattern_priors を読み込む。表が無ければ学習データなしのモデル。"""
+    try:
+        cursor = conn.execute("SELECT feature, value, pattern, domain_count FROM pattern_priors")
+    except sqlite3.OperationalError:
+        return Result.ok(PatternPriorModel({}))
+    except Exception as exc:
+        return Result.err(exc)
+    counts: dict[tuple[str, str], dict[str, int]] = {}
+    for feature, value, pattern, domain_count in cursor:
+        counts.setdefault((feature, value), {})[pattern] = int(domain_count)
+    return Result.ok(PatternPriorModel(counts))
+
+
+def _parse_args() -> Args:
+    parser = argparse.ArgumentParser(
+        description="Refresh the pattern prior table from domains with a known pattern."
+    )
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH, help="Path to SQLite DB")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="前回以降の変更だけでなく、全ドメインを比べ直します。",
+    )
+    return TypeAdapter(Args).validate_python(vars(parser.parse_args()))
+
+
+def main() -> None:
+    args = _parse_args()
+    conn = sqlite3.connect(args.db)
+    try:
+        result = refresh_pattern_priors(conn, full=args.full)
+    finally:
+        conn.close()
+    if result.is_err():
+        raise SystemExit(f"[pattern_priors] {result.unwrap_err()}")
+    print(f"Recounted {result.unwrap()} domains.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import secrets
+import sqlite3
+import time
+from pathlib import Path
+from typing import Optional
+
+import httpx
+from pydantic import BaseModel, Field, TypeAdapter
+from tqdm import tqdm
+
+from src.adapters.email_verifier import EmailHippoVerifier, EmailVerifier
+from src.result import Result
+
+DEFAULT_DB_PATH = Path(__file__).resolve().parents[2] / "data" / "jordan.sqlite"
+DEFAULT_TTL_DAYS = 30
+DEFAULT_CONCURRENCY = 5
+DEFAULT_TIMEOUT_SECONDS = 30.0
+DEFAULT_BATCH_SIZE = 100
+# 判定に使うステータス（小文字）。それ以外（Unverifiable / RetryLater 等）は判定せず次回に回す
+_VERDICTS = {"ok": True, "bad": False}
+
+
+class Args(BaseModel):
+    db: Path = DEFAULT_DB_PATH
+    ttl_days: int = Field(default=DEFAULT_TTL_DAYS, ge=0)
+    concurrency: int = Field(default=DEFAULT_CONCURRENCY, ge=1)
+    limit: Optional[int] = Field(default=None, ge=1)
+
+
+def ensure_accept_all_checked_column(conn: sqlite3.Connection) -> Result[None, Exception]:
+    """domains.accept_all を判定した日時（accept_all_checked_at）が無ければ追加する。"""
+    try:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(domains)")}
+        if "accept_all_checked_at" not in columns:
+            conn.execute("ALTER TABLE domains ADD COLUMN accept_all_checked_at INTEGER")
+            conn.commit()
+        return Result.ok(None)
+    except Exception as exc:
+        return Result.err(exc)
+
+
+def probe_address(domain: str) -> str:
+    """実在しえないランダムな local-part のアドレスを作る。これが Ok なら accept-all。"""
+    return f"zz-probe-{secrets.token_hex(8)}@{domain}"
+
+
+def load_probe_targets(
+    conn: sqlite3.Connection, ttl_seconds: int, now: int, limit: Optional[int] = None
+) -> Result[list[tuple[str, str]], Exception]:
+    """
+    判定が無いか ttl_seconds より古いドメインの (id, domain) を返す。
+    Web メール・使い捨てドメインは会社のドメインではないので調べない。
+    """
+    sql = """
+        SELECT id, domain FROM domains
+        WHERE webmail = 0 AND disposable = 0
+          AND (accept_all_checked_at IS NULL OR accept_all_checked_at <= ?)
+        ORDER BY accept_all_checked_at IS NOT NULL, accept_all_checked_at, id
+    """
+    params: tuple[int, ...] = (now - ttl_seconds,)
+    if limit is not None:
+        sql += " LIMIT ?"
+        params += (limit,)
+    try:
+        return Result.ok([(str(row[0]), row[1]) for row in conn.execute(sql, params)])
+    except Exception as exc:
+        return Result.err(exc)
+
+
+def update_accept_all_batch(
+    conn: sqlite3.Connection, batch: list[tuple[bool, str]], checked_at: int
+) -> Result[None, Exception]:
+    """
+    accept_all と判定日時をまとめて更新する。batch: [(accept_all, domain_id), ...]
+    domains.updated_at は触らない（pattern_priors などの差分集計に accept-all の判定を混ぜない）。
+    """
+    if not batch:
+        return Result.ok(None)
+    try:
+        conn.executemany(
+            "UPDATE domains SET accept_all = ?, accept_all_checked_at = ? WHERE id = ?",
+            [(int(accept_all), checked_at, domain_id) for accept_all, domain_id in batch],
+        )
+        conn.commit()
+        return Result.ok(None)
+    except Exception as exc:
+        return Result.err(exc)
+
+
+async def probe_domains(
+    conn: sqlite3.Connection,
+    verifier: EmailVerifier,
+    ttl_days: int = DEFAULT_TTL_DAYS,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    limit: Optional[int] = None,
+) -> Result[int, Exception]:
+    """
+    判定が無いか古いドメインごとにランダムなアドレスを 1 件だけ検証し、
+    domains.accept_all / accept_all_checked_at を更新する。判定したドメイン数を返す。
+    """
+    ensure_result = ensure_accept_all_checked_column(conn)
+    if ensure_result.is_err():
+        return Result.err(ensure_result.unwrap_err())
+    now = int(time.time())
+    targets_result = load_probe_targets(conn, ttl_days * 86400, now, limit)
+    if targets_result.is_err():
+        return Result.err(targets_result.unwrap_err())
+    targets = targets_result.unwrap()
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    errors: list[tuple[str, str]] = []
+
+    async def _probe(domain_id: str, domain: str) -> Optional[tuple[bool, str]]:
+        async with semaphore:
+            status_result = await verifier.verify(probe_address(domain))
+        if status_result.is_err():
+            errors.append((domain, str(status_result.unwrap_err())))
+            return None
+        verdict = _VERDICTS.get(status_result.unwrap().strip().lower())
+        return None if verdict is None else (verdict, domain_id)
+
+    updated = 0
+    pending: list[tuple[bool, str]] = []
+    progress = tqdm(total=len(targets), desc="probing accept-all domains")
+    tasks = [asyncio.create_task(_probe(domain_id, domain)) for domain_id, domain in targets]
+    for task in asyncio.as_completed(tasks):
+        verdict = await task
+        progress.update(1)
+        if verdict is None:
+            continue
+        pending.append(verdict)
+        if len(pending) >= DEFAULT_BATCH_SIZE:
+            update_result = update_accept_all_batch(conn, pending, now)
+            if update_result.is_err():
+                return Result.err(update_result.unwrap_err())
+            updated += len(pending)
+            pending.clear()
+    progress.close()
+
+    update_result = update_accept_all_batch(conn, pending, now)
+    if update_result.is_err():
+        return Result.err(update_result.unwrap_err())
+    updated += len(pending)
+
+    if errors:
+        print(f"Processed with {len(errors)} errors:")
+        for domain, message in errors:
+            print(f"[{domain}] {message}")
+    return Result.ok(updated)
+
+
+async def run_async(args: Args) -> Result[int, Exception]:
+    try:
+        conn = sqlite3.connect(args.db)
+    except Exception as exc:  # pragma: no cover - sqlite3 error is enough
+        return Result.err(exc)
+    try:
+        async with httpx.AsyncClient(timeout=httpx.Timeout(DEFAULT_TIMEOUT_SECONDS)) as client:
+            verifier_result = EmailHippoVerifier.from_env(client)
+            if verifier_result.is_err():
+                return Result.err(verifier_result.unwrap_err())
+            return await probe_domains(
+                conn, verifier_result.unwrap(), args.ttl_days, args.concurrency, args.limit
+            )
+    finally:
+        conn.close()
+
+
+def _parse_args() -> Args:
+    parser = argparse.ArgumentParser(
+        description="Detect accept-all (catch-all) domains by verifying one random address each."
+    )
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH, help="Path to SQLite DB")
+    parser.add_argument(
+        "--ttl-days",
+        type=int,
+        default=DEFAULT_TTL_DAYS,
+        help=f"この日数より新しい判定は再検証しません (default: {DEFAULT_TTL_DAYS})",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"同時に検証するドメイン数 (default: {DEFAULT_CONCURRENCY})",
+    )
+    parser.add_argument("--limit", type=int, help="1 回に検証するドメイン数の上限")
+    return TypeAdapter(Args).validate_python(vars(parser.parse_args()))
+
+
+def main() -> None:
+    result = asyncio.run(run_async(_parse_args()))
+    if result.is_err():
+        raise SystemExit(f"[probe_accept_all] {result.unwrap_err()}")
+    print(f"Checked {result.unwrap()} domains.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import math
+import statistics
+import textwrap
+from dataclasses import dataclass, field
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    入力トークン数を概算する。
+    tokenizer を依存に持たないため、CJK 文字は 1 文字 1 トークン、
+    それ以外は 4 文字 1 トークンとして数える（o200k 系の実測に近い保守的な見積もり）。
+    """
+    if not text:
+        return 0
+    wide = sum(1 for ch in text if ord(ch) >= 0x2E80)
+    narrow = len(text) - wide
+    return wide + math.ceil(narrow / 4)
+
+
+@dataclass(frozen=True)
+class PromptSection:
+    """プロンプトを構成する 1 ブロック。"""
+
+    name: str
+    body: str
+    # Structured Outputs でスキーマが強制される場合は送らなくてよいセクション
+    redundant_with_structured_output: bool = False
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """セクション単位で組み立てるプロンプトテンプレートとトークン予算。"""
+
+    name: str
+    sections: tuple[PromptSection, ...]
+    token_budget: int
+
+    def render(self, *, structured_output: bool = True, **values: object) -> str:
+        """values を埋め込んでプロンプト文字列を返す。"""
+        blocks: list[str] = []
+        for section in self.sections:
+            if structured_output and section.redundant_with_structured_output:
+                continue
+            body = textwrap.dedent(section.body).strip().format(**values)
+            if body:
+                blocks.append(body)
+        return "\n\n".join(blocks) + "\n"
+
+
+@dataclass
+class PromptTokenStats:
+    """テンプレートごとの推定入力トークン数を集計する。"""
+
+    samples: dict[str, list[int]] = field(default_factory=dict)
+
+    def record(self, template_name: str, prompt: str) -> int:
+        tokens = estimate_tokens(prompt)
+        self.samples.setdefault(template_name, []).append(tokens)
+        return tokens
+
+    def summary(self, template_name: str) -> dict[str, float]:
+        """count / total / mean / p50 / p90 / max を返す。サンプルが無ければ空 dict。"""
+        values = sorted(self.samples.get(template_name) or [])
+        if not values:
+            return {}
+        p90_index = max(0, math.ceil(len(values) * 0.9) - 1)
+        return {
+            "count": len(values),
+            "total": sum(values),
+            "mean": statistics.fmean(values),
+            "p50": statistics.median(values),
+            "p90": values[p90_index],
+            "max": values[-1],
+        }
+
+    def format_report(self) -> str:
+        lines = []
+        for name in sorted(self.samples):
+            stats = self.summary(name)
+            lines.append(
+                f"[{name}] prompts={stats['count']} est_input_tokens total={stats['total']} "
+                f"mean={stats['mean']:.1f} p50={stats['p50']:.0f} p90={stats['p90']} "
+                f"max={stats['max']}"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sqlite3
+import time
+from pathlib import Path
+from typing import Optional
+
+import httpx
+from pydantic import BaseModel, Field, TypeAdapter
+from tqdm import tqdm
+
+from src.adapters.mx_resolver import DohMxResolver, MxAnswer, MxResolver
+from src.result import Result
+
+DEFAULT_DB_PATH = Path(__file__).resolve().parents[2] / "data" / "jordan.sqlite"
+DEFAULT_CONCURRENCY = 20
+DEFAULT_TIMEOUT_SECONDS = 5.0
+DEFAULT_BATCH_SIZE = 100
+# DNS の TTL をそのまま使うと短すぎる／長すぎることがあるので、キャッシュの寿命はこの範囲に収める
+MIN_CACHE_TTL = 3600
+MAX_CACHE_TTL = 7 * 86400
+# MX なしの結果（否定応答）の寿命の上限。後から MX を設定したドメインを長く取りこぼさない
+MAX_NEGATIVE_CACHE_TTL = 86400
+
+
+class Args(BaseModel):
+    db: Path = DEFAULT_DB_PATH
+    concurrency: int = Field(default=DEFAULT_CONCURRENCY, ge=1)
+    refresh: bool = False
+
+
+def ensure_mx_cache(conn: sqlite3.Connection) -> Result[None, Exception]:
+    """MX の解決結果を期限付きで持つ dns_mx_cache と、domains.mail_capable を作成する。"""
+    try:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS dns_mx_cache (
+              domain TEXT NOT NULL PRIMARY KEY,
+              has_mx INTEGER NOT NULL,
+              mx_hosts TEXT NOT NULL,
+              resolved_at INTEGER NOT NULL,
+              expires_at INTEGER NOT NULL
+            ) WITHOUT ROWID
+            """
+        )
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(domains)")}
+        if "mail_capable" not in columns:
+            conn.execute("ALTER TABLE domains ADD COLUMN mail_capable INTEGER")
+        conn.commit()
+        return Result.ok(None)
+    except Exception as exc:
+        return Result.err(exc)
+
+
+def cache_ttl(answer: MxAnswer) -> int:
+    """MxAnswer の TTL をキャッシュの寿命（秒）に直す。"""
+    upper = MAX_CACHE_TTL if answer.has_mx else MAX_NEGATIVE_CACHE_TTL
+    return max(MIN_CACHE_TTL, min(answer.ttl, upper))
+
+
+def load_fresh_cache(conn: sqlite3.Connection, now: int) -> Result[dict[str, bool], Exception]:
+    """期限内のキャッシュを {ドメイン: MX があるか} で返す。"""
+    try:
+        cursor = conn.execute(
+            "SELECT domain, has_mx FROM dns_mx_cache WHERE expires_at > ?", (now,)
+        )
+        return Result.ok({domain: bool(has_mx) for domain, has_mx in cursor})
+    except Exception as exc:
+        return Result.err(exc)
+
+
+def store_mx_answers(
+    conn: sqlite3.Connection, answers: list[tuple[str, MxAnswer]], now: int
+) -> Result[None, Exception]:
+    """解決結果をキャッシュに書く（MX なしも否定エントリとして書く）。"""
+    if not answers:
+        return Result.ok(None)
+    try:
+        conn.executemany(
+            """
+            INSERT INTO dns_mx_cache (domain, has_mx, mx_hosts, resolved_at, expires_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(domain) DO UPDATE SET
+              has_mx = excluded.has_mx,
+              mx_hosts = excluded.mx_hosts,
+              resolved_at = excluded.resolved_at,
+              expires_at = excluded.expires_at
+            """,
+            [
+                (domain, int(answer.has_mx), " ".join(answer.hosts), now, now + cache_ttl(answer))
+                for domain, answer in answers
+            ],
+        )
+        conn.commit()
+        return Result.ok(None)
+    except Exception as exc:
+        return Result.err(exc)
+
+
+def update_mail_capable(
+    conn: sqlite3.Connection, updates: list[tuple[bool, str]]
+) -> Result[int, Exception]:
+    """
+    domains.mail_capable を更新する。updates: [(mail_capable, domain_id), ...]。
+    値が変わった行数を返す。引いた時刻は dns_mx_cache.resolved_at に残るので、
+    domains.updated_at は触らない（pattern_priors などの差分集計を起こさない）。
+    """
+    try:
+        cursor = conn.executemany(
+            "UPDATE domains SET mail_capable = ? WHERE id = ? AND mail_capable IS NOT ?",
+            [(int(capable), domain_id, int(capable)) for capable, domain_id in updates],
+        )
+        conn.commit()
+        return Result.ok(cursor.rowcount)
+    except Exception as exc:
+        return Result.err(exc)
+
+
+async def resolve_domains(
+    conn: sqlite3.Connection,
+    resolver: MxResolver,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    refresh: bool = False,
+) -> Result[int, Exception]:
+    """
+    Web メール・使い捨て以外のドメインの MX を調べ、domains.mail_capable を更新する。
+    dns_mx_cache が期限内のドメインは DNS を引かない（refresh=True なら全件引き直す）。
+    一時的な失敗のドメインは判定もキャッシュもしない。mail_capable が変わった行数を返す。
+    """
+    ensure_result = ensure_mx_cache(conn)
+    if ensure_result.is_err():
+        return Result.err(ensure_result.unwrap_err())
+    now = int(time.time())
+    try:
+        rows = [
+            (str(domain_id), str(domain).strip().lower())
+            for domain_id, domain in conn.execute(
+                "SELECT id, domain FROM domains WHERE webmail = 0 AND disposable = 0"
+            )
+            if domain and str(domain).strip()
+        ]
+    except Exception as exc:
+        return Result.err(exc)
+    domains = sorted({domain for _, domain in rows})
+
+    cache_result = load_fresh_cache(conn, now)
+    if cache_result.is_err():
+        return Result.err(cache_result.unwrap_err())
+    cached = {} if refresh else cache_result.unwrap()
+    verdicts = {domain: cached[domain] for domain in domains if domain in cached}
+    targets = [domain for domain in domains if domain not in cached]
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    errors: list[tuple[str, str]] = []
+
+    async def _resolve(domain: str) -> Optional[tuple[str, MxAnswer]]:
+        async with semaphore:
+            answer_result = await resolver.resolve_mx(domain)
+        if answer_result.is_err():
+            errors.append((domain, str(answer_result.unwrap_err())))
+            return None
+        return domain, answer_result.unwrap()
+
+    pending: list[tuple[str, MxAnswer]] = []
+    progress = tqdm(total=len(targets), desc="resolving MX")
+    for task in asyncio.as_completed([asyncio.create_task(_resolve(d)) for d in targets]):
+        resolved = await task
+        progress.update(1)
+        if resolved is None:
+            continue
+        pending.append(resolved)
+        verdicts[resolved[0]] = resolved[1].has_mx
+        if len(pending) >= DEFAULT_BATCH_SIZE:
+            store_result = store_mx_answers(conn, pending, now)
+            if store_result.is_err():
+                return Result.err(store_result.unwrap_err())
+            pending.clear()
+    progress.close()
+    store_result = store_mx_answers(conn, pending, now)
+    if store_result.is_err():
+        return Result.err(store_result.unwrap_err())
+
+    if errors:
+        print(f"Processed with {len(errors)} errors:")
+        for domain, message in errors:
+            print(f"[{domain}] {message}")
+    return update_mail_capable(
+        conn,
+        [(verdicts[domain], domain_id) for domain_id, domain in rows if domain in verdicts],
+    )
+
+
+async def run_async(args: Args) -> Result[int, Exception]:
+    try:
+        conn = sqlite3.connect(args.db)
+    except Exception as exc:  # pragma: no cover - sqlite3 error is enough
+        return Result.err(exc)
+    try:
+        limits = httpx.Limits(
+            max_connections=args.concurrency, max_keepalive_connections=args.concurrency
+        )
+        async with httpx.AsyncClient(
+            timeout=httpx.Timeout(DEFAULT_TIMEOUT_SECONDS), limits=limits
+        ) as client:
+            return await resolve_domains(
+                conn, DohMxResolver(client), args.concurrency, args.refresh
+            )
+    finally:
+        conn.close()
+
+
+def _parse_args() -> Args:
+    parser = argparse.ArgumentParser(
+        description="Resolve MX records for domains and mark whether they can receive mail."
+    )
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH, help="Path to SQLite DB")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"同時に問い合わせるドメイン数 (default: {DEFAULT_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="dns_mx_cache の期限内のドメインも引き直します。",
+    )
+    return TypeAdapter(Args).validate_python(vars(parser.parse_args()))
+
+
+def main() -> None:
+    result = asyncio.run(run_async(_parse_args()))
+    if result.is_err():
+        raise SystemExit(f"[resolve_mx] {result.unwrap_err()}")
+    print(f"Updated mail_capable on {result.unwrap()} domains.")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,22 +2,31 @@ from __future__ import annotations
 
 import argparse
 import asyncio
+import json
 import sqlite3
 import time
-from dataclasses import dataclass
+import unicodedata
+import uuid
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Iterable
+from typing import Callable, Iterable, Sequence
 
 import dotenv
 from pydantic import BaseModel, Field, TypeAdapter
 from tqdm import tqdm
 
-from src.adapters.openai import StructuredOutputOptions, create_structured_outputs
+from src.adapters.openai import LlmCallUsage, StructuredOutputOptions, create_structured_outputs
+from src.llm_ledger import LlmCallRecord, ensure_llm_calls_table, hash_prompt, insert_llm_call
+from src.prompts import PromptSection, PromptTemplate, PromptTokenStats
 from src.result import Result
 
 DEFAULT_DB_PATH = Path(__file__).resolve().parents[2] / "data" / "jordan.sqlite"
 DEFAULT_CONCURRENCY = 5
 DEFAULT_MAX_PER_COMPANY = 10
+DEFAULT_COMMIT_EVERY = 20
+DEFAULT_RESEARCH_INTERVAL_DAYS = 30.0
+DEFAULT_MODEL = "gpt-5-nano-2025-08-07"
+LLM_CALLER = "search_contacts"
 
 
 class LlmContactSource(BaseModel):
@@ -31,6 +40,8 @@ class LlmContact(BaseModel):
     last_name: str | None = None
     position: str | None = None
     department: str | None = None
+    # 複数部署をまとめて検索したときに、どの指定部署の担当者かを LLM に付与させる
+    target_department: str | None = None
     sources: list[LlmContactSource] = Field(default_factory=list)
 
 
@@ -40,8 +51,10 @@ class LlmContactList(BaseModel):
 
 class Args(BaseModel):
     db: Path = DEFAULT_DB_PATH
-    department: str | None = None
+    department: list[str] = Field(default_factory=list)
     skip_if_contacts_exist: bool = False
+    commit_every: int = DEFAULT_COMMIT_EVERY
+    research_interval_days: float = DEFAULT_RESEARCH_INTERVAL_DAYS
 
 
 @dataclass
@@ -50,6 +63,8 @@ class CompanyTarget:
     company_name: str
     domain: str
     website_url: str | None
+    # まだ検索が必要な部署（部署指定なしは [""]）
+    departments: list[str] = field(default_factory=lambda: [""])
 
 
 def _parse_args() -> Args:
@@ -59,16 +74,52 @@ def _parse_args() -> Args:
         description="Fetch contacts via OpenAI Responses API with web search."
     )
     parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH, help="Path to SQLite DB")
-    parser.add_argument("--department", type=str, default=None, help="Target department (optional)")
+    parser.add_argument(
+        "--department",
+        type=str,
+        nargs="+",
+        default=[],
+        help=(
+            "Target departments (optional). Multiple departments are searched in one call per "
+            "company, e.g. --department 営業 マーケ 情シス"
+        ),
+    )
     parser.add_argument(
         "--skip-if-contacts-exist",
         action="store_true",
         help="Skip companies that already have at least one contact",
     )
+    parser.add_argument(
+        "--commit-every",
+        type=int,
+        default=DEFAULT_COMMIT_EVERY,
+        help=f"Commit after every N companies (default: {DEFAULT_COMMIT_EVERY})",
+    )
+    parser.add_argument(
+        "--research-interval-days",
+        type=float,
+        default=DEFAULT_RESEARCH_INTERVAL_DAYS,
+        help=(
+            "Skip companies searched successfully within N days for the same department "
+            f"(0 = always search, default: {DEFAULT_RESEARCH_INTERVAL_DAYS})"
+        ),
+    )
     parsed = parser.parse_args()
+    parsed.department = _split_departments(parsed.department)
     return TypeAdapter(Args).validate_python(vars(parsed))
 
 
+def _split_departments(values: Sequence[str] | None) -> list[str]:
+    """カンマ区切りも受け付けつつ、空要素と重複を除いた部署リストを返す。"""
+    departments: list[str] = []
+    for value in values or []:
+        for item in value.replace("、", ",").split(","):
+            key = _department_key(item)
+            if key and key not in departments:
+                departments.append(key)
+    return departments
+
+
 def _ensure_contacts_table(conn: sqlite3.Connection) -> None:
     """
     contacts.id を INTEGER PRIMARY KEY AUTOINCREMENT 前提で作成する。
@@ -102,31 +153,160 @@ def _ensure_contacts_table(conn: sqlite3.Connection) -> None:
     )
 
 
+def _ensure_contacts_unique_index(conn: sqlite3.Connection) -> Result[None, Exception]:
+    """
+    (company_id, full_name) のユニーク索引を作成する。
+    既存データに重複がある場合は作成できないため Err を返す（重複の解消はユーザー側で行う想定）。
+    """
+    try:
+        conn.execute(
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_contacts_company_id_full_name
+            ON contacts (company_id, full_name)
+            """
+        )
+        conn.commit()
+        return Result.ok(None)
+    except sqlite3.IntegrityError as exc:
+        return Result.err(
+            RuntimeError(
+                "contacts has duplicated (company_id, full_name) rows; "
+                f"deduplicate them before running search_contacts: {exc}"
+            )
+        )
+    except Exception as exc:
+        return Result.err(exc)
+
+
+def _ensure_contact_searches_table(conn: sqlite3.Connection) -> None:
+    """
+    (company_id, domain, department) ごとの検索結果を記録するチェックポイントテーブルを作成する。
+    department は未指定を空文字で表す（NULL だと主キーで一意にならないため）。
+    status は ok（担当者あり） / empty（0 件） / error（失敗）のいずれか。
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS contact_searches (
+          company_id TEXT NOT NULL,
+          domain TEXT NOT NULL,
+          department TEXT NOT NULL DEFAULT '',
+          status TEXT NOT NULL,
+          contact_count INTEGER NOT NULL DEFAULT 0,
+          model TEXT,
+          cost_usd REAL,
+          error TEXT,
+          searched_at INTEGER NOT NULL,
+          PRIMARY KEY (company_id, domain, department)
+        )
+        """
+    )
+    conn.commit()
+
+
+def _department_key(department: str | None) -> str:
+    return (department or "").strip()
+
+
+def _record_search(
+    conn: sqlite3.Connection,
+    target: CompanyTarget,
+    department: str | None,
+    status: str,
+    *,
+    contact_count: int = 0,
+    model: str | None = None,
+    cost_usd: float | None = None,
+    error: str | None = None,
+) -> Result[None, Exception]:
+    """contact_searches に検索結果を upsert する。commit は呼び出し側で行う。"""
+    try:
+        conn.execute(
+            """
+            INSERT INTO contact_searches (
+              company_id, domain, department, status, contact_count, model, cost_usd,
+              error, searched_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (company_id, domain, department) DO UPDATE SET
+              status = excluded.status,
+              contact_count = excluded.contact_count,
+              model = excluded.model,
+              cost_usd = excluded.cost_usd,
+              error = excluded.error,
+              searched_at = excluded.searched_at
+            """,
+            (
+                target.company_id,
+                target.domain,
+                _department_key(department),
+                status,
+                contact_count,
+                model,
+                cost_usd,
+                error,
+                int(time.time()),
+            ),
+        )
+        return Result.ok(None)
+    except Exception as exc:
+        return Result.err(exc)
+
+
 def _iter_targets(
-    conn: sqlite3.Connection, skip_if_contacts_exist: bool
+    conn: sqlite3.Connection,
+    skip_if_contacts_exist: bool,
+    departments: Sequence[str] = (),
+    research_interval_days: float = DEFAULT_RESEARCH_INTERVAL_DAYS,
 ) -> Iterable[CompanyTarget]:
+    """
+    検索対象の企業と、その企業でまだ検索が必要な部署を返す。
+    research_interval_days 以内に ok / empty で終わった (company_id, domain, department) を
+    contact_searches の主キー索引で LEFT JOIN し、全部署が済んだ企業は HAVING で除外する
+    （部署が 1 つなら anti-join と同じ）。error は毎回再試行する。
+    """
+    department_keys = list(dict.fromkeys(_department_key(d) for d in departments)) or [""]
+    placeholders = ", ".join("?" for _ in department_keys)
+    # research_interval_days <= 0 のときはチェックポイントを一切参照しない
+    cutoff = int(time.time() - research_interval_days * 86400)
+    params: list[object] = [*department_keys, cutoff, research_interval_days]
     where_clause = ""
     if skip_if_contacts_exist:
         where_clause = (
-            "WHERE NOT EXISTS (SELECT 1 FROM contacts "
-            "WHERE contacts.company_id = companies.id)"
+            "WHERE NOT EXISTS (SELECT 1 FROM contacts WHERE contacts.company_id = companies.id)"
         )
+    params.append(len(department_keys))
     cursor = conn.execute(
         f"""
         SELECT companies.id AS company_id, companies.name AS company_name, domains.domain AS domain,
-               companies.website_url AS website_url
+               companies.website_url AS website_url,
+               group_concat(s.department, char(31)) AS fresh_departments,
+               COUNT(s.department) AS fresh_count
         FROM companies
         JOIN domains ON domains.company_id = companies.id
+        LEFT JOIN contact_searches AS s
+          ON s.company_id = companies.id
+         AND s.domain = domains.domain
+         AND s.department IN ({placeholders})
+         AND s.status IN ('ok', 'empty')
+         AND s.searched_at >= ?
+         AND ? > 0
         {where_clause}
+        GROUP BY companies.id, domains.domain
+        HAVING fresh_count < ?
         ORDER BY companies.id
-        """
+        """,
+        params,
     )
     for row in cursor:
+        fresh_value = row["fresh_departments"]
+        # 部署指定なし（空文字）だけが済んでいる場合も "" が返るため None と区別する
+        fresh = set(fresh_value.split("\x1f")) if fresh_value is not None else set()
+        pending = [key for key in department_keys if key not in fresh]
         yield CompanyTarget(
             company_id=str(row["company_id"]),
             company_name=row["company_name"],
             domain=row["domain"],
             website_url=row["website_url"],
+            departments=pending,
         )
 
 
@@ -138,100 +318,174 @@ def _normalize_name_token(token: str | None) -> str | None:
     return filtered or None
 
 
-def _build_prompt(company_name: str, domain: str, department: str | None, max_contacts: int) -> str:
-    trimmed_department = (department or "").strip()
-    department_description = trimmed_department if trimmed_department else "特に指定なし"
-    category_description = ""
-    # getDepartmentCategorySearchInfo の代替: 部署カテゴリ情報があればここで拡張可能
-    # 現状は空文字扱い
-
-    return f"""
-あなたはB2B企業の担当者情報を調査するリサーチエージェントです。
-以下の会社情報に基づいてWEB検索ツールを用い、サービスの導入事例や採用ページなど、
-氏名・役職・部署が明示されている担当者情報を、最大{max_contacts}件収集してください。
-その際、各担当者情報がどのページから得られたか（URLとページタイトル）も一緒に特定し、構造化して出力してください。
-
-## 会社情報
-- 会社名: {company_name}
-- 会社ドメイン: {domain}
-- 部署: {department_description}
-{category_description}
-
-## 調査方針
-
-1. WEB検索では、会社名と以下のようなキーワードを組み合わせて検索し、
-   氏名・役職・部署が載っていそうなページを優先的に調査してください。
-
-   - サービス事例・導入事例ページ
-     - 例: 「導入事例」「お客様事例」「事例インタビュー」「case study」
-   - 採用・リクルート関連ページ
-     - 例: 「採用サイト」「社員インタビュー」「メンバー紹介」「先輩インタビュー」
-   - 会社情報・組織系ページ
-     - 例: 「会社情報」「役員紹介」「組織図」「management team」
-   - IR・プレス・ニュース
-     - 例: 「プレスリリース」「ニュース」「IR」「コーポレートガバナンス」
-   - セミナー・イベント・登壇情報
-     - 例: 「セミナー」「ウェビナー」「イベント」「登壇者」
-   - オウンドメディア・ブログ
-     - 例: 「ブログ」「オウンドメディア」「note」「技術ブログ」
-   - パートナー・アライアンス紹介ページ
-     - 例: 「パートナー」「アライアンス」「提携」
-
-2. 特に、以下の条件を満たす人物を「担当者候補」として抽出してください。
-   - 氏名（フルネーム）が記載されている
-   - 役職または部署名が一緒に記載されている
-   - 当該企業の従業員・役員など、法人の公式な立場を持つ人物である
-   - 顧客企業側の担当者が事例インタビュー等に記載されている場合も候補に含めてよい
-
-3. 部署指定がある場合（上記の「部署」情報が空でない場合）は、
-   - その部署と関連がありそうな人物（同じ部門名や、近い業務領域の役職）や、
-   - 部署カテゴリに含まれると考えられる部署名を持つ人物を優先的に抽出してください。
-
-4. 以下のような人物は除外してください。
-   - 就活生や応募者、インターン応募者など、従業員・役員ではない人物
-   - 氏名だけで役職・部署が一切分からない人物
-   - 個人のSNSアカウントや、企業と無関係な個人ブログ上の人物
-   - 推測だけに基づく人物情報（確実にページ上に記載されていない情報）
-   - 代表取締役・社長・会長・取締役会長 など、社長・会長クラスの役職者
-
-5. 氏名の英字化について
-   - 「名（firstName）」「姓（lastName）」は、氏名から推測されるローマ字表記を、
-     すべて小文字のアルファベットで出力してください。
-     例: 山田 太郎 → firstName: "taro", lastName: "yamada"
-   - ローマ字表記が明確に分からない場合は、
-     一般的な日本人名のローマ字表記に基づいて自然に推測してください。
-
-【出力項目】
-
-担当者の情報として、1人あたり以下の項目を出力してください。
-
-1. 氏名（半角スペース区切りの漢字など本名）
-2. 役職
-3. 部署
-4. 名（firstName, すべて小文字のアルファベット）
-5. 姓（lastName, すべて小文字のアルファベット）
-6. 情報ソース（sources）
-   - その担当者情報が記載されていたページの URL（url）
-   - そのページのタイトル（pageTitle）
-   - 複数のページから確認できた場合は、sources配列に複数要素を含めてください
-
-【出力フォーマット】
-JSON 形式で、以下のスキーマに従って出力してください。
-
-```json
-{LlmContactList.__dict__}
-```
-
-制約:
-- 回答には引用・参照・citationなどの情報を付与しないでください。
-- JSON以外のテキスト（説明文や前置き、後書き）は出力しないでください。
-- sources には、実際に担当者情報が確認できたページのみを含めてください。
-"""
+CONTACT_SEARCH_TEMPLATE = PromptTemplate(
+    name="contact_search",
+    sections=(
+        PromptSection(
+            name="task",
+            body="""
+            あなたはB2B企業の担当者情報を調査するリサーチエージェントです。
+            以下の会社情報に基づいてWEB検索ツールを用い、サービスの導入事例や採用ページなど、
+            氏名・役職・部署が明示されている担当者情報を、最大{max_contacts}件収集してください。
+            各担当者情報がどのページから得られたか（URLとページタイトル）も特定してください。
+
+            ## 会社情報
+            - 会社名: {company_name}
+            - 会社ドメイン: {domain}
+            - 部署: {department}
+            """,
+        ),
+        PromptSection(
+            name="departments",
+            body="{department_rules}",
+        ),
+        PromptSection(
+            name="policy",
+            body="""
+            ## 調査方針
+            1. 会社名と以下のキーワードを組み合わせて検索し、
+               氏名・役職・部署が載っていそうなページを優先してください。
+               - 導入事例・お客様事例・事例インタビュー・case study
+               - 採用サイト・社員インタビュー・メンバー紹介
+               - 会社情報・役員紹介・組織図・management team
+               - プレスリリース・ニュース・IR
+               - セミナー・ウェビナー・イベント登壇者
+               - オウンドメディア・ブログ・note・技術ブログ
+               - パートナー・アライアンス紹介
+            2. 次の条件を満たす人物を抽出してください。
+               - 氏名（フルネーム）と、役職または部署名が記載されている
+               - 当該企業の従業員・役員など公式な立場を持つ
+                 （事例インタビュー上の顧客企業側担当者も可）
+            3. 部署の指定がある場合は、
+               その部署や近い業務領域の部署名・役職を持つ人物を優先してください。
+            4. 次の人物は除外してください。
+               - 就活生・応募者など従業員・役員ではない人物
+               - 役職・部署が一切分からない人物
+               - 個人のSNSや企業と無関係な個人ブログ上の人物
+               - ページ上に記載がなく推測に基づく人物
+               - 代表取締役・社長・会長など社長・会長クラス
+            5. first_name / last_name は氏名のローマ字表記をすべて小文字で出力してください
+               （例: 山田 太郎 → first_name: "taro", last_name: "yamada"）。
+               不明な場合は一般的な日本人名のローマ字表記で推測してください。
+            """,
+        ),
+        PromptSection(
+            name="output_items",
+            redundant_with_structured_output=True,
+            body="""
+            ## 出力項目
+            1. full_name: 氏名（半角スペース区切りの本名）
+            2. position: 役職
+            3. department: 部署
+            4. first_name: 名（小文字のアルファベット）
+            5. last_name: 姓（小文字のアルファベット）
+            6. sources: 担当者情報が記載されていたページの url と pageTitle（複数可）
+            """,
+        ),
+        PromptSection(
+            name="output_format",
+            redundant_with_structured_output=True,
+            body="""
+            ## 出力フォーマット
+            次の JSON Schema に従う JSON のみを出力し、説明文や前置きは出力しないでください。
+            {schema}
+            """,
+        ),
+        PromptSection(
+            name="constraints",
+            body="""
+            制約:
+            - 回答には引用・参照・citationなどの情報を付与しないでください。
+            - sources には、実際に担当者情報が確認できたページのみを含めてください。
+            """,
+        ),
+    ),
+    token_budget=900,
+)
+
+
+def _build_prompt(
+    company_name: str,
+    domain: str,
+    departments: Sequence[str],
+    max_contacts: int,
+    *,
+    structured_output: bool = True,
+) -> str:
+    """
+    担当者検索のプロンプトを組み立てる。max_contacts は部署ごとの上限。
+    複数部署を指定した場合は 1 回の検索で全部署を調べ、target_department で部署を付与させる。
+    Structured Outputs を使う場合はスキーマで強制される出力項目・フォーマットの説明を省く。
+    """
+    keys = [key for key in (_department_key(d) for d in departments) if key]
+    department_rules = ""
+    total_contacts = max_contacts
+    if len(keys) > 1:
+        total_contacts = max_contacts * len(keys)
+        department_rules = (
+            "## 複数部署の検索\n"
+            f"各部署につき最大{max_contacts}件を目安に、部署ごとに偏りなく収集してください。\n"
+            "各担当者の target_department には、該当する部署を次のいずれかで設定してください: "
+            + "、".join(keys)
+        )
+    schema = ""
+    if not structured_output:
+        schema = json.dumps(LlmContactList.model_json_schema(), ensure_ascii=False)
+    return CONTACT_SEARCH_TEMPLATE.render(
+        structured_output=structured_output,
+        company_name=company_name,
+        domain=domain,
+        department="、".join(keys) if keys else "特に指定なし",
+        department_rules=department_rules,
+        max_contacts=total_contacts,
+        schema=schema,
+    )
+
+
+def _contact_key(full_name: str) -> str:
+    """重複判定用に氏名の表記ゆれ（全角/半角・空白）を吸収する。"""
+    return "".join(unicodedata.normalize("NFKC", full_name).split())
+
+
+def _assign_departments(
+    contacts: list[LlmContact],
+    departments: Sequence[str],
+    max_per_department: int,
+) -> tuple[list[LlmContact], dict[str, int]]:
+    """
+    LLM の結果を氏名で重複排除し、部署ごとの上限を適用する。
+    戻り値は (保存する担当者, 部署ごとの件数)。部署が 1 つなら全員をその部署として扱う。
+    target_department が指定部署のどれにも一致しない担当者は保存しない（上限を超えて
+    部署外の担当者が増えないように）。
+    """
+    keys = [_department_key(d) for d in departments] or [""]
+    counts = {key: 0 for key in keys}
+    by_name: dict[str, LlmContact] = {}
+    selected: list[LlmContact] = []
+    for contact in contacts:
+        name_key = _contact_key(contact.full_name)
+        if not name_key:
+            continue
+        existing = by_name.get(name_key)
+        if existing is not None:
+            known_urls = {source.url for source in existing.sources}
+            existing.sources.extend(s for s in contact.sources if s.url not in known_urls)
+            continue
+
+        department = keys[0] if len(keys) == 1 else _department_key(contact.target_department)
+        if department not in counts or counts[department] >= max_per_department:
+            continue
+        counts[department] += 1
+        contact.target_department = department or None
+        by_name[name_key] = contact
+        selected.append(contact)
+    return selected, counts
 
 
 async def _call_openai(
     prompt: str,
     max_contacts: int,
+    on_complete: Callable[[LlmCallUsage], None] | None = None,
 ) -> Result[list[LlmContact], Exception]:
     class ResponseSchema(BaseModel):
         contacts: list[LlmContact] = Field(max_length=max_contacts)
@@ -240,10 +494,11 @@ async def _call_openai(
         prompt,
         ResponseSchema,
         StructuredOutputOptions(
-            model="gpt-5-nano-2025-08-07",
+            model=DEFAULT_MODEL,
             use_web_search=True,
             reasoning_effort="low",
         ),
+        on_complete=on_complete,
     )
     if result.is_err():
         return Result.err(result.unwrap_err())
@@ -251,87 +506,212 @@ async def _call_openai(
     return Result.ok(parsed.contacts)
 
 
-def _save_contact(
+def _split_cost(cost: float | None, departments: Sequence[str]) -> float | None:
+    """まとめて検索した 1 回分の料金を部署ごとのチェックポイントに按分する。"""
+    if cost is None:
+        return None
+    return cost / max(1, len(departments))
+
+
+def _save_contacts(
     conn: sqlite3.Connection,
-    company_id: int,
-    contact: LlmContact,
-) -> Result[bool, Exception]:
-    exists = conn.execute(
-        "SELECT 1 FROM contacts WHERE company_id = ? AND full_name = ?",
-        (company_id, contact.full_name),
-    ).fetchone()
-    if exists:
-        return Result.ok(False)
+    company_id: str,
+    contacts: list[LlmContact],
+) -> Result[int, Exception]:
+    """
+    1 社分の担当者を INSERT ... ON CONFLICT でまとめて書き込み、新規追加件数を返す。
+    既存の担当者は last_seen_at / source_url / updated_at のみ更新する。
+    commit は呼び出し側でまとめて行う。途中で失敗したら SAVEPOINT まで戻し、
+    この会社の書き込みを後の commit に残さない。
+    """
+    if not contacts:
+        return Result.ok(0)
+
     now_ts = int(time.time())
-    source_url = contact.sources[0].url if contact.sources else None
-    first_name = _normalize_name_token(contact.first_name)
-    last_name = _normalize_name_token(contact.last_name)
-    try:
-        conn.execute(
-            """
-            INSERT INTO contacts (
-              company_id, full_name, first_name, last_name, position, department,
-              source_label, source_url, created_at, updated_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
+    payload = []
+    for contact in contacts:
+        source_url = contact.sources[0].url if contact.sources else None
+        payload.append(
             (
                 company_id,
                 contact.full_name,
-                first_name,
-                last_name,
+                _normalize_name_token(contact.first_name),
+                _normalize_name_token(contact.last_name),
                 contact.position,
                 contact.department,
                 "openai_web_search",
                 source_url,
                 now_ts,
                 now_ts,
-            ),
+                now_ts,
+                now_ts,
+            )
         )
-        conn.commit()
-        return Result.ok(True)
+    try:
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        conn.execute("SAVEPOINT save_contacts")
     except Exception as exc:
         return Result.err(exc)
+    try:
+        before = conn.execute(
+            "SELECT COUNT(*) FROM contacts WHERE company_id = ?", (company_id,)
+        ).fetchone()[0]
+        conn.executemany(
+            """
+            INSERT INTO contacts (
+              company_id, full_name, first_name, last_name, position, department,
+              source_label, source_url, first_seen_at, last_seen_at, created_at, updated_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (company_id, full_name) DO UPDATE SET
+              last_seen_at = excluded.last_seen_at,
+              source_url = COALESCE(excluded.source_url, contacts.source_url),
+              updated_at = excluded.updated_at
+            """,
+            payload,
+        )
+        after = conn.execute(
+            "SELECT COUNT(*) FROM contacts WHERE company_id = ?", (company_id,)
+        ).fetchone()[0]
+        conn.execute("RELEASE save_contacts")
+        return Result.ok(int(after) - int(before))
+    except Exception as exc:
+        conn.execute("ROLLBACK TO save_contacts")
+        conn.execute("RELEASE save_contacts")
+        return Result.err(exc)
 
 
 async def run_async(args: Args) -> Result[int, Exception]:
     conn = sqlite3.connect(args.db)
     conn.row_factory = sqlite3.Row
     _ensure_contacts_table(conn)
-
-    targets = list(_iter_targets(conn, skip_if_contacts_exist=args.skip_if_contacts_exist))
+    index_result = _ensure_contacts_unique_index(conn)
+    if index_result.is_err():
+        conn.close()
+        return Result.err(index_result.unwrap_err())
+    _ensure_contact_searches_table(conn)
+    ledger_result = ensure_llm_calls_table(conn)
+    if ledger_result.is_err():
+        conn.close()
+        return Result.err(ledger_result.unwrap_err())
+
+    targets = list(
+        _iter_targets(
+            conn,
+            skip_if_contacts_exist=args.skip_if_contacts_exist,
+            departments=args.department,
+            research_interval_days=args.research_interval_days,
+        )
+    )
     if not targets:
+        conn.close()
         return Result.ok(0)
 
     errors: list[tuple[str, str]] = []
     progress = tqdm(total=len(targets), desc="fetching contacts")
     saved_count = 0
+    run_id = uuid.uuid4().hex
+    token_stats = PromptTokenStats()
+    pending_commits = 0
+    commit_every = max(1, args.commit_every)
 
     semaphore = asyncio.Semaphore(max(1, DEFAULT_CONCURRENCY))
 
+    def _mark_done() -> None:
+        # 1 社ごとに fsync しないよう、commit は複数社分まとめて行う
+        nonlocal pending_commits
+        pending_commits += 1
+        if pending_commits >= commit_every:
+            conn.commit()
+            pending_commits = 0
+
+    def _record_error(target: CompanyTarget, message: str, cost: float | None) -> None:
+        errors.append((target.company_name, message))
+        for department in target.departments:
+            _record_search(
+                conn,
+                target,
+                department,
+                "error",
+                model=DEFAULT_MODEL,
+                cost_usd=_split_cost(cost, target.departments),
+                error=message,
+            )
+        _mark_done()
+
+    def _record_calls(
+        target: CompanyTarget, prompt: str, usages: list[LlmCallUsage]
+    ) -> float | None:
+        """API 呼び出しを llm_calls に記録し、見積もった合計料金を返す。"""
+        total: float | None = None
+        for usage in usages:
+            insert_result = insert_llm_call(
+                conn,
+                LlmCallRecord(
+                    usage=usage,
+                    prompt_hash=hash_prompt(prompt),
+                    caller=LLM_CALLER,
+                    run_id=run_id,
+                    prompt_template=CONTACT_SEARCH_TEMPLATE.name,
+                    company_id=target.company_id,
+                    department=",".join(target.departments),
+                ),
+            )
+            if insert_result.is_err():
+                errors.append((target.company_name, str(insert_result.unwrap_err())))
+                continue
+            cost = insert_result.unwrap()
+            if cost is not None:
+                total = (total or 0.0) + cost
+        return total
+
     async def _process(target: CompanyTarget) -> None:
         async with semaphore:
             try:
                 prompt = _build_prompt(
                     company_name=target.company_name,
                     domain=target.domain,
-                    department=args.department,
+                    departments=target.departments,
                     max_contacts=DEFAULT_MAX_PER_COMPANY,
                 )
-                contacts_result = await _call_openai(prompt, DEFAULT_MAX_PER_COMPANY)
+                token_stats.record(CONTACT_SEARCH_TEMPLATE.name, prompt)
+                usages: list[LlmCallUsage] = []
+                contacts_result = await _call_openai(
+                    prompt,
+                    DEFAULT_MAX_PER_COMPANY * len(target.departments),
+                    on_complete=usages.append,
+                )
+                cost = _record_calls(target, prompt, usages)
                 if contacts_result.is_err():
                     print(f"Error fetching contacts for {target.company_name}: {contacts_result.unwrap_err()}")
-                    errors.append((target.company_name, str(contacts_result.unwrap_err())))
+                    _record_error(target, str(contacts_result.unwrap_err()), cost)
                     return
-                contacts = contacts_result.unwrap()
+                contacts, counts = _assign_departments(
+                    contacts_result.unwrap(), target.departments, DEFAULT_MAX_PER_COMPANY
+                )
                 nonlocal saved_count
-                for contact in contacts:
-                    save_result = _save_contact(conn, target.company_id, contact)
-                    if save_result.is_err():
-                        print(f"Error saving contact for {target.company_name}: {save_result.unwrap_err()}")
-                        errors.append((target.company_name, str(save_result.unwrap_err())))
-                        return
-                    if save_result.unwrap():
-                        saved_count += 1
+                save_result = _save_contacts(conn, target.company_id, contacts)
+                if save_result.is_err():
+                    print(
+                        f"Error saving contacts for {target.company_name}: "
+                        f"{save_result.unwrap_err()}"
+                    )
+                    _record_error(target, str(save_result.unwrap_err()), cost)
+                    return
+                saved_count += save_result.unwrap()
+                for department, count in counts.items():
+                    record_result = _record_search(
+                        conn,
+                        target,
+                        department,
+                        "ok" if count else "empty",
+                        contact_count=count,
+                        model=DEFAULT_MODEL,
+                        cost_usd=_split_cost(cost, target.departments),
+                    )
+                    if record_result.is_err():
+                        errors.append((target.company_name, str(record_result.unwrap_err())))
+                _mark_done()
             except Exception as exc:  # noqa: BLE001
                 print(f"Error processing {target.company_name}: {exc}")
                 errors.append((target.company_name, str(exc)))
@@ -339,8 +719,15 @@ async def run_async(args: Args) -> Result[int, Exception]:
                 progress.update(1)
 
     tasks = [asyncio.create_task(_process(t)) for t in targets]
-    await asyncio.gather(*tasks)
-    progress.close()
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        conn.commit()
+        conn.close()
+        progress.close()
+        if token_stats.samples:
+            print(token_stats.format_report())
+        print(f"run_id={run_id} (see: python -m src.llm_report --run-id {run_id})")
 
     if errors:
         messages = "\n".join(f"[{name}] {message}" for name, message in errors)
@@ -0,0 +1,34 @@
+from pathlib import Path
+
+from src.benchmarks.contact_pipeline import (
+    bench_size,
+    format_results,
+    generate_contacts,
+    load_baseline,
+    save_baseline,
+)
+
+
+def test_generate_contacts_is_deterministic() -> None:
+    assert generate_contacts(50, seed=1) == generate_contacts(50, seed=1)
+    assert generate_contacts(50, seed=1) != generate_contacts(50, seed=2)
+
+
+def test_bench_size_reports_every_case_and_compares_with_baseline(tmp_path: Path) -> None:
+    results = bench_size(200, memory=True)
+
+    assert [r.case for r in results] == [
+        "normalize",
+        "classify_department",
+        "classify_position",
+        "iter_contacts",
+        "update_categories_batch",
+        "enrich_contact_run",
+    ]
+    assert all(r.rows == 200 and r.peak_bytes is not None for r in results)
+
+    baseline_path = tmp_path / "baseline.json"
+    save_baseline(baseline_path, results)
+    lines = format_results(results, load_baseline(baseline_path))
+    assert "vs base" in lines[0]
+    assert len(lines) == len(results) + 1
@@ -0,0 +1,71 @@
+import sqlite3
+from pathlib import Path
+
+from src.company_contact_stats import (
+    STAT_DIMENSIONS,
+    UNCATEGORIZED,
+    ensure_company_contact_stats,
+    get_company_contact_stats,
+)
+from src.enrich_contact import run
+from src.tests.test_enrich_contact_runner import _prepare_db
+
+
+def _group_by(conn: sqlite3.Connection) -> set[tuple[str, str, str, int]]:
+    expected: set[tuple[str, str, str, int]] = set()
+    for dimension, column in STAT_DIMENSIONS:
+        for company_id, category, count in conn.execute(
+            f"SELECT company_id, COALESCE({column}, ''), COUNT(*) FROM contacts "
+            f"GROUP BY 1, 2"
+        ):
+            expected.add((company_id, dimension, category, count))
+    return expected
+
+
+def _stats(conn: sqlite3.Connection) -> set[tuple[str, str, str, int]]:
+    return set(
+        conn.execute(
+            "SELECT company_id, dimension, category, contact_count FROM company_contact_stats"
+        )
+    )
+
+
+def test_stats_are_backfilled_and_follow_other_writers(tmp_path: Path) -> None:
+    db_path = _prepare_db(tmp_path)
+    conn = sqlite3.connect(db_path)
+    assert ensure_company_contact_stats(conn).is_ok()
+    assert _stats(conn) == _group_by(conn)
+
+    conn.execute(
+        "INSERT INTO contacts (id, company_id, full_name, department_category) "
+        "VALUES ('9', '2', '新規 太郎', '営業')"
+    )
+    conn.execute("UPDATE contacts SET department_category = '法務' WHERE id = '2'")
+    conn.execute("UPDATE contacts SET company_id = '2' WHERE id = '1'")
+    conn.execute("DELETE FROM contacts WHERE id = '3'")
+    conn.commit()
+
+    assert _stats(conn) == _group_by(conn)
+    stats = get_company_contact_stats(conn, "2").unwrap()
+    assert stats["department"] == {"営業": 1, UNCATEGORIZED: 1}
+    conn.close()
+
+
+def test_enrich_contact_keeps_stats_in_sync(tmp_path: Path) -> None:
+    for mode in ("rows", "distinct", "sql"):
+        db_path = _prepare_db(tmp_path / mode)
+
+        assert run(db_path, mode=mode).is_ok()
+        assert run(db_path, mode=mode, recompute_all=True).is_ok()
+
+        conn = sqlite3.connect(db_path)
+        assert _stats(conn) == _group_by(conn)
+        assert get_company_contact_stats(conn, "1").unwrap()["position"] == {
+            "次長・課長": 1,
+            "部長": 1,
+        }
+        # 一括 UPDATE の間だけ外したトリガーが戻っている
+        conn.execute("DELETE FROM contacts WHERE id = '1'")
+        conn.commit()
+        assert _stats(conn) == _group_by(conn)
+        conn.close()
@@ -0,0 +1,137 @@
+import json
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from src.benchmarks.contact_rules import (
+    DEPARTMENT_VOCABULARY,
+    POSITION_VOCABULARY,
+    _legacy_department,
+    _legacy_position,
+)
+from src.domains import Contact
+from src.enrichers.contact import (
+    ClassificationRule,
+    ContactEnricher,
+    RuleEngine,
+    classifier_version,
+    classify_department_category,
+    classify_position_category,
+    classify_seniority,
+    load_rule_file,
+    match_department_category,
+)
+
+
+def test_match_reports_fired_rule() -> None:
+    match = match_department_category("常務取締役（システム部管掌）")
+
+    assert match.category == "経営"
+    assert match.rule is not None and match.rule.priority == 10
+    assert match.matched_text == "取締役"
+
+
+def test_higher_priority_rule_wins_even_if_it_appears_later() -> None:
+    engine = RuleEngine(
+        [
+            ClassificationRule(category="low", priority=20, patterns=("abc",)),
+            ClassificationRule(category="high", priority=10, patterns=("xyz",)),
+        ],
+        default="none",
+    )
+
+    assert engine.match("abc-xyz").category == "high"
+    assert engine.match("abc").category == "low"
+    assert engine.match("").category == "none"
+    assert engine.match("zzz").rule is None
+
+
+def test_capturing_groups_are_rejected() -> None:
+    with pytest.raises(ValueError):
+        RuleEngine([ClassificationRule(category="x", priority=1, patterns=("(a|b)",))])
+
+
+@pytest.mark.parametrize("value", [*DEPARTMENT_VOCABULARY, "", "常務取締役（システム部管掌）"])
+def test_department_engine_matches_legacy_chain(value: str) -> None:
+    assert classify_department_category(value) == _legacy_department(value)
+
+
+@pytest.mark.parametrize("value", [*POSITION_VOCABULARY, "", "VP, Sales"])
+def test_position_engine_matches_legacy_chain(value: str) -> None:
+    assert classify_position_category(value) == _legacy_position(value)
+
+
+@pytest.mark.parametrize(
+    ("position", "expected"),
+    [
+        ("代表取締役社長", "C-level"),
+        ("CEO", "C-level"),
+        ("代表取締役副社長", "C-level"),
+        ("副社長", "VP"),
+        ("執行役員", "VP"),
+        ("VP of Marketing", "VP"),
+        ("部長", "Director"),
+        ("室長", "Director"),
+        ("課長", "Manager"),
+        ("Team Lead", "Manager"),
+        ("主任", "Senior"),
+        ("Senior Engineer", "Senior"),
+        ("エンジニア", "IC"),
+        ("", None),
+    ],
+)
+def test_seniority_levels(position: str, expected: str | None) -> None:
+    assert classify_seniority(position) == expected
+
+
+def test_enricher_sets_seniority_from_same_normalized_position() -> None:
+    now = datetime.now()
+    contact = Contact(
+        id="1",
+        company_id="1",
+        full_name="山田 太郎",
+        position="取締役 CTO",
+        created_at=now,
+        updated_at=now,
+    )
+
+    enriched = ContactEnricher().enrich(contact).unwrap()
+
+    assert enriched.position_category == classify_position_category("取締役 CTO")
+    assert enriched.seniority == "C-level"
+
+
+def test_rules_can_be_loaded_from_json(tmp_path: Path) -> None:
+    rule_file = tmp_path / "rules.json"
+    rule_file.write_text(
+        json.dumps(
+            {
+                "department": [
+                    {"category": "研究", "priority": 1, "patterns": ["研究|r&d"]},
+                    {"category": "営業", "priority": 2, "patterns": "営業"},
+                ],
+                "position": [{"category": "部長", "priority": 1, "patterns": ["部長"]}],
+            }
+        ),
+        encoding="utf-8",
+    )
+
+    engines = load_rule_file(rule_file)
+    enricher = ContactEnricher(
+        department_engine=engines["department"], position_engine=engines["position"]
+    )
+
+    assert engines["department"].match("研究開発部").category == "研究"
+    assert engines["department"].match("営業部").category == "営業"
+    assert engines["position"].match("課長").category == "その他"
+    assert enricher.department_engine is engines["department"]
+
+
+def test_fingerprint_changes_with_rules() -> None:
+    base = [ClassificationRule(category="a", priority=1, patterns=("x",))]
+    edited = [ClassificationRule(category="a", priority=1, patterns=("x|y",))]
+
+    assert RuleEngine(base).fingerprint == RuleEngine(list(base)).fingerprint
+    assert RuleEngine(base).fingerprint != RuleEngine(edited).fingerprint
+    assert classifier_version(RuleEngine(base), RuleEngine(base)) != classifier_version()
@@ -0,0 +1,48 @@
+import sqlite3
+
+import pytest
+
+from src.domain_classifier import DomainClass, classify_domain, classify_domains
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        ("gmail.com", DomainClass(webmail=True)),
+        ("Yahoo.co.jp", DomainClass(webmail=True)),
+        ("taro@docomo.ne.jp", DomainClass(webmail=True)),
+        ("mailinator.com", DomainClass(disposable=True)),
+        ("inbox.mailinator.com.", DomainClass(disposable=True)),
+        ("example.co.jp", DomainClass()),
+        ("notgmail.com", DomainClass()),
+        ("", DomainClass()),
+        (None, DomainClass()),
+    ],
+)
+def test_classify_domain(value: str | None, expected: DomainClass) -> None:
+    assert classify_domain(value) == expected
+
+
+def test_classify_domains_updates_changed_rows_only() -> None:
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(
+        """
+        CREATE TABLE domains (
+          id INTEGER PRIMARY KEY, domain TEXT NOT NULL,
+          disposable INTEGER NOT NULL DEFAULT 0, webmail INTEGER NOT NULL DEFAULT 0,
+          updated_at INTEGER NOT NULL
+        );
+        INSERT INTO domains (id, domain, webmail, updated_at) VALUES
+          (1, 'gmail.com', 0, 100),
+          (2, 'yopmail.com', 0, 100),
+          (3, 'example.com', 1, 100),
+          (4, 'example.co.jp', 0, 100);
+        """
+    )
+
+    assert classify_domains(conn).unwrap() == 3
+    rows = conn.execute(
+        "SELECT id, webmail, disposable, updated_at > 100 FROM domains ORDER BY id"
+    ).fetchall()
+    assert rows == [(1, 1, 0, 1), (2, 0, 1, 1), (3, 0, 0, 1), (4, 0, 0, 0)]
+    assert classify_domains(conn).unwrap() == 0
@@ -0,0 +1,101 @@
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from src.domain_pattern_votes import (
+    ensure_domain_pattern_votes_table,
+    load_vote_winners,
+    record_pattern_vote,
+)
+from src.enrich_domain import run
+from src.enrichers.domain import LocalPartIndex
+from src.import_email_hippo_csv import HippoRow, _insert_email
+from src.tests.test_enrich_domain import _patterns, _prepare_db
+
+
+def _votes(conn: sqlite3.Connection) -> list[tuple[int, str, int, int]]:
+    return conn.execute(
+        "SELECT domain_id, pattern, ok_count, bad_count FROM domain_pattern_votes "
+        "ORDER BY domain_id, pattern"
+    ).fetchall()
+
+
+def test_record_pattern_vote_counts_ok_and_bad_only() -> None:
+    conn = sqlite3.connect(":memory:")
+    ensure_domain_pattern_votes_table(conn).unwrap()
+
+    assert record_pattern_vote(conn, 1, "first.last", "Ok").unwrap() is True
+    assert record_pattern_vote(conn, 1, "first.last", "ok").unwrap() is True
+    assert record_pattern_vote(conn, 1, "first.last", "Bad").unwrap() is True
+    assert record_pattern_vote(conn, 1, "flast", "Unverifiable").unwrap() is False
+
+    assert _votes(conn) == [(1, "first.last", 2, 1)]
+
+
+def test_load_vote_winners_skips_ties_and_bad_only() -> None:
+    conn = sqlite3.connect(":memory:")
+    ensure_domain_pattern_votes_table(conn).unwrap()
+    for domain_id, pattern, status in [
+        (1, "first.last", "Ok"),
+        (1, "first.last", "Ok"),
+        (1, "flast", "Ok"),
+        (2, "first.last", "Ok"),
+        (2, "last", "Ok"),
+        (3, "flast", "Bad"),
+    ]:
+        record_pattern_vote(conn, domain_id, pattern, status).unwrap()
+
+    assert load_vote_winners(conn).unwrap() == {"1": "first.last"}
+
+
+@pytest.mark.parametrize("recompute_all", [False, True])
+def test_rebuilt_votes_match_email_vote(tmp_path: Path, recompute_all: bool) -> None:
+    memory_db = _prepare_db(tmp_path / "memory")
+    votes_db = _prepare_db(tmp_path / "votes")
+
+    memory = run(memory_db, recompute_all=recompute_all)
+    votes = run(votes_db, recompute_all=recompute_all, rebuild_votes=True)
+
+    assert votes.unwrap() == memory.unwrap()
+    assert _patterns(votes_db) == _patterns(memory_db)
+
+    conn = sqlite3.connect(votes_db)
+    # alpha.co.jp の Bad（yuki）は担当者のパターンに一致しないので票にならない
+    assert _votes(conn)[:2] == [(1, "first.last", 2, 0), (1, "firstlast", 1, 0)]
+    conn.close()
+
+
+def test_insert_email_records_vote_in_same_transaction() -> None:
+    conn = sqlite3.connect(":memory:")
+    conn.execute(
+        """
+        CREATE TABLE emails (
+          id INTEGER PRIMARY KEY, contact_id INTEGER, domain_id INTEGER, email TEXT NOT NULL,
+          kind TEXT, source TEXT, status TEXT, status_info TEXT, domain_country_code TEXT,
+          mail_server_country_code TEXT, created_at INTEGER, updated_at INTEGER
+        )
+        """
+    )
+    ensure_domain_pattern_votes_table(conn).unwrap()
+    index: LocalPartIndex[int] = LocalPartIndex()
+    index.add(10, "Taro", "Yamada")
+    contacts_by_company = {"c1": index}
+
+    for email, status in [
+        ("taro.yamada@example.com", "Ok"),
+        ("taro.yamada@example.com", "Ok"),  # 既存のメールは数えない
+        ("tyamada@example.com", "Bad"),
+        ("info@example.com", "Ok"),  # 担当者が決まらないメールは数えない
+    ]:
+        row = HippoRow(email, status, None, None, None)
+        _insert_email(conn, row, 7, "c1", "test", contacts_by_company).unwrap()
+
+    assert _votes(conn) == [(7, "first.last", 1, 0), (7, "flast", 0, 1)]
+    assert conn.execute(
+        "SELECT email, contact_id FROM emails ORDER BY id"
+    ).fetchall() == [
+        ("taro.yamada@example.com", 10),
+        ("tyamada@example.com", 10),
+        ("info@example.com", None),
+    ]
@@ -1,6 +1,7 @@
 import sqlite3
 from pathlib import Path
 
+from src.domains import Contact, ContactRow
 from src.enrich_contact import (
     ensure_department_category_column,
     iter_contacts,
@@ -83,6 +84,7 @@ def test_iter_contacts_filters_pending_only(tmp_path: Path) -> None:
             """,
             (rid, cid, name, pos, fn, ln, dept, dept_cat, pos_cat, now, now),
         )
+    conn.execute("UPDATE contacts SET seniority = 'C-level' WHERE id = '3'")
     conn.commit()
 
     pending = list(iter_contacts(conn))
@@ -94,6 +96,29 @@ def test_iter_contacts_filters_pending_only(tmp_path: Path) -> None:
     conn.close()
 
 
+def test_iter_contacts_fast_rows_match_strict_models(tmp_path: Path) -> None:
+    db_path = tmp_path / "test.sqlite"
+    conn = _make_db(db_path)
+    conn.execute(
+        """
+        INSERT INTO contacts (
+            id, company_id, full_name, position, department, created_at, updated_at
+        )
+        VALUES (1, 2, 'Dave', '課長', '経理部', 100, 200)
+        """
+    )
+    conn.commit()
+
+    fast = list(iter_contacts(conn))
+    strict = list(iter_contacts(conn, strict=True))
+    conn.close()
+
+    assert isinstance(fast[0], ContactRow)
+    assert isinstance(strict[0], Contact)
+    assert (fast[0].id, fast[0].company_id, fast[0].created_at) == ("1", "2", 100)
+    assert fast[0].to_model() == strict[0]
+
+
 def test_run_classifies_and_updates_department_category(tmp_path: Path) -> None:
     db_path = tmp_path / "test.sqlite"
     conn = _make_db(db_path)
@@ -4,11 +4,17 @@ import sqlite3
 import time
 from pathlib import Path
 
-from src.enrich_contact import run
+import pytest
+
+from src import enrich_contact
+from src.enrich_contact import CategoryChange, diff, run, split_id_ranges
+from src.enrichers.contact import CLASSIFIER_VERSION, register_sqlite_functions
+from src.result import Result
 
 
 def _prepare_db(tmp_path: Path) -> Path:
     """簡易な contacts テーブルを準備し、数件のダミーデータを投入する。"""
+    tmp_path.mkdir(parents=True, exist_ok=True)
     db_path = tmp_path / "contacts.sqlite"
     conn = sqlite3.connect(db_path)
     conn.execute(
@@ -46,7 +52,7 @@ def _prepare_db(tmp_path: Path) -> Path:
             twitter_url, phone_number, source_label, source_url, first_seen_at, last_seen_at,
             created_at, updated_at
         )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """,
         [
             (
@@ -127,7 +133,7 @@ def test_run_updates_only_missing(tmp_path: Path) -> None:
 
     result = run(db_path)
     assert result.is_ok()
-    assert result.unwrap() == 2  # id=1,3 が更新対象
+    assert result.unwrap() == 3  # id=1,3 と、seniority だけ無い id=2 が更新対象
 
     conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row
@@ -138,12 +144,13 @@ def test_run_updates_only_missing(tmp_path: Path) -> None:
     assert row1["department_category"] == "情報システム"
     assert row1["position_category"] == "次長・課長"
 
-    # 既にカテゴリが埋まっているレコードは上書きしない
+    # 既にカテゴリが埋まっているレコードは上書きせず、無い seniority だけ埋める
     row2 = conn.execute(
-        "SELECT department_category, position_category FROM contacts WHERE id = '2'"
+        "SELECT department_category, position_category, seniority FROM contacts WHERE id = '2'"
     ).fetchone()
     assert row2["department_category"] == "営業"
     assert row2["position_category"] == "部長"
+    assert row2["seniority"] == "Director"
 
     conn.close()
 
@@ -170,3 +177,288 @@ def test_run_recompute_all_overwrites_existing(tmp_path: Path) -> None:
     assert row2["department_category"] == "営業"
     assert row2["position_category"] == "部長"
     conn.close()
+
+
+def _categories(db_path: Path) -> dict[str, tuple[str | None, str | None]]:
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(
+        "SELECT id, department_category, position_category FROM contacts ORDER BY id"
+    ).fetchall()
+    conn.close()
+    return {row[0]: (row[1], row[2]) for row in rows}
+
+
+def test_run_distinct_matches_row_by_row(tmp_path: Path) -> None:
+    row_db = _prepare_db(tmp_path / "row")
+    distinct_db = _prepare_db(tmp_path / "distinct")
+
+    row_result = run(row_db)
+    distinct_result = run(distinct_db, mode="distinct")
+
+    assert distinct_result.is_ok()
+    assert distinct_result.unwrap() == row_result.unwrap() == 3
+    assert _categories(distinct_db) == _categories(row_db)
+    # department が空の行は「その他」が入る（行ごとの経路と同じ）
+    assert _categories(distinct_db)["3"] == ("その他", "部長")
+
+
+def test_run_distinct_recompute_all_overwrites_existing(tmp_path: Path) -> None:
+    db_path = _prepare_db(tmp_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE contacts SET department_category = 'その他' WHERE id = '2'")
+    conn.commit()
+    conn.close()
+
+    result = run(db_path, recompute_all=True, mode="distinct")
+
+    assert result.is_ok()
+    assert result.unwrap() == 3
+    assert _categories(db_path)["2"] == ("営業", "部長")
+
+
+def test_run_sql_matches_row_by_row(tmp_path: Path) -> None:
+    row_db = _prepare_db(tmp_path / "row")
+    sql_db = _prepare_db(tmp_path / "sql")
+
+    row_result = run(row_db)
+    sql_result = run(sql_db, mode="sql")
+
+    assert sql_result.is_ok()
+    assert sql_result.unwrap() == row_result.unwrap() == 3
+    assert _categories(sql_db) == _categories(row_db)
+
+
+def test_sqlite_functions_back_expression_index(tmp_path: Path) -> None:
+    db_path = _prepare_db(tmp_path)
+    conn = sqlite3.connect(db_path)
+    register_sqlite_functions(conn)
+
+    conn.execute("CREATE INDEX idx_contacts_dept_expr ON contacts (jordan_dept(department))")
+    rows = conn.execute(
+        "SELECT id FROM contacts WHERE jordan_dept(department) = '情報システム'"
+    ).fetchall()
+    null_category = conn.execute("SELECT jordan_position(NULL)").fetchone()[0]
+    conn.close()
+
+    assert rows == [("1",)]
+    assert null_category == "その他"
+
+
+def test_run_incremental_only_visits_rows_changed_since_watermark(tmp_path: Path) -> None:
+    db_path = _prepare_db(tmp_path)
+
+    first = run(db_path, incremental=True)
+    assert first.is_ok()
+    assert first.unwrap() == 3
+
+    # 古い updated_at のまま入った行は範囲外、新しく作成された行だけが対象になる
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "INSERT INTO contacts (id, company_id, full_name, department, position, updated_at) "
+        "VALUES ('4', '2', '古川 一郎', '法務部', '主任', 0)"
+    )
+    conn.execute(
+        "INSERT INTO contacts (id, company_id, full_name, department, position, updated_at) "
+        "VALUES ('5', '2', '新井 二郎', '購買部', '担当', ?)",
+        (int(time.time()) + 60,),
+    )
+    conn.commit()
+    watermark = conn.execute(
+        "SELECT last_updated_at FROM job_watermarks WHERE job = 'enrich_contact'"
+    ).fetchone()
+    conn.close()
+    assert watermark is not None
+
+    before = _categories(db_path)
+    second = run(db_path, mode="sql", incremental=True)
+    assert second.is_ok()
+    # 高水位と同じ秒の行 1〜3 は >= で読み直す（値は変わらない）。行 4 は範囲外
+    assert second.unwrap() == 4
+    categories = _categories(db_path)
+    assert categories["4"] == (None, None)
+    assert categories["5"] == ("購買", "担当者")
+    assert {key: categories[key] for key in ("1", "2", "3")} == {
+        key: before[key] for key in ("1", "2", "3")
+    }
+
+
+def test_run_incremental_reclassifies_contacts_edited_after_categorization(
+    tmp_path: Path,
+) -> None:
+    db_path = _prepare_db(tmp_path)
+    assert run(db_path, incremental=True).is_ok()
+    assert _categories(db_path)["1"][0] == "情報システム"
+
+    # 分類の書き込みは updated_at を進めないので、編集していない行の値はそのまま
+    conn = sqlite3.connect(db_path)
+    untouched = conn.execute("SELECT updated_at FROM contacts WHERE id = '2'").fetchone()[0]
+    conn.execute(
+        "UPDATE contacts SET department = '購買部', updated_at = ? WHERE id = '1'",
+        (int(time.time()) + 60,),
+    )
+    conn.commit()
+    conn.close()
+
+    assert run(db_path, incremental=True).is_ok()
+    assert _categories(db_path)["1"][0] == "購買"
+
+    conn = sqlite3.connect(db_path)
+    updated_at = conn.execute("SELECT updated_at FROM contacts WHERE id = '2'").fetchone()[0]
+    conn.close()
+    assert updated_at == untouched
+
+
+def test_run_recompute_stale_only_touches_rows_with_old_version(tmp_path: Path) -> None:
+    db_path = _prepare_db(tmp_path)
+    assert run(db_path, recompute_all=True).is_ok()
+
+    conn = sqlite3.connect(db_path)
+    versions = {row[0] for row in conn.execute("SELECT category_version FROM contacts")}
+    # id=2 だけ古いルールで分類された状態にする
+    conn.execute(
+        "UPDATE contacts SET category_version = 'old', department_category = 'その他' "
+        "WHERE id = '2'"
+    )
+    conn.commit()
+    conn.close()
+    assert versions == {CLASSIFIER_VERSION}
+
+    changes = diff(db_path, recompute_stale=True)
+    assert changes.is_ok()
+    assert changes.unwrap() == [
+        CategoryChange(column="department", before="その他", after="営業", count=1)
+    ]
+
+    result = run(db_path, mode="sql", recompute_stale=True)
+    assert result.is_ok()
+    assert result.unwrap() == 1
+    assert _categories(db_path)["2"] == ("営業", "部長")
+    assert run(db_path, recompute_stale=True).unwrap() == 0
+
+
+def _seniority(db_path: Path) -> dict[str, str | None]:
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT id, seniority FROM contacts ORDER BY id").fetchall()
+    conn.close()
+    return {row[0]: row[1] for row in rows}
+
+
+def test_seniority_is_filled_with_position_category_in_every_mode(tmp_path: Path) -> None:
+    for mode in ("rows", "distinct", "sql"):
+        db_path = _prepare_db(tmp_path / mode)
+
+        result = run(db_path, mode=mode)
+
+        assert result.is_ok()
+        # id=2 は position_category が既にあり seniority だけ無い（seniority 導入前に分類した行）
+        assert _seniority(db_path) == {"1": "Manager", "2": "Director", "3": "Director"}
+        assert _categories(db_path)["2"] == ("営業", "部長")
+        # 埋まった後はもう対象にならない
+        assert run(db_path, mode=mode).unwrap() == 0
+
+    conn = sqlite3.connect(tmp_path / "rows" / "contacts.sqlite")
+    index_names = {row[1] for row in conn.execute("PRAGMA index_list(contacts)")}
+    conn.close()
+    assert "idx_contacts_seniority" in index_names
+
+
+def test_recompute_stale_backfills_seniority(tmp_path: Path) -> None:
+    db_path = _prepare_db(tmp_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("ALTER TABLE contacts ADD COLUMN category_version TEXT")
+    # seniority 導入前のルールで分類済みだった行
+    conn.execute("UPDATE contacts SET category_version = 'before-seniority' WHERE id = '2'")
+    conn.commit()
+    conn.close()
+
+    changes = diff(db_path, recompute_stale=True)
+    assert changes.is_ok()
+    seniority_changes = [c for c in changes.unwrap() if c.column == "seniority"]
+    assert seniority_changes == [
+        CategoryChange(column="seniority", before=None, after="Director", count=2),
+        CategoryChange(column="seniority", before=None, after="Manager", count=1),
+    ]
+
+    result = run(db_path, mode="distinct", recompute_stale=True)
+    assert result.is_ok()
+    assert _seniority(db_path) == {"1": "Manager", "2": "Director", "3": "Director"}
+    assert run(db_path, recompute_stale=True).unwrap() == 0
+
+
+def test_split_id_ranges_covers_every_id_once(tmp_path: Path) -> None:
+    db_path = _prepare_db(tmp_path)
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO contacts (id, company_id, full_name) VALUES (?, '9', 'x')",
+        [(f"x{i:03d}",) for i in range(97)],
+    )
+    ranges = split_id_ranges(conn, 8)
+    ids = [row[0] for row in conn.execute("SELECT id FROM contacts ORDER BY id")]
+    conn.close()
+
+    assert len(ranges) == 8
+    covered = [
+        contact_id
+        for lo, hi in ranges
+        for contact_id in ids
+        if (lo is None or contact_id >= lo) and (hi is None or contact_id < hi)
+    ]
+    assert covered == ids
+
+
+def test_run_with_workers_matches_single_process(tmp_path: Path) -> None:
+    single_db = _prepare_db(tmp_path / "single")
+    parallel_db = _prepare_db(tmp_path / "parallel")
+
+    single = run(single_db)
+    parallel = run(parallel_db, workers=2)
+
+    assert parallel.is_ok()
+    assert parallel.unwrap() == single.unwrap() == 3
+    assert _categories(parallel_db) == _categories(single_db)
+    assert _seniority(parallel_db) == _seniority(single_db)
+    assert run(parallel_db, mode="sql", workers=2).is_err()
+
+
+def test_run_with_workers_retries_failed_range_writes(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    db_path = _prepare_db(tmp_path)
+    write = enrich_contact.update_categories_batch
+    calls = {"count": 0}
+
+    def flaky(conn, batch, version=None):
+        calls["count"] += 1
+        if calls["count"] == 1:
+            return Result.err(sqlite3.OperationalError("database is locked"))
+        return write(conn, batch, version)
+
+    monkeypatch.setattr(enrich_contact, "update_categories_batch", flaky)
+
+    result = run(db_path, workers=2)
+
+    assert result.is_ok()
+    assert result.unwrap() == 3
+    assert _seniority(db_path) == {"1": "Manager", "2": "Director", "3": "Director"}
+
+
+def test_run_with_workers_fails_when_range_cannot_be_written(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    db_path = _prepare_db(tmp_path)
+    monkeypatch.setattr(
+        enrich_contact,
+        "update_categories_batch",
+        lambda conn, batch, version=None: Result.err(
+            sqlite3.OperationalError("database is locked")
+        ),
+    )
+
+    result = run(db_path, workers=2, incremental=True)
+
+    assert result.is_err()
+    # 書けなかった範囲を次回拾えるよう、高水位は記録しない
+    conn = sqlite3.connect(db_path)
+    watermark = conn.execute("SELECT * FROM job_watermarks").fetchall()
+    conn.close()
+    assert watermark == []
@@ -0,0 +1,170 @@
+import sqlite3
+import time
+from pathlib import Path
+
+import pytest
+
+from src import enrich_domain
+from src.domain_pattern_votes import record_pattern_vote
+from src.enrich_domain import iter_emails_by_domain, run
+
+
+def _prepare_db(tmp_path: Path) -> Path:
+    tmp_path.mkdir(parents=True, exist_ok=True)
+    db_path = tmp_path / "domains.sqlite"
+    conn = sqlite3.connect(db_path)
+    conn.executescript(
+        """
+        CREATE TABLE companies (
+          id TEXT PRIMARY KEY, name TEXT NOT NULL, industry TEXT, employee_range TEXT,
+          primary_domain_id INTEGER, created_at INTEGER NOT NULL, updated_at INTEGER NOT NULL
+        );
+        CREATE TABLE domains (
+          id INTEGER PRIMARY KEY, company_id TEXT NOT NULL, domain TEXT NOT NULL UNIQUE,
+          disposable INTEGER NOT NULL DEFAULT 0, webmail INTEGER NOT NULL DEFAULT 0,
+          accept_all INTEGER NOT NULL DEFAULT 0, pattern TEXT, first_seen_at INTEGER,
+          last_seen_at INTEGER, created_at INTEGER NOT NULL, updated_at INTEGER NOT NULL
+        );
+        CREATE TABLE contacts (
+          id TEXT PRIMARY KEY, company_id TEXT NOT NULL, full_name TEXT NOT NULL,
+          first_name TEXT, last_name TEXT
+        );
+        CREATE TABLE emails (
+          id INTEGER PRIMARY KEY, contact_id TEXT, domain_id INTEGER, email TEXT NOT NULL,
+          status TEXT NOT NULL DEFAULT 'pending'
+        );
+        """
+    )
+    now = int(time.time())
+    conn.execute(
+        "INSERT INTO companies (id, name, created_at, updated_at) VALUES ('c', 'C', ?, ?)",
+        (now, now),
+    )
+    names = [("taro", "yamada"), ("hanako", "sato"), ("jiro", "suzuki"), ("yuki", "ito")]
+    conn.executemany(
+        "INSERT INTO contacts (id, company_id, full_name, first_name, last_name) "
+        "VALUES (?, 'c', ?, ?, ?)",
+        [(str(i), f"{first} {last}", first, last) for i, (first, last) in enumerate(names)],
+    )
+    domains = {
+        "alpha.co.jp": ["{f}.{l}", "{f}.{l}", "{f}{l}"],
+        "Beta.example": ["{f[0]}{l}", "{f[0]}{l}"],
+        "tie.example": ["{f}.{l}", "{l}"],
+        "kept.example": ["{l}.{f}"],
+    }
+    for domain_id, (domain, templates) in enumerate(domains.items(), start=1):
+        pattern = "first.last" if domain == "kept.example" else None
+        conn.execute(
+            "INSERT INTO domains (id, company_id, domain, pattern, created_at, updated_at) "
+            "VALUES (?, 'c', ?, ?, ?, ?)",
+            (domain_id, domain, pattern, now, now),
+        )
+        for contact_id, template in enumerate(templates):
+            first, last = names[contact_id]
+            conn.execute(
+                "INSERT INTO emails (contact_id, domain_id, email, status) VALUES (?, ?, ?, 'Ok')",
+                (str(contact_id), domain_id, f"{template.format(f=first, l=last)}@{domain}"),
+            )
+    conn.execute(
+        "INSERT INTO emails (contact_id, email, status) VALUES ('3', 'yuki@alpha.co.jp', 'Bad')"
+    )
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def _patterns(db_path: Path) -> dict[str, str | None]:
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT domain, pattern FROM domains ORDER BY id").fetchall()
+    conn.close()
+    return dict(rows)
+
+
+def test_iter_emails_by_domain_groups_in_domain_order(tmp_path: Path) -> None:
+    db_path = _prepare_db(tmp_path)
+    conn = sqlite3.connect(db_path)
+    groups = [(domain, len(entries)) for domain, entries in iter_emails_by_domain(conn)]
+    conn.close()
+
+    assert groups == [
+        ("alpha.co.jp", 3),
+        ("beta.example", 2),
+        ("kept.example", 1),
+        ("tie.example", 2),
+    ]
+
+
+@pytest.mark.parametrize("recompute_all", [False, True])
+def test_stream_matches_in_memory_vote(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, recompute_all: bool
+) -> None:
+    # バッチを 1 件にして、走査中のコミットも通ることを確かめる
+    monkeypatch.setattr(enrich_domain, "DEFAULT_BATCH_SIZE", 1)
+    memory_db = _prepare_db(tmp_path / "memory")
+    stream_db = _prepare_db(tmp_path / "stream")
+
+    memory = run(memory_db, recompute_all=recompute_all)
+    stream = run(stream_db, recompute_all=recompute_all, stream=True)
+
+    assert stream.is_ok()
+    assert stream.unwrap() == memory.unwrap()
+    assert _patterns(stream_db) == _patterns(memory_db)
+    assert _patterns(stream_db)["Beta.example"] == "flast"
+    assert _patterns(stream_db)["tie.example"] is None
+    expected_kept = "last.first" if recompute_all else "first.last"
+    assert _patterns(stream_db)["kept.example"] == expected_kept
+
+
+@pytest.mark.parametrize("mode", [{}, {"stream": True}, {"rebuild_votes": True}])
+def test_run_flags_and_skips_webmail_domains(tmp_path: Path, mode: dict[str, bool]) -> None:
+    db_path = _prepare_db(tmp_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "INSERT INTO domains (id, company_id, domain, created_at, updated_at) "
+        "VALUES (9, 'c', 'gmail.com', 1, 1)"
+    )
+    conn.executemany(
+        "INSERT INTO emails (contact_id, domain_id, email, status) VALUES (?, 9, ?, 'Ok')",
+        [("0", "taro.yamada@gmail.com"), ("1", "hanako.sato@gmail.com")],
+    )
+    conn.commit()
+    conn.close()
+
+    run(db_path, **mode).unwrap()
+
+    conn = sqlite3.connect(db_path)
+    flags = conn.execute("SELECT webmail, disposable FROM domains WHERE id = 9").fetchone()
+    conn.close()
+    assert flags == (1, 0)
+    assert _patterns(db_path)["gmail.com"] is None
+    assert _patterns(db_path)["alpha.co.jp"] == "first.last"
+
+
+def _top_rank(db_path: Path, domain_id: int) -> tuple[str, float]:
+    conn = sqlite3.connect(db_path)
+    row = conn.execute(
+        "SELECT pattern, confidence FROM domain_pattern_ranks WHERE domain_id = ? AND rank = 1",
+        (domain_id,),
+    ).fetchone()
+    conn.close()
+    return row
+
+
+@pytest.mark.parametrize("mode", [{}, {"stream": True}])
+def test_run_refreshes_pattern_ranks_in_every_mode(tmp_path: Path, mode: dict[str, bool]) -> None:
+    db_path = _prepare_db(tmp_path)
+    run(db_path, from_votes=True, rebuild_votes=True).unwrap()
+    before = _top_rank(db_path, 2)
+
+    # 取り込みで票が増えた後は、--from-votes でなくても順位を書き直す
+    conn = sqlite3.connect(db_path)
+    for _ in range(3):
+        record_pattern_vote(conn, 2, "flast", "Bad").unwrap()
+    conn.commit()
+    conn.close()
+
+    run(db_path, **mode).unwrap()
+
+    after = _top_rank(db_path, 2)
+    assert before[0] == after[0] == "flast"
+    assert after[1] < before[1]
@@ -0,0 +1,37 @@
+import pytest
+
+from src.benchmarks.pattern_inference import _legacy_infer_pattern
+from src.enrichers.domain import PATTERN_BUILDERS, LocalPartIndex, infer_pattern, pattern_index
+from src.import_email_hippo_csv import _guess_contact_id
+
+
+@pytest.mark.parametrize("pattern", list(PATTERN_BUILDERS))
+def test_infer_pattern_matches_each_builder(pattern: str) -> None:
+    local = PATTERN_BUILDERS[pattern]("taro", "yamada")
+
+    assert infer_pattern(local.upper(), "Taro", "Yamada") == pattern
+    assert infer_pattern(local, "Taro", "Yamada") == _legacy_infer_pattern(local, "Taro", "Yamada")
+
+
+def test_infer_pattern_prefers_earlier_builder_on_collision() -> None:
+    # first == last だと first.last と last.first が同じ local-part になる
+    assert pattern_index("ko", "ko")["ko.ko"] == "first.last"
+    assert infer_pattern("ko.ko", "Ko", "Ko") == _legacy_infer_pattern("ko.ko", "Ko", "Ko")
+    assert infer_pattern("info", "Taro", "Yamada") is None
+    assert infer_pattern("taro", "", "Yamada") is None
+
+
+def test_guess_contact_id_requires_a_unique_owner() -> None:
+    index: LocalPartIndex[int] = LocalPartIndex()
+    index.add(1, "Taro", "Yamada")
+    index.add(2, "Tomoko", "Yamada")
+    index.add(3, "Hanako", "Sato")
+    index.add(4, None, "Sato")
+    contacts = {"c1": index}
+
+    assert _guess_contact_id("taro.yamada", "c1", contacts) == 1
+    assert _guess_contact_id("hsato", "c1", contacts) == 3
+    # tyamada は Taro と Tomoko のどちらにも当たる
+    assert _guess_contact_id("tyamada", "c1", contacts) is None
+    assert _guess_contact_id("taro.yamada", "c2", contacts) is None
+    assert index.lookup("T.Yamada") == {1: "f.last", 2: "f.last"}
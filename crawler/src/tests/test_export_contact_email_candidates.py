@@ -0,0 +1,212 @@
+import csv
+import sqlite3
+import time
+from pathlib import Path
+
+import pytest
+
+from src.domain_pattern_votes import ensure_domain_pattern_votes_table, record_pattern_vote
+from src.enrich_domain import run
+from src.enrichers.domain import PATTERN_BUILDERS, rank_patterns
+from src.export_contact_email_candidates import (
+    DEFAULT_MAX_CANDIDATES,
+    FALLBACK_PATTERNS,
+    Args,
+    _generate_candidates,
+    export_candidates,
+)
+
+
+def test_rank_patterns_pushes_bad_patterns_down() -> None:
+    ranked = rank_patterns({"first.last": 3, "flast": 1}, {"flast": 2, "last": 1})
+
+    assert len(ranked) == len(PATTERN_BUILDERS)
+    assert sum(confidence for _, confidence in ranked) == pytest.approx(1.0)
+    assert ranked[0][0] == "first.last"
+    assert ranked[0][1] > 0.7
+    # Bad だけのパターンは票の無いパターンより下になる
+    assert ranked[-1][0] == "last"
+
+
+def test_rank_patterns_splits_ties_evenly() -> None:
+    ranked = rank_patterns({"first.last": 1, "flast": 1}, {})
+
+    assert {pattern for pattern, _ in ranked[:2]} == {"first.last", "flast"}
+    assert ranked[0][1] == pytest.approx(ranked[1][1])
+
+
+def test_generate_candidates_stops_at_confidence_threshold() -> None:
+    ranked = [("first.last", 0.6), ("flast", 0.35), ("last", 0.05)]
+
+    candidates = _generate_candidates("example.com", None, "Taro", "Yamada", ranked=ranked)
+    assert [c.email for c in candidates] == ["taro.yamada@example.com", "tyamada@example.com"]
+    assert [c.confidence for c in candidates] == [0.6, 0.35]
+
+    capped = _generate_candidates(
+        "example.com", None, "Taro", "Yamada", ranked=ranked, max_candidates=1
+    )
+    assert [c.pattern for c in capped] == ["first.last"]
+
+
+def test_generate_candidates_without_ranks_keeps_pattern_and_fallback() -> None:
+    single = _generate_candidates("example.com", "flast", "Taro", "Yamada")
+    assert [(c.email, c.confidence) for c in single] == [("tyamada@example.com", None)]
+
+    fallback = _generate_candidates("example.com", None, "Taro", "Yamada")
+    assert [c.pattern for c in fallback] == list(FALLBACK_PATTERNS)
+
+
+def _prepare_db(tmp_path: Path) -> Path:
+    db_path = tmp_path / "export.sqlite"
+    conn = sqlite3.connect(db_path)
+    conn.executescript(
+        """
+        CREATE TABLE companies (
+          id TEXT PRIMARY KEY, name TEXT NOT NULL, industry TEXT, employee_range TEXT,
+          primary_domain_id TEXT, created_at INTEGER NOT NULL, updated_at INTEGER NOT NULL
+        );
+        CREATE TABLE domains (
+          id INTEGER PRIMARY KEY, company_id TEXT NOT NULL, domain TEXT NOT NULL UNIQUE,
+          disposable INTEGER NOT NULL DEFAULT 0, webmail INTEGER NOT NULL DEFAULT 0,
+          accept_all INTEGER NOT NULL DEFAULT 0, pattern TEXT, first_seen_at INTEGER,
+          last_seen_at INTEGER, created_at INTEGER NOT NULL, updated_at INTEGER NOT NULL
+        );
+        CREATE TABLE contacts (
+          id TEXT PRIMARY KEY, company_id TEXT NOT NULL, full_name TEXT NOT NULL,
+          first_name TEXT, last_name TEXT, position TEXT, department TEXT, city TEXT,
+          linkedin_url TEXT, source_label TEXT, source_url TEXT
+        );
+        """
+    )
+    now = int(time.time())
+    for domain_id, (company_id, domain) in enumerate(
+        [("c1", "voted.example"), ("c2", "tie.example"), ("c3", "unknown.example")], start=1
+    ):
+        conn.execute(
+            "INSERT INTO companies (id, name, primary_domain_id, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (company_id, company_id.upper(), domain_id, now, now),
+        )
+        conn.execute(
+            "INSERT INTO domains (id, company_id, domain, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (domain_id, company_id, domain, now, now),
+        )
+        conn.execute(
+            "INSERT INTO contacts (id, company_id, full_name, first_name, last_name) "
+            "VALUES (?, ?, 'Taro Yamada', 'Taro', 'Yamada')",
+            (f"p{domain_id}", company_id),
+        )
+    ensure_domain_pattern_votes_table(conn).unwrap()
+    for domain_id, pattern, status in [
+        (1, "first.last", "Ok"),
+        (1, "first.last", "Ok"),
+        (1, "first.last", "Ok"),
+        (1, "flast", "Bad"),
+        (2, "first.last", "Ok"),
+        (2, "flast", "Ok"),
+        (2, "flast", "Bad"),
+    ]:
+        record_pattern_vote(conn, domain_id, pattern, status).unwrap()
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def test_export_uses_ranked_distribution(tmp_path: Path) -> None:
+    db_path = _prepare_db(tmp_path)
+    run(db_path, from_votes=True).unwrap()
+    output = tmp_path / "candidates.csv"
+
+    export_candidates(Args(db=db_path, output=output)).unwrap()
+
+    with output.open(encoding="utf-8") as handle:
+        rows = list(csv.DictReader(handle))
+    by_domain: dict[str, list[str]] = {}
+    for row in rows:
+        by_domain.setdefault(row["domain"], []).append(row["candidate_pattern"])
+    assert by_domain["voted.example"] == ["first.last"]
+    # 同数の first.last / flast は flast の Bad で first.last が上になり、
+    # first.last は Ok だけなので既定の閾値でも 1 件で止まる
+    assert by_domain["tie.example"] == ["first.last"]
+    # 票の無いドメインは pattern_priors（voted.example の first.last）の順に絞り込む
+    assert by_domain["unknown.example"][0] == "first.last"
+    assert len(by_domain["unknown.example"]) < len(FALLBACK_PATTERNS)
+
+
+def test_export_emits_single_candidate_for_accept_all(tmp_path: Path) -> None:
+    db_path = _prepare_db(tmp_path)
+    run(db_path, from_votes=True).unwrap()
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "UPDATE domains SET accept_all = 1 WHERE domain IN ('tie.example', 'unknown.example')"
+    )
+    conn.commit()
+    conn.close()
+    output = tmp_path / "candidates.csv"
+
+    export_candidates(Args(db=db_path, output=output)).unwrap()
+
+    with output.open(encoding="utf-8") as handle:
+        rows = list(csv.DictReader(handle))
+    accept_all_rows = [
+        (row["domain"], row["candidate_pattern"])
+        for row in rows
+        if row["domain"] != "voted.example"
+    ]
+    assert accept_all_rows == [("tie.example", "first.last"), ("unknown.example", "first.last")]
+
+
+def test_export_skips_domains_without_mx(tmp_path: Path) -> None:
+    db_path = _prepare_db(tmp_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("ALTER TABLE domains ADD COLUMN mail_capable INTEGER")
+    conn.execute("UPDATE domains SET mail_capable = 0 WHERE domain = 'unknown.example'")
+    conn.execute("UPDATE domains SET mail_capable = 1 WHERE domain = 'voted.example'")
+    conn.commit()
+    conn.close()
+    output = tmp_path / "candidates.csv"
+
+    export_candidates(Args(db=db_path, output=output)).unwrap()
+
+    with output.open(encoding="utf-8") as handle:
+        domains = {row["domain"] for row in csv.DictReader(handle)}
+    # 未判定（NULL）の tie.example は従来どおり出す
+    assert domains == {"voted.example", "tie.example"}
+
+
+def test_export_skips_webmail_and_disposable_domains(tmp_path: Path) -> None:
+    db_path = _prepare_db(tmp_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE domains SET webmail = 1 WHERE domain = 'unknown.example'")
+    conn.execute("UPDATE domains SET disposable = 1 WHERE domain = 'tie.example'")
+    conn.commit()
+    conn.close()
+    output = tmp_path / "candidates.csv"
+
+    export_candidates(Args(db=db_path, output=output)).unwrap()
+
+    with output.open(encoding="utf-8") as handle:
+        domains = {row["domain"] for row in csv.DictReader(handle)}
+    assert domains == {"voted.example"}
+
+
+@pytest.mark.parametrize("ok_count", [1, 2, 3])
+def test_generate_candidates_stops_at_verified_pattern(ok_count: int) -> None:
+    ranked = rank_patterns({"first.last": ok_count}, {})
+
+    candidates = _generate_candidates(
+        "example.com", "first.last", "Taro", "Yamada", ranked=ranked, verified={"first.last"}
+    )
+
+    assert [c.pattern for c in candidates] == ["first.last"]
+
+
+def test_generate_candidates_keeps_ranked_cutoff_without_verified_pattern() -> None:
+    # Bad のあるパターンは検証済みとみなさず、確率の累計で絞る
+    ranked = rank_patterns({"first.last": 2}, {"first.last": 1})
+
+    candidates = _generate_candidates("example.com", "first.last", "Taro", "Yamada", ranked=ranked)
+
+    assert candidates[0].pattern == "first.last"
+    assert 1 < len(candidates) <= DEFAULT_MAX_CANDIDATES
@@ -0,0 +1,94 @@
+import sqlite3
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from src.adapters.openai import LlmCallUsage, _extract_usage
+from src.llm_ledger import (
+    LlmCallRecord,
+    ensure_llm_calls_table,
+    estimate_cache_savings_usd,
+    estimate_cost_usd,
+    hash_prompt,
+    insert_llm_call,
+)
+from src.llm_report import aggregate_llm_calls, format_report
+
+MODEL = "gpt-5-nano-2025-08-07"
+
+
+def test_estimate_cost_usd_bills_cached_and_search_separately() -> None:
+    cost = estimate_cost_usd(MODEL, 1_000_000, 400_000, 100_000, web_search_calls=2)
+    assert cost == pytest.approx(600_000 * 0.05e-6 + 400_000 * 0.005e-6 + 100_000 * 0.4e-6 + 0.02)
+    # スナップショット日付なしのモデル名でも単価を引ける
+    assert estimate_cost_usd("gpt-5-nano", 1_000_000, 0, 0) == pytest.approx(0.05)
+    assert estimate_cost_usd("unknown-model", 10, 0, 10) is None
+    assert estimate_cache_savings_usd(MODEL, 1_000_000) == pytest.approx(0.045)
+
+
+def test_extract_usage_reads_tokens_and_web_search_calls() -> None:
+    resp = SimpleNamespace(
+        model=MODEL,
+        usage=SimpleNamespace(
+            input_tokens=1200,
+            input_tokens_details=SimpleNamespace(cached_tokens=1024),
+            output_tokens=300,
+            output_tokens_details=SimpleNamespace(reasoning_tokens=200),
+        ),
+        output=[
+            SimpleNamespace(type="web_search_call"),
+            SimpleNamespace(type="web_search_call"),
+            SimpleNamespace(type="message"),
+        ],
+    )
+    usage = _extract_usage(resp, "fallback")
+    assert usage == LlmCallUsage(
+        model=MODEL,
+        input_tokens=1200,
+        cached_tokens=1024,
+        output_tokens=300,
+        reasoning_tokens=200,
+        web_search_calls=2,
+    )
+
+
+def _insert(conn: sqlite3.Connection, company_id: str, department: str, **usage: int) -> None:
+    record = LlmCallRecord(
+        usage=LlmCallUsage(model=MODEL, **usage),
+        prompt_hash=hash_prompt(f"{company_id}:{department}"),
+        caller="search_contacts",
+        run_id="run1",
+        prompt_template="contact_search",
+        company_id=company_id,
+        department=department,
+    )
+    assert insert_llm_call(conn, record).is_ok()
+
+
+def test_aggregate_llm_calls_by_company_and_department(tmp_path: Path) -> None:
+    conn = sqlite3.connect(tmp_path / "test.sqlite")
+    conn.row_factory = sqlite3.Row
+    assert ensure_llm_calls_table(conn).is_ok()
+    _insert(conn, "c1", "営業,マーケ", input_tokens=1000, output_tokens=100, web_search_calls=2)
+    _insert(conn, "c1", "営業", input_tokens=1000, cached_tokens=1000, output_tokens=100)
+    _insert(conn, "c2", "マーケ", input_tokens=500, output_tokens=50, web_search_calls=1)
+    conn.commit()
+
+    by_company = aggregate_llm_calls(conn, by="company").unwrap()
+    assert [row.key for row in by_company] == ["c1", "c2"]
+    assert by_company[0].calls == 2
+    assert by_company[0].web_search_calls == 2
+    assert by_company[0].cache_savings_usd > 0
+
+    by_department = {row.key: row for row in aggregate_llm_calls(conn, by="department").unwrap()}
+    assert by_department["営業"].calls == pytest.approx(1.5)
+    assert by_department["マーケ"].calls == pytest.approx(1.5)
+    total_cost = sum(row.cost_usd for row in by_company)
+    assert sum(row.cost_usd for row in by_department.values()) == pytest.approx(total_cost)
+
+    assert aggregate_llm_calls(conn, by="run", run_id="missing").unwrap() == []
+    report = format_report(by_company, "company", {"c1": "Acme"})
+    assert "Acme (c1)" in report
+    assert "TOTAL" in report
+    conn.close()
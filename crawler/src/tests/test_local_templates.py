@@ -0,0 +1,180 @@
+import sqlite3
+
+import pytest
+
+from src.enrichers.domain import PATTERN_BUILDERS
+from src.enrichers.local_templates import (
+    BUILTIN_TEMPLATES,
+    align_local_part,
+    build_local,
+    compile_template,
+    mine_templates,
+)
+from src.export_contact_email_candidates import _generate_candidates
+from src.mine_local_templates import (
+    ensure_domain_local_templates_table,
+    load_domain_templates,
+    mine_local_templates,
+)
+
+
+@pytest.mark.parametrize(
+    ("local", "expected"),
+    [
+        ("yamada.t", "{last}.{f}"),
+        ("taro_y", "{first}_{l}"),
+        ("yamadat", "{last}{f}"),
+        # 数字は本人ごとの値なのでテンプレートにしない
+        ("Taro.Yamada2", None),
+        ("yamada01", None),
+        ("t.yamada", "{f}.{last}"),
+        ("info", None),
+        ("ty", None),
+        ("taro.yamada.x", None),
+    ],
+)
+def test_align_local_part(local: str, expected: str | None) -> None:
+    assert align_local_part(local, "Taro", "Yamada") == expected
+
+
+def test_align_local_part_requires_names() -> None:
+    assert align_local_part("yamada", None, "Yamada") is None
+
+
+def test_builtin_templates_cover_pattern_builders() -> None:
+    assert set(BUILTIN_TEMPLATES.values()) == set(PATTERN_BUILDERS)
+    for template, pattern in BUILTIN_TEMPLATES.items():
+        assert compile_template(template)("taro", "yamada") == PATTERN_BUILDERS[pattern](
+            "taro", "yamada"
+        )
+
+
+def test_build_local_needs_used_names() -> None:
+    assert build_local("{last}.{f}", "taro", "yamada") == "yamada.t"
+    assert build_local("{last}.{f}", None, "yamada") is None
+    assert build_local("{last}.{l}", None, "yamada") == "yamada.y"
+
+
+def test_mine_templates_counts_support() -> None:
+    support = mine_templates(
+        [
+            ("yamada.t", "Taro", "Yamada"),
+            ("suzuki.h", "Hanako", "Suzuki"),
+            ("info", "Taro", "Yamada"),
+        ]
+    )
+    assert support == {"{last}.{f}": 2}
+
+
+def _prepare_conn() -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(
+        """
+        CREATE TABLE domains (
+          id INTEGER PRIMARY KEY, company_id TEXT NOT NULL, domain TEXT NOT NULL UNIQUE,
+          disposable INTEGER NOT NULL DEFAULT 0, webmail INTEGER NOT NULL DEFAULT 0,
+          pattern TEXT, created_at INTEGER NOT NULL, updated_at INTEGER NOT NULL
+        );
+        CREATE TABLE contacts (id TEXT PRIMARY KEY, first_name TEXT, last_name TEXT);
+        CREATE TABLE emails (
+          id INTEGER PRIMARY KEY, contact_id TEXT, email TEXT NOT NULL, status TEXT
+        );
+        INSERT INTO domains (id, company_id, domain, created_at, updated_at) VALUES
+          (1, 'c1', 'mined.example', 100, 100),
+          (2, 'c2', 'builtin.example', 100, 100),
+          (3, 'c3', 'tied.example', 100, 100);
+        INSERT INTO contacts VALUES
+          ('p1', 'Taro', 'Yamada'), ('p2', 'Hanako', 'Suzuki'), ('p3', 'Jiro', 'Sato');
+        INSERT INTO emails (contact_id, email, status) VALUES
+          ('p1', 'yamada.t@Mined.example', 'Ok'),
+          ('p2', 'suzuki.h@mined.example', 'Ok'),
+          ('p3', 'jiro.sato@mined.example', 'Ok'),
+          ('p3', 'sato.j@mined.example', 'Bad'),
+          ('p1', 'taro.yamada@builtin.example', 'Ok'),
+          ('p2', 'hanako.suzuki@builtin.example', 'Ok'),
+          ('p1', 'yamada_t@tied.example', 'Ok'),
+          ('p2', 'suzuki-h@tied.example', 'Ok');
+        """
+    )
+    conn.commit()
+    return conn
+
+
+def test_mine_local_templates_rebuilds_support() -> None:
+    conn = _prepare_conn()
+
+    assert mine_local_templates(conn).unwrap() == 5
+    rows = conn.execute(
+        "SELECT domain_id, template, support FROM domain_local_templates "
+        "ORDER BY domain_id, template"
+    ).fetchall()
+    assert rows == [
+        (1, "{first}.{last}", 1),
+        (1, "{last}.{f}", 2),
+        (2, "{first}.{last}", 2),
+        (3, "{last}-{f}", 1),
+        (3, "{last}_{f}", 1),
+    ]
+    # 作り直しても重複しない
+    assert mine_local_templates(conn).unwrap() == 5
+
+
+def test_load_domain_templates_keeps_new_strict_winners() -> None:
+    conn = _prepare_conn()
+    assert load_domain_templates(conn).unwrap() == {}
+
+    mine_local_templates(conn).unwrap()
+
+    assert load_domain_templates(conn).unwrap() == {"1": "{last}.{f}"}
+    assert load_domain_templates(conn, min_support=3).unwrap() == {}
+
+
+def test_load_domain_templates_drops_templates_with_low_precision() -> None:
+    conn = _prepare_conn()
+    conn.execute("INSERT INTO contacts VALUES ('p4', 'Saburo', 'Ito'), ('p5', 'Shiro', 'Kato')")
+    conn.executemany(
+        "INSERT INTO emails (contact_id, email, status) VALUES (?, ?, 'Bad')",
+        [("p4", "ito.s@mined.example"), ("p5", "kato.s@mined.example")],
+    )
+    conn.commit()
+
+    mine_local_templates(conn).unwrap()
+
+    row = conn.execute(
+        "SELECT support, bad_count FROM domain_local_templates "
+        "WHERE domain_id = 1 AND template = '{last}.{f}'"
+    ).fetchone()
+    # sato.j の Bad も含めて Ok 2 / Bad 3。有効率 3/7 が閾値 0.5 を下回る
+    assert row == (2, 3)
+    assert load_domain_templates(conn).unwrap() == {}
+    assert load_domain_templates(conn, threshold=0.4).unwrap() == {"1": "{last}.{f}"}
+
+
+def test_ensure_domain_local_templates_table_adds_bad_count() -> None:
+    conn = _prepare_conn()
+    conn.execute(
+        "CREATE TABLE domain_local_templates (domain_id INTEGER NOT NULL, "
+        "template TEXT NOT NULL, support INTEGER NOT NULL, updated_at INTEGER NOT NULL, "
+        "PRIMARY KEY (domain_id, template)) WITHOUT ROWID"
+    )
+    conn.execute("INSERT INTO domain_local_templates VALUES (1, '{last}.{f}', 2, 100)")
+
+    ensure_domain_local_templates_table(conn).unwrap()
+
+    assert conn.execute("SELECT support, bad_count FROM domain_local_templates").fetchall() == [
+        (2, 0)
+    ]
+
+
+def test_generate_candidates_uses_template_first() -> None:
+    candidates = _generate_candidates(
+        "mined.example", "first.last", "Ichiro", "Tanaka", template="{last}.{f}"
+    )
+    assert [(c.email, c.pattern) for c in candidates] == [
+        ("tanaka.i@mined.example", "{last}.{f}")
+    ]
+
+    fallback = _generate_candidates(
+        "mined.example", "last", None, "Tanaka", template="{last}.{f}"
+    )
+    assert [c.email for c in fallback] == ["tanaka@mined.example"]
@@ -0,0 +1,142 @@
+import sqlite3
+from pathlib import Path
+
+from src.domain_pattern_votes import ensure_domain_pattern_votes_table, record_pattern_vote
+from src.enrich_domain import run
+from src.export_contact_email_candidates import _generate_candidates
+from src.mine_local_templates import mine_local_templates
+from src.pattern_feedback import (
+    FeedbackStats,
+    ensure_pattern_demotions_table,
+    is_demoted,
+    load_demoted_patterns,
+    run_feedback,
+)
+from src.tests.test_enrich_domain import _patterns, _prepare_db
+from src.tests.test_local_templates import _prepare_conn as _prepare_template_conn
+
+
+def test_is_demoted_needs_enough_observations() -> None:
+    assert not is_demoted(0, 2)
+    assert is_demoted(0, 3)
+    assert is_demoted(1, 4)
+    assert not is_demoted(2, 2)
+
+
+def _record(conn: sqlite3.Connection, votes: list[tuple[int, str, str, int]]) -> None:
+    for domain_id, pattern, status, count in votes:
+        for _ in range(count):
+            record_pattern_vote(conn, domain_id, pattern, status).unwrap()
+    conn.commit()
+
+
+def _prepare_conn() -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(
+        """
+        CREATE TABLE domains (
+          id INTEGER PRIMARY KEY, domain TEXT NOT NULL, pattern TEXT,
+          updated_at INTEGER NOT NULL
+        );
+        INSERT INTO domains VALUES
+          (1, 'replaced.example', 'first.last', 100),
+          (2, 'cleared.example', 'last', 100),
+          (3, 'few.example', 'first.last', 100);
+        """
+    )
+    ensure_domain_pattern_votes_table(conn).unwrap()
+    _record(
+        conn,
+        [
+            (1, "first.last", "Ok", 1),
+            (1, "first.last", "Bad", 4),
+            (1, "flast", "Ok", 2),
+            (2, "last", "Bad", 3),
+            (3, "first.last", "Ok", 1),
+            (3, "first.last", "Bad", 1),
+        ],
+    )
+    return conn
+
+
+def test_run_feedback_demotes_and_replaces_patterns() -> None:
+    conn = _prepare_conn()
+
+    stats = run_feedback(conn).unwrap()
+
+    assert stats == FeedbackStats(demoted=2, restored=0, replaced_patterns=1, cleared_patterns=1)
+    assert conn.execute("SELECT id, pattern FROM domains ORDER BY id").fetchall() == [
+        (1, "flast"),
+        (2, None),
+        (3, "first.last"),
+    ]
+    assert load_demoted_patterns(conn).unwrap() == {"1": {"first.last"}, "2": {"last"}}
+    # 票が増えていなければ何もしない
+    assert run_feedback(conn).unwrap() == FeedbackStats()
+
+
+def test_run_feedback_restores_recovered_patterns() -> None:
+    conn = _prepare_conn()
+    run_feedback(conn).unwrap()
+
+    _record(conn, [(2, "last", "Ok", 5)])
+    stats = run_feedback(conn).unwrap()
+
+    assert stats.restored == 1
+    assert load_demoted_patterns(conn).unwrap() == {"1": {"first.last"}}
+
+
+def test_enrich_domain_does_not_restore_demoted_pattern(tmp_path: Path) -> None:
+    db_path = _prepare_db(tmp_path)
+    conn = sqlite3.connect(db_path)
+    ensure_pattern_demotions_table(conn).unwrap()
+    conn.execute(
+        "INSERT INTO domain_pattern_demotions VALUES (1, 'first.last', 2, 5, 100)"
+    )
+    conn.commit()
+    conn.close()
+
+    run(db_path).unwrap()
+
+    assert _patterns(db_path)["alpha.co.jp"] is None
+    assert _patterns(db_path)["Beta.example"] == "flast"
+
+
+def test_generate_candidates_skips_demoted_patterns() -> None:
+    candidates = _generate_candidates(
+        "example.com", "first.last", "Taro", "Yamada", max_candidates=2, demoted={"first.last"}
+    )
+    assert [c.pattern for c in candidates] == ["f-last", "last"]
+
+
+def test_run_feedback_demotes_mined_templates() -> None:
+    conn = _prepare_template_conn()
+    conn.execute("INSERT INTO contacts VALUES ('p4', 'Saburo', 'Ito'), ('p5', 'Shiro', 'Kato')")
+    conn.executemany(
+        "INSERT INTO emails (contact_id, email, status) VALUES (?, ?, 'Bad')",
+        [("p4", "ito.s@mined.example"), ("p5", "kato.s@mined.example")],
+    )
+    conn.commit()
+    mine_local_templates(conn).unwrap()
+
+    stats = run_feedback(conn).unwrap()
+
+    assert stats.demoted == 1
+    demoted = load_demoted_patterns(conn).unwrap()
+    assert demoted == {"1": {"{last}.{f}"}}
+    candidates = _generate_candidates(
+        "mined.example", None, "Ichiro", "Tanaka", template="{last}.{f}", demoted=demoted["1"]
+    )
+    assert "{last}.{f}" not in [c.pattern for c in candidates]
+
+    # Ok が増えて有効率が戻れば記録から外す
+    conn.execute("INSERT INTO contacts VALUES ('p6', 'Goro', 'Abe'), ('p7', 'Rokuro', 'Mori')")
+    conn.executemany(
+        "INSERT INTO emails (contact_id, email, status) VALUES (?, ?, 'Ok')",
+        [("p6", "abe.g@mined.example"), ("p7", "mori.r@mined.example")],
+    )
+    conn.commit()
+    mine_local_templates(conn).unwrap()
+
+    assert run_feedback(conn).unwrap().restored == 1
+    assert load_demoted_patterns(conn).unwrap() == {}
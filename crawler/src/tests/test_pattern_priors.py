@@ -0,0 +1,122 @@
+import sqlite3
+
+import pytest
+
+from src.enrichers.domain import PATTERN_BUILDERS
+from src.pattern_priors import (
+    PatternPriorModel,
+    domain_tld,
+    load_pattern_prior_model,
+    refresh_pattern_priors,
+)
+
+
+@pytest.mark.parametrize(
+    ("domain", "expected"),
+    [
+        ("example.co.jp", "co.jp"),
+        ("mail.example.co.uk", "co.uk"),
+        ("example.com", "com"),
+        ("example.jp", "jp"),
+        ("sub.example.com", "com"),
+        ("localhost", ""),
+        (None, ""),
+    ],
+)
+def test_domain_tld(domain: str | None, expected: str) -> None:
+    assert domain_tld(domain) == expected
+
+
+def _prepare_conn() -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(
+        """
+        CREATE TABLE companies (
+          id TEXT PRIMARY KEY, name TEXT NOT NULL, industry TEXT, employee_range TEXT,
+          created_at INTEGER NOT NULL, updated_at INTEGER NOT NULL
+        );
+        CREATE TABLE domains (
+          id INTEGER PRIMARY KEY, company_id TEXT NOT NULL, domain TEXT NOT NULL UNIQUE,
+          pattern TEXT, created_at INTEGER NOT NULL, updated_at INTEGER NOT NULL
+        );
+        """
+    )
+    rows = [
+        ("a.co.jp", "製造", "1001-5000", "last"),
+        ("b.co.jp", "製造", "1001-5000", "last"),
+        ("c.co.jp", "IT", "11-50", "first.last"),
+        ("d.com", "IT", "11-50", "first.last"),
+        ("e.com", "IT", "51-200", "flast"),
+        ("f.com", None, None, None),
+        ("g.com", None, None, "unknown-pattern"),
+    ]
+    for domain_id, (domain, industry, employee_range, pattern) in enumerate(rows, start=1):
+        conn.execute(
+            "INSERT INTO companies VALUES (?, ?, ?, ?, 100, 100)",
+            (f"c{domain_id}", domain, industry, employee_range),
+        )
+        conn.execute(
+            "INSERT INTO domains VALUES (?, ?, ?, ?, 100, 100)",
+            (domain_id, f"c{domain_id}", domain, pattern),
+        )
+    conn.commit()
+    return conn
+
+
+def _priors(conn: sqlite3.Connection) -> list[tuple[str, str, str, int]]:
+    return conn.execute(
+        "SELECT feature, value, pattern, domain_count FROM pattern_priors "
+        "ORDER BY feature, value, pattern"
+    ).fetchall()
+
+
+def test_refresh_counts_known_patterns_per_feature() -> None:
+    conn = _prepare_conn()
+
+    assert refresh_pattern_priors(conn).unwrap() == 5
+    priors = _priors(conn)
+    assert ("all", "", "last", 2) in priors
+    assert ("tld", "co.jp", "first.last", 1) in priors
+    assert ("industry", "IT", "first.last", 2) in priors
+    assert all(pattern in PATTERN_BUILDERS for _, _, pattern, _ in priors)
+    # 変更が無ければ何も数え直さない
+    assert refresh_pattern_priors(conn).unwrap() == 0
+
+
+def test_incremental_refresh_matches_full_recount() -> None:
+    conn = _prepare_conn()
+    refresh_pattern_priors(conn).unwrap()
+
+    conn.execute("UPDATE domains SET pattern = 'flast', updated_at = 200 WHERE id = 1")
+    conn.execute("UPDATE domains SET pattern = 'last', updated_at = 200 WHERE id = 6")
+    conn.execute("UPDATE companies SET industry = '小売', updated_at = 200 WHERE id = 'c3'")
+    conn.execute("DELETE FROM domains WHERE id = 4")
+    conn.commit()
+
+    assert refresh_pattern_priors(conn).unwrap() == 4
+    incremental = _priors(conn)
+    conn.execute("DELETE FROM pattern_priors")
+    conn.execute("DELETE FROM pattern_prior_domains")
+    refresh_pattern_priors(conn, full=True).unwrap()
+    assert incremental == _priors(conn)
+
+
+def test_model_conditions_on_tld_and_industry() -> None:
+    conn = _prepare_conn()
+    refresh_pattern_priors(conn).unwrap()
+    model = load_pattern_prior_model(conn).unwrap()
+
+    jp_manufacturer = model.prior("new.co.jp", "製造", "1001-5000")
+    it_startup = model.prior("new.com", "IT", "11-50")
+
+    assert sum(jp_manufacturer.values()) == pytest.approx(1.0)
+    assert max(jp_manufacturer, key=jp_manufacturer.__getitem__) == "last"
+    assert max(it_startup, key=it_startup.__getitem__) == "first.last"
+
+
+def test_empty_model_is_uniform() -> None:
+    model = PatternPriorModel({})
+
+    prior = model.prior("example.com", "IT", "11-50")
+    assert model.domain_count == 0
+    assert list(prior.values()) == pytest.approx([1 / len(PATTERN_BUILDERS)] * len(prior))
@@ -0,0 +1,80 @@
+import asyncio
+import sqlite3
+
+from src.adapters.email_verifier import StaticEmailVerifier
+from src.probe_accept_all import probe_domains
+from src.result import Result
+
+
+def _prepare_conn() -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    conn.execute(
+        """
+        CREATE TABLE domains (
+          id INTEGER PRIMARY KEY, company_id TEXT NOT NULL, domain TEXT NOT NULL UNIQUE,
+          disposable INTEGER NOT NULL DEFAULT 0, webmail INTEGER NOT NULL DEFAULT 0,
+          accept_all INTEGER NOT NULL DEFAULT 0, pattern TEXT,
+          created_at INTEGER NOT NULL, updated_at INTEGER NOT NULL
+        )
+        """
+    )
+    conn.executemany(
+        "INSERT INTO domains (id, company_id, domain, webmail, created_at, updated_at) "
+        "VALUES (?, 'c', ?, ?, 0, 0)",
+        [(1, "catchall.example", 0), (2, "strict.example", 0), (3, "gmail.com", 1)],
+    )
+    conn.commit()
+    return conn
+
+
+def _verdicts(conn: sqlite3.Connection) -> list[tuple[str, int, bool]]:
+    return conn.execute(
+        "SELECT domain, accept_all, accept_all_checked_at IS NOT NULL FROM domains ORDER BY id"
+    ).fetchall()
+
+
+def test_probe_sets_accept_all_and_skips_webmail() -> None:
+    conn = _prepare_conn()
+    verifier = StaticEmailVerifier(accept_all_domains=["catchall.example"])
+
+    assert asyncio.run(probe_domains(conn, verifier)).unwrap() == 2
+    assert _verdicts(conn) == [
+        ("catchall.example", 1, True),
+        ("strict.example", 0, True),
+        ("gmail.com", 0, False),
+    ]
+    # 判定は pattern_priors などの差分集計に関係しないので updated_at を進めない
+    assert conn.execute("SELECT DISTINCT updated_at FROM domains").fetchall() == [(0,)]
+    # 1 ドメインにつき 1 件だけ、実在しない local-part で検証する
+    assert sorted(email.split("@")[1] for email in verifier.verified) == [
+        "catchall.example",
+        "strict.example",
+    ]
+    assert all(email.startswith("zz-probe-") for email in verifier.verified)
+
+
+def test_probe_respects_ttl() -> None:
+    conn = _prepare_conn()
+    asyncio.run(probe_domains(conn, StaticEmailVerifier())).unwrap()
+
+    cached = StaticEmailVerifier()
+    assert asyncio.run(probe_domains(conn, cached, ttl_days=30)).unwrap() == 0
+    assert cached.verified == []
+
+    expired = StaticEmailVerifier(accept_all_domains=["strict.example"])
+    assert asyncio.run(probe_domains(conn, expired, ttl_days=0)).unwrap() == 2
+    assert _verdicts(conn)[1] == ("strict.example", 1, True)
+
+
+class _UnverifiableVerifier:
+    async def verify(self, email: str) -> Result[str, Exception]:
+        if email.endswith("@strict.example"):
+            return Result.err(RuntimeError("timeout"))
+        return Result.ok("Unverifiable")
+
+
+def test_probe_leaves_inconclusive_domains_unchecked() -> None:
+    conn = _prepare_conn()
+
+    assert asyncio.run(probe_domains(conn, _UnverifiableVerifier())).unwrap() == 0
+    assert [checked for _, _, checked in _verdicts(conn)] == [False, False, False]
@@ -0,0 +1,43 @@
+from src.prompts import PromptSection, PromptTemplate, PromptTokenStats, estimate_tokens
+
+
+def test_estimate_tokens_counts_wide_and_narrow_chars() -> None:
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("営業部") == 3
+    assert estimate_tokens("abcdefgh") == 2
+    assert estimate_tokens("営業 sales") == 2 + 2
+
+
+def test_template_drops_redundant_sections_with_structured_output() -> None:
+    template = PromptTemplate(
+        name="t",
+        sections=(
+            PromptSection(name="head", body="""
+                hello {name}
+                """),
+            PromptSection(
+                name="schema",
+                body="schema: {schema}",
+                redundant_with_structured_output=True,
+            ),
+        ),
+        token_budget=10,
+    )
+    assert template.render(name="x", schema="{}") == "hello x\n"
+    assert template.render(structured_output=False, name="x", schema="{}") == (
+        "hello x\n\nschema: {}\n"
+    )
+
+
+def test_prompt_token_stats_summary() -> None:
+    stats = PromptTokenStats()
+    for text in ["a" * 4, "a" * 8, "a" * 40]:
+        stats.record("t", text)
+
+    summary = stats.summary("t")
+    assert summary["count"] == 3
+    assert summary["total"] == 13
+    assert summary["p50"] == 2
+    assert summary["max"] == 10
+    assert stats.summary("missing") == {}
+    assert "[t] prompts=3" in stats.format_report()
@@ -0,0 +1,120 @@
+import asyncio
+import sqlite3
+
+import httpx
+
+from src.adapters.mx_resolver import DohMxResolver, MxAnswer, StaticMxResolver
+from src.resolve_mx import MAX_NEGATIVE_CACHE_TTL, MIN_CACHE_TTL, cache_ttl, resolve_domains
+
+
+def _prepare_conn() -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    conn.execute(
+        """
+        CREATE TABLE domains (
+          id INTEGER PRIMARY KEY, company_id TEXT NOT NULL, domain TEXT NOT NULL UNIQUE,
+          disposable INTEGER NOT NULL DEFAULT 0, webmail INTEGER NOT NULL DEFAULT 0,
+          accept_all INTEGER NOT NULL DEFAULT 0, pattern TEXT,
+          created_at INTEGER NOT NULL, updated_at INTEGER NOT NULL
+        )
+        """
+    )
+    conn.executemany(
+        "INSERT INTO domains (id, company_id, domain, webmail, created_at, updated_at) "
+        "VALUES (?, 'c', ?, ?, 0, 0)",
+        [
+            (1, "Mail.example", 0),
+            (2, "nomx.example", 0),
+            (3, "flaky.example", 0),
+            (4, "gmail.com", 1),
+        ],
+    )
+    conn.commit()
+    return conn
+
+
+def _mail_capable(conn: sqlite3.Connection) -> list[tuple[str, int | None]]:
+    return conn.execute("SELECT domain, mail_capable FROM domains ORDER BY id").fetchall()
+
+
+def test_resolve_marks_domains_and_caches_negative_entries() -> None:
+    conn = _prepare_conn()
+    resolver = StaticMxResolver({"mail.example": ["mx1.mail.example"]}, failures=["flaky.example"])
+
+    assert asyncio.run(resolve_domains(conn, resolver)).unwrap() == 2
+    assert _mail_capable(conn) == [
+        ("Mail.example", 1),
+        ("nomx.example", 0),
+        ("flaky.example", None),
+        ("gmail.com", None),
+    ]
+    cache = conn.execute("SELECT domain, has_mx, mx_hosts FROM dns_mx_cache ORDER BY domain")
+    assert cache.fetchall() == [("mail.example", 1, "mx1.mail.example"), ("nomx.example", 0, "")]
+    assert conn.execute("SELECT DISTINCT updated_at FROM domains").fetchall() == [(0,)]
+
+    # キャッシュが期限内のドメインは引かず、失敗したドメインだけ引き直す
+    again = StaticMxResolver({"flaky.example": ["mx.flaky.example"]})
+    assert asyncio.run(resolve_domains(conn, again)).unwrap() == 1
+    assert again.queried == ["flaky.example"]
+    assert _mail_capable(conn)[2] == ("flaky.example", 1)
+
+
+def test_expired_cache_entries_are_resolved_again() -> None:
+    conn = _prepare_conn()
+    asyncio.run(resolve_domains(conn, StaticMxResolver({}))).unwrap()
+    conn.execute("UPDATE dns_mx_cache SET expires_at = 0 WHERE domain = 'nomx.example'")
+    conn.commit()
+
+    resolver = StaticMxResolver({"nomx.example": ["mx.nomx.example"]})
+    asyncio.run(resolve_domains(conn, resolver)).unwrap()
+
+    assert resolver.queried == ["nomx.example"]
+    assert _mail_capable(conn)[1] == ("nomx.example", 1)
+
+
+def test_cache_ttl_is_clamped() -> None:
+    assert cache_ttl(MxAnswer(("mx.example",), 60)) == MIN_CACHE_TTL
+    assert cache_ttl(MxAnswer((), 10**9)) == MAX_NEGATIVE_CACHE_TTL
+
+
+def _doh(payloads: dict[str, dict[str, object]]) -> httpx.AsyncClient:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json=payloads[request.url.params["name"]])
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_doh_resolver_parses_answers_and_negative_ttl() -> None:
+    payloads: dict[str, dict[str, object]] = {
+        "mail.example": {
+            "Status": 0,
+            "Answer": [
+                {"name": "mail.example.", "type": 15, "TTL": 300, "data": "10 mx1.mail.example."},
+                {"name": "mail.example.", "type": 15, "TTL": 120, "data": "20 MX2.mail.example."},
+            ],
+        },
+        "nomx.example": {
+            "Status": 0,
+            "Authority": [{"name": "nomx.example.", "type": 6, "TTL": 900, "data": "ns. h. 1"}],
+        },
+        "nullmx.example": {
+            "Status": 0,
+            "Answer": [{"name": "nullmx.example.", "type": 15, "TTL": 3600, "data": "0 ."}],
+        },
+        "gone.example": {"Status": 3},
+        "broken.example": {"Status": 2},
+    }
+
+    async def _resolve_all() -> dict[str, object]:
+        async with _doh(payloads) as client:
+            resolver = DohMxResolver(client)
+            return {name: await resolver.resolve_mx(name) for name in payloads}
+
+    results = asyncio.run(_resolve_all())
+    assert results["mail.example"].unwrap() == MxAnswer(
+        ("mx1.mail.example", "mx2.mail.example"), 120
+    )
+    assert results["nomx.example"].unwrap() == MxAnswer((), 900)
+    assert results["nullmx.example"].unwrap().has_mx is False
+    assert results["gone.example"].unwrap().has_mx is False
+    assert results["broken.example"].is_err()
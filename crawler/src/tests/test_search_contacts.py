@@ -0,0 +1,272 @@
+import sqlite3
+import time
+from pathlib import Path
+
+from src.prompts import estimate_tokens
+from src.search_contacts import (
+    CONTACT_SEARCH_TEMPLATE,
+    CompanyTarget,
+    LlmContact,
+    LlmContactSource,
+    _assign_departments,
+    _build_prompt,
+    _ensure_contact_searches_table,
+    _ensure_contacts_table,
+    _ensure_contacts_unique_index,
+    _iter_targets,
+    _record_search,
+    _save_contacts,
+    _split_departments,
+)
+
+
+def _make_db(db_path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    _ensure_contacts_table(conn)
+    assert _ensure_contacts_unique_index(conn).is_ok()
+    return conn
+
+
+def test_save_contacts_inserts_new_and_refreshes_existing(tmp_path: Path) -> None:
+    conn = _make_db(tmp_path / "test.sqlite")
+
+    first = [
+        LlmContact(full_name="山田 太郎", first_name="Taro", last_name="Yamada", position="部長"),
+        LlmContact(full_name="佐藤 花子", department="営業部"),
+    ]
+    result = _save_contacts(conn, "c1", first)
+    assert result.is_ok()
+    assert result.unwrap() == 2
+    conn.commit()
+
+    conn.execute("UPDATE contacts SET last_seen_at = 0, updated_at = 0")
+    second = [
+        LlmContact(
+            full_name="山田 太郎",
+            position="本部長",
+            sources=[LlmContactSource(url="https://example.com/interview")],
+        ),
+        LlmContact(full_name="田中 一郎"),
+    ]
+    result = _save_contacts(conn, "c1", second)
+    assert result.is_ok()
+    assert result.unwrap() == 1
+
+    row = conn.execute(
+        "SELECT first_name, position, source_url, last_seen_at FROM contacts "
+        "WHERE full_name = '山田 太郎'"
+    ).fetchone()
+    assert row["first_name"] == "taro"
+    # 既存行は position を上書きせず、last_seen_at / source_url だけ更新する
+    assert row["position"] == "部長"
+    assert row["source_url"] == "https://example.com/interview"
+    assert row["last_seen_at"] > 0
+    assert conn.execute("SELECT COUNT(*) FROM contacts").fetchone()[0] == 3
+    conn.close()
+
+
+def test_save_contacts_keeps_source_url_when_missing(tmp_path: Path) -> None:
+    conn = _make_db(tmp_path / "test.sqlite")
+    contact = LlmContact(
+        full_name="山田 太郎",
+        sources=[LlmContactSource(url="https://example.com/a")],
+    )
+    assert _save_contacts(conn, "c1", [contact]).is_ok()
+    assert _save_contacts(conn, "c1", [LlmContact(full_name="山田 太郎")]).is_ok()
+
+    row = conn.execute("SELECT source_url FROM contacts").fetchone()
+    assert row["source_url"] == "https://example.com/a"
+    conn.close()
+
+
+def test_save_contacts_rolls_back_partial_batch(tmp_path: Path) -> None:
+    conn = _make_db(tmp_path / "test.sqlite")
+    assert _save_contacts(conn, "c1", [LlmContact(full_name="山田 太郎")]).is_ok()
+    conn.execute(
+        "CREATE TRIGGER fail_contact BEFORE INSERT ON contacts "
+        "WHEN NEW.full_name = '失敗 する' BEGIN SELECT RAISE(ABORT, 'boom'); END"
+    )
+
+    result = _save_contacts(
+        conn,
+        "c2",
+        [LlmContact(full_name="佐藤 花子"), LlmContact(full_name="失敗 する")],
+    )
+    assert result.is_err()
+    # 呼び出し側が後で commit しても、失敗した会社の途中までの行は残らない
+    conn.commit()
+
+    rows = conn.execute("SELECT company_id, full_name FROM contacts").fetchall()
+    assert [tuple(row) for row in rows] == [("c1", "山田 太郎")]
+    conn.close()
+
+
+def test_ensure_contacts_unique_index_fails_on_duplicates(tmp_path: Path) -> None:
+    conn = sqlite3.connect(tmp_path / "test.sqlite")
+    _ensure_contacts_table(conn)
+    for _ in range(2):
+        conn.execute(
+            "INSERT INTO contacts (company_id, full_name, created_at, updated_at) "
+            "VALUES ('c1', 'dup', 0, 0)"
+        )
+    conn.commit()
+
+    result = _ensure_contacts_unique_index(conn)
+    assert result.is_err()
+    conn.close()
+
+
+def _make_targets_db(db_path: Path) -> sqlite3.Connection:
+    conn = _make_db(db_path)
+    _ensure_contact_searches_table(conn)
+    conn.execute("CREATE TABLE companies (id TEXT PRIMARY KEY, name TEXT, website_url TEXT)")
+    conn.execute("CREATE TABLE domains (id INTEGER PRIMARY KEY, company_id TEXT, domain TEXT)")
+    for idx, company_id in enumerate(["c1", "c2", "c3", "c4"], start=1):
+        conn.execute(
+            "INSERT INTO companies (id, name, website_url) VALUES (?, ?, NULL)",
+            (company_id, f"Company {idx}"),
+        )
+        conn.execute(
+            "INSERT INTO domains (company_id, domain) VALUES (?, ?)",
+            (company_id, f"c{idx}.example"),
+        )
+    conn.commit()
+    return conn
+
+
+def test_iter_targets_skips_recent_searches(tmp_path: Path) -> None:
+    conn = _make_targets_db(tmp_path / "test.sqlite")
+
+    def _target(company_id: str) -> CompanyTarget:
+        return CompanyTarget(company_id, "", f"{company_id}.example", None)
+
+    assert _record_search(conn, _target("c1"), "営業", "ok", contact_count=3).is_ok()
+    assert _record_search(conn, _target("c2"), "営業", "empty").is_ok()
+    assert _record_search(conn, _target("c3"), "営業", "error", error="timeout").is_ok()
+    # 別部署の検索結果は対象外
+    assert _record_search(conn, _target("c4"), "マーケ", "ok", contact_count=1).is_ok()
+    conn.commit()
+
+    targets = list(_iter_targets(conn, False, departments=["営業"], research_interval_days=30))
+    assert [t.company_id for t in targets] == ["c3", "c4"]
+
+    # 間隔 0 ならチェックポイントを無視して全件
+    targets = list(_iter_targets(conn, False, departments=["営業"], research_interval_days=0))
+    assert [t.company_id for t in targets] == ["c1", "c2", "c3", "c4"]
+
+    # 期限切れのチェックポイントは再検索する
+    stale = int(time.time()) - 40 * 86400
+    conn.execute("UPDATE contact_searches SET searched_at = ? WHERE company_id = 'c1'", (stale,))
+    targets = list(_iter_targets(conn, False, departments=["営業"], research_interval_days=30))
+    assert [t.company_id for t in targets] == ["c1", "c3", "c4"]
+    conn.close()
+
+
+def test_record_search_overwrites_previous_status(tmp_path: Path) -> None:
+    conn = _make_targets_db(tmp_path / "test.sqlite")
+    target = CompanyTarget("c1", "Company 1", "c1.example", None)
+
+    assert _record_search(conn, target, None, "error", error="boom").is_ok()
+    assert _record_search(conn, target, "  ", "ok", contact_count=2, model="m").is_ok()
+
+    rows = conn.execute(
+        "SELECT department, status, contact_count, model, error FROM contact_searches"
+    ).fetchall()
+    assert len(rows) == 1
+    assert tuple(rows[0]) == ("", "ok", 2, "m", None)
+    conn.close()
+
+
+def test_contact_search_prompt_fits_token_budget() -> None:
+    prompt = _build_prompt(
+        "株式会社サンプルホールディングス", "sample.co.jp", ["マーケティング"], 10
+    )
+    assert estimate_tokens(prompt) <= CONTACT_SEARCH_TEMPLATE.token_budget
+    assert "sample.co.jp" in prompt
+    assert "マーケティング" in prompt
+    # Structured Outputs 有効時はスキーマ説明を送らない
+    assert "出力フォーマット" not in prompt
+
+
+def test_contact_search_prompt_embeds_json_schema_without_structured_output() -> None:
+    compact = _build_prompt("Acme", "acme.example", [], 5)
+    full = _build_prompt("Acme", "acme.example", [], 5, structured_output=False)
+    assert "特に指定なし" in full
+    assert '"properties"' in full
+    assert "mappingproxy" not in full
+    assert estimate_tokens(compact) < estimate_tokens(full)
+
+
+def test_iter_targets_returns_pending_departments_only(tmp_path: Path) -> None:
+    conn = _make_targets_db(tmp_path / "test.sqlite")
+    c1 = CompanyTarget("c1", "", "c1.example", None)
+    c2 = CompanyTarget("c2", "", "c2.example", None)
+    for department in ["営業", "マーケ"]:
+        assert _record_search(conn, c1, department, "ok", contact_count=1).is_ok()
+    assert _record_search(conn, c2, "営業", "empty").is_ok()
+    conn.commit()
+
+    targets = list(
+        _iter_targets(conn, False, departments=["営業", "マーケ"], research_interval_days=30)
+    )
+    assert [(t.company_id, t.departments) for t in targets] == [
+        ("c2", ["マーケ"]),
+        ("c3", ["営業", "マーケ"]),
+        ("c4", ["営業", "マーケ"]),
+    ]
+
+    # 部署指定なしは空文字のチェックポイントで判定する
+    assert _record_search(conn, c1, None, "ok", contact_count=1).is_ok()
+    targets = list(_iter_targets(conn, False, departments=[], research_interval_days=30))
+    assert [(t.company_id, t.departments) for t in targets] == [
+        ("c2", [""]),
+        ("c3", [""]),
+        ("c4", [""]),
+    ]
+    conn.close()
+
+
+def test_split_departments_accepts_commas_and_dedupes() -> None:
+    assert _split_departments(["営業,マーケ", " 情シス ", "営業"]) == ["営業", "マーケ", "情シス"]
+    assert _split_departments(None) == []
+
+
+def test_build_prompt_lists_departments_and_quota() -> None:
+    prompt = _build_prompt("Acme", "acme.example", ["営業", "マーケ"], 5)
+    assert "最大10件" in prompt
+    assert "各部署につき最大5件" in prompt
+    assert "target_department" in prompt
+    assert estimate_tokens(prompt) <= CONTACT_SEARCH_TEMPLATE.token_budget
+
+
+def test_assign_departments_dedupes_and_applies_quota() -> None:
+    contacts = [
+        LlmContact(
+            full_name="山田 太郎",
+            target_department="営業",
+            sources=[LlmContactSource(url="https://a")],
+        ),
+        LlmContact(
+            full_name="山田　太郎",
+            target_department="マーケ",
+            sources=[LlmContactSource(url="https://b")],
+        ),
+        LlmContact(full_name="佐藤 花子", target_department="営業"),
+        LlmContact(full_name="田中 一郎", target_department="マーケ"),
+        LlmContact(full_name="鈴木 次郎", target_department="人事"),
+    ]
+
+    selected, counts = _assign_departments(contacts, ["営業", "マーケ"], max_per_department=1)
+
+    # 指定部署外（人事）の鈴木 次郎は保存しない
+    assert [c.full_name for c in selected] == ["山田 太郎", "田中 一郎"]
+    assert [s.url for s in selected[0].sources] == ["https://a", "https://b"]
+    assert counts == {"営業": 1, "マーケ": 1}
+
+
+def test_assign_departments_single_department_tags_everyone() -> None:
+    contacts = [LlmContact(full_name="A"), LlmContact(full_name="B")]
+    selected, counts = _assign_departments(contacts, ["営業"], max_per_department=10)
+    assert [c.target_department for c in selected] == ["営業", "営業"]
+    assert counts == {"営業": 2}